@@ -1,2 +1,2 @@
 @echo off
-pytest src\test_main.py
+pytest src
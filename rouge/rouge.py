@@ -14,15 +14,24 @@
 """ ROUGE metric from Google Research github repo. """
 
 # The dependencies in https://github.com/google-research/google-research/blob/master/rouge/requirements.txt
+# nltk is not imported here: it takes longer to import than most batches take to score, and is only needed for
+# stemming, the table LCS backend and rougeLsum sentence splitting, which import it on first use.
 import absl  # Here to have a nice missing dependency error message early on
 import datasets
-import nltk  # Here to have a nice missing dependency error message early on
 import numpy  # Here to have a nice missing dependency error message early on
 import six  # Here to have a nice missing dependency error message early on
-from rouge_score import rouge_scorer, scoring
+from rouge_score import scoring
 
 import evaluate
 
+from .rouge_aggregate import AGGREGATORS, StreamingAggregator
+from .rouge_batched import iter_scores, score_batch
+from .rouge_lcs import make_scorer, span
+from .rouge_multi import MULTI_REF_BACKENDS, MultiReferenceScorer
+
+
+OUTPUT_FORMATS = ("dict", "arrow")
+
 
 _CITATION = """\
 @inproceedings{lin-2004-rouge,
@@ -63,7 +72,33 @@ Args:
         `"rougeLsum"`: rougeLsum splits text using `"\n"`.
         See details in https://github.com/huggingface/datasets/issues/617
     use_stemmer: Bool indicating whether Porter stemmer should be used to strip word suffixes.
+    tokenizer: optional callable splitting a text into tokens, or an object with a rouge_score-style `tokenize`
+        method (e.g. one that memoizes repeated texts), which is used as is.
     use_aggregator: Return aggregates if this is set to True
+    engine: `"python"` (default) scores pair by pair with `rouge_score.RougeScorer`; `"batched"` tokenizes the
+        whole batch once and counts n-gram overlaps for all pairs at once with NumPy, with identical scores.
+    num_processes: with `engine="batched"`, number of worker processes the batch is sharded across.
+        A custom `tokenizer` must then be picklable.
+    lcs_backend: how `"rougeL"` and `"rougeLsum"` in `rouge_types` are computed: `"table"` (default) uses
+        rouge_score's dynamic-programming table, `"bitparallel"` a bit-parallel LCS over token bitsets that is much
+        faster on long texts and gives identical scores.
+    aggregator: `"bootstrap"` (default) collects `Score` objects for rouge_score's `BootstrapAggregator`;
+        `"streaming"` writes scores into preallocated arrays (float32 when aggregating, float64 per-pair values
+        otherwise) and bootstraps with vectorized, seeded index draws.
+    seed: random seed of the `"streaming"` aggregator's bootstrap resampling.
+    scorer: optional prebuilt scorer for `rouge_types` (e.g. kept in a process-wide cache) that the python engine
+        uses instead of building a new one on every call.
+    multi_ref_backend: how the python engine scores a prediction against a list of references: `"score_multi"`
+        (default) scores each reference separately with rouge_score's `score_multi`; `"shared"` tokenizes and
+        counts the prediction once, skips references whose upper-bound score cannot beat the best one so far, and
+        gives identical scores (LCS types always use the bit-parallel kernel).
+    return_best_reference: with a list of references per prediction, also return `best_reference`: for each
+        rouge type, the index of the reference each prediction's score came from. Implies
+        `multi_ref_backend="shared"`; python engine only.
+    output_format: `"dict"` (default) returns a dict; `"arrow"` (only with `use_aggregator=False`) returns the
+        per-row fmeasures as a `pyarrow.Table` with one float64 column per rouge type (and a
+        `<rouge_type>_best_reference` int64 column each with `return_best_reference`). The batched engine and the
+        streaming aggregator hand their NumPy arrays to Arrow without copying them into Python lists.
 Returns:
     rouge1: rouge_1 (f1),
     rouge2: rouge_2 (f1),
@@ -90,6 +125,31 @@ class Tokenizer:
         return self.tokenizer_func(text)
 
 
+def _score_pairs(scorer, references, predictions, multi_ref, best_references=None):
+    # Lazily, so that the aggregators consume one score at a time. With `best_references` (a list), the index of
+    # the reference each score came from is appended to it.
+    for ref, pred in zip(references, predictions):
+        with span("rouge.score"):
+            if best_references is not None:
+                score, indices = scorer.score_multi(ref, pred, return_index=True)
+                best_references.append(indices)
+            else:
+                score = scorer.score_multi(ref, pred) if multi_ref else scorer.score(ref, pred)
+        yield score
+
+
+def _to_table(result):
+    # Only `output_format="arrow"` needs pyarrow, so it is not imported with the metric.
+    import pyarrow
+
+    columns = {
+        key: pyarrow.array(values, type=pyarrow.float64()) for key, values in result.items() if key != "best_reference"
+    }
+    for key, indices in result.get("best_reference", {}).items():
+        columns[f"{key}_best_reference"] = pyarrow.array(indices, type=pyarrow.int64())
+    return pyarrow.table(columns)
+
+
 @evaluate.utils.file_utils.add_start_docstrings(_DESCRIPTION, _KWARGS_DESCRIPTION)
 class Rouge(evaluate.Metric):
     def _info(self):
@@ -119,40 +179,102 @@ class Rouge(evaluate.Metric):
         )
 
     def _compute(
-        self, predictions, references, rouge_types=None, use_aggregator=True, use_stemmer=False, tokenizer=None
+        self,
+        predictions,
+        references,
+        rouge_types=None,
+        use_aggregator=True,
+        use_stemmer=False,
+        tokenizer=None,
+        engine="python",
+        num_processes=None,
+        lcs_backend="table",
+        scorer=None,
+        aggregator="bootstrap",
+        seed=0,
+        multi_ref_backend="score_multi",
+        return_best_reference=False,
+        output_format="dict",
     ):
         if rouge_types is None:
             rouge_types = ["rouge1", "rouge2", "rougeL", "rougeLsum"]
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output_format {output_format!r}, expected one of {OUTPUT_FORMATS}")
+        arrow = output_format == "arrow"
+        if arrow and use_aggregator:
+            raise ValueError("output_format='arrow' returns per-row scores and needs use_aggregator=False")
 
         multi_ref = isinstance(references[0], list)
+        if multi_ref_backend not in MULTI_REF_BACKENDS:
+            raise ValueError(f"Unknown multi_ref_backend {multi_ref_backend!r}, expected one of {MULTI_REF_BACKENDS}")
+        best_references = [] if return_best_reference and multi_ref else None
+        if best_references is not None and engine != "python":
+            raise ValueError("return_best_reference is only supported by the python engine")
 
-        if tokenizer is not None:
+        if tokenizer is not None and not hasattr(tokenizer, "tokenize"):
             tokenizer = Tokenizer(tokenizer)
 
-        scorer = rouge_scorer.RougeScorer(rouge_types=rouge_types, use_stemmer=use_stemmer, tokenizer=tokenizer)
-        if use_aggregator:
-            aggregator = scoring.BootstrapAggregator()
+        if engine == "batched":
+            with span("rouge.score_batch", pairs=len(predictions)):
+                batch = score_batch(
+                    predictions,
+                    references,
+                    rouge_types,
+                    use_stemmer=use_stemmer,
+                    tokenizer=tokenizer,
+                    num_processes=num_processes,
+                    lcs_backend=lcs_backend,
+                )
+            scores = iter_scores(batch)
+        elif engine == "python":
+            if scorer is None and multi_ref and (multi_ref_backend == "shared" or best_references is not None):
+                scorer = MultiReferenceScorer(rouge_types, use_stemmer=use_stemmer, tokenizer=tokenizer)
+            elif scorer is None:
+                scorer = make_scorer(rouge_types, use_stemmer=use_stemmer, tokenizer=tokenizer, lcs_backend=lcs_backend)
+            if best_references is not None and not isinstance(scorer, MultiReferenceScorer):
+                raise ValueError("return_best_reference needs a MultiReferenceScorer as scorer")
+            scores = _score_pairs(scorer, references, predictions, multi_ref, best_references)
         else:
-            scores = []
+            raise ValueError(f"Unknown engine {engine!r}, expected 'python' or 'batched'")
 
-        for ref, pred in zip(references, predictions):
-            if multi_ref:
-                score = scorer.score_multi(ref, pred)
+        if aggregator == "streaming":
+            dtype = numpy.float32 if use_aggregator else numpy.float64
+            streaming = StreamingAggregator(rouge_types, capacity=len(predictions), dtype=dtype, seed=seed)
+            if engine == "batched":
+                streaming.add_batch(batch)
             else:
-                score = scorer.score(ref, pred)
+                for score in scores:
+                    streaming.add_scores(score)
             if use_aggregator:
-                aggregator.add_scores(score)
+                with span("rouge.aggregate"):
+                    result = streaming.aggregate()
+                for key in result:
+                    result[key] = result[key].mid.fmeasure
             else:
-                scores.append(score)
-
-        if use_aggregator:
-            result = aggregator.aggregate()
+                result = {key: streaming.measure(key) for key in rouge_types}
+                if not arrow:
+                    result = {key: values.tolist() for key, values in result.items()}
+        elif aggregator != "bootstrap":
+            raise ValueError(f"Unknown aggregator {aggregator!r}, expected one of {AGGREGATORS}")
+        elif use_aggregator:
+            bootstrap = scoring.BootstrapAggregator()
+            for score in scores:
+                bootstrap.add_scores(score)
+            with span("rouge.aggregate"):
+                result = bootstrap.aggregate()
             for key in result:
                 result[key] = result[key].mid.fmeasure
 
+        elif arrow and engine == "batched":
+            result = {key: batch[key][:, 2] for key in rouge_types}
         else:
+            scores = list(scores)
             result = {}
             for key in scores[0]:
                 result[key] = list(score[key].fmeasure for score in scores)
 
-        return result
\ No newline at end of file
+        if best_references is not None:
+            result["best_reference"] = {key: [indices[key] for indices in best_references] for key in rouge_types}
+        if arrow:
+            return _to_table(result)
+        return result
@@ -0,0 +1,93 @@
+""" Streaming ROUGE aggregation over preallocated NumPy arrays. """
+
+import numpy as np
+from rouge_score import scoring
+
+
+AGGREGATORS = ("bootstrap", "streaming")
+
+
+class StreamingAggregator:
+    """Drop-in replacement for `scoring.BootstrapAggregator` that keeps scores in flat arrays.
+
+    Precision, recall and fmeasure of every added pair are written into one preallocated (capacity, 3) array
+    per rouge type instead of a list of `Score` tuples. `aggregate` resamples with vectorized index draws from
+    `np.random.RandomState(seed)`; these are the same draws `BootstrapAggregator` makes after
+    `np.random.seed(seed)`, so both return the same intervals up to the storage precision of `dtype`.
+    """
+
+    def __init__(
+        self, rouge_types, capacity=1024, dtype=np.float32, confidence_interval=0.95, n_samples=1000, seed=0
+    ):
+        if confidence_interval < 0 or confidence_interval > 1:
+            raise ValueError("confidence_interval must be in range [0, 1]")
+        if n_samples <= 0:
+            raise ValueError("n_samples must be positive")
+
+        self.rouge_types = list(rouge_types)
+        self._n_samples = n_samples
+        self._confidence_interval = confidence_interval
+        self._seed = seed
+        self._size = 0
+        self._scores = {rouge_type: np.empty((max(capacity, 1), 3), dtype=dtype) for rouge_type in self.rouge_types}
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, count):
+        capacity = len(next(iter(self._scores.values())))
+        if self._size + count <= capacity:
+            return
+        capacity = max(2 * capacity, self._size + count)
+        for rouge_type, scores in self._scores.items():
+            grown = np.empty((capacity, 3), dtype=scores.dtype)
+            grown[: self._size] = scores[: self._size]
+            self._scores[rouge_type] = grown
+
+    def add_scores(self, scores):
+        """Adds one pair given as a dict mapping rouge types to `Score` tuples."""
+        self._reserve(1)
+        for rouge_type, score in scores.items():
+            self._scores[rouge_type][self._size] = score
+        self._size += 1
+
+    def add_batch(self, batch):
+        """Adds many pairs given as a dict mapping rouge types to (n, 3) precision/recall/fmeasure arrays."""
+        count = len(next(iter(batch.values())))
+        self._reserve(count)
+        for rouge_type, values in batch.items():
+            self._scores[rouge_type][self._size : self._size + count] = values
+        self._size += count
+
+    def measure(self, rouge_type, name="fmeasure"):
+        """View of one measure of one rouge type for every pair added so far."""
+        return self._scores[rouge_type][: self._size, scoring.Score._fields.index(name)]
+
+    def _bootstrap_resample(self, matrix, rng, chunk_elements=1 << 22):
+        size = len(matrix)
+        sample_mean = np.empty((self._n_samples, matrix.shape[1]))
+        # Draw bootstrap samples a chunk at a time so the index matrix stays bounded.
+        chunk = max(1, chunk_elements // size)
+        columns = [np.ascontiguousarray(matrix[:, measure]) for measure in range(matrix.shape[1])]
+        for start in range(0, self._n_samples, chunk):
+            stop = min(start + chunk, self._n_samples)
+            sample_idx = rng.randint(0, size, size=(stop - start, size))
+            for measure, column in enumerate(columns):
+                sample_mean[start:stop, measure] = column[sample_idx].mean(axis=1, dtype=np.float64)
+
+        percentile_delta = (1 - self._confidence_interval) / 2
+        q = 100 * np.array([percentile_delta, 0.5, 1 - percentile_delta])
+        return np.percentile(sample_mean, q, axis=0)
+
+    def aggregate(self):
+        """Returns a dict mapping each rouge type to an `AggregateScore`, like `BootstrapAggregator.aggregate`."""
+        result = {}
+        if not self._size:
+            return result
+        # One generator consumed type after type, like the global RNG in `BootstrapAggregator`.
+        rng = np.random.RandomState(self._seed)
+        for rouge_type, scores in self._scores.items():
+            percentiles = self._bootstrap_resample(scores[: self._size], rng)
+            intervals = tuple(scoring.Score(*percentiles[j, :]) for j in range(3))
+            result[rouge_type] = scoring.AggregateScore(low=intervals[0], mid=intervals[1], high=intervals[2])
+        return result
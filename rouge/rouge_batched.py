@@ -0,0 +1,196 @@
+""" Batched ROUGE engine: n-gram overlap counts for a whole batch at once with NumPy. """
+
+import collections
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from rouge_score import scoring
+
+from .rouge_lcs import DefaultTokenizer, make_scorer, span
+
+
+_ROUGE_N_RE = re.compile(r"rouge[0-9]$")
+_LCS_TYPES = ("rougeL", "rougeLsum")
+
+
+class _Corpus:
+    """Unique texts of a batch tokenized once and stored as a flat array of integer token ids."""
+
+    def __init__(self, texts, tokenizer):
+        self.index = {}
+        vocab = collections.defaultdict()
+        vocab.default_factory = vocab.__len__
+        flat = []
+        lengths = []
+        for text in texts:
+            if text in self.index:
+                continue
+            self.index[text] = len(lengths)
+            tokens = tokenizer.tokenize(text)
+            flat.extend(map(vocab.__getitem__, tokens))
+            lengths.append(len(tokens))
+        self.vocab_size = max(len(vocab), 1)
+        self.ids = np.asarray(flat, dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.starts = np.concatenate(([0], np.cumsum(self.lengths)[:-1])).astype(np.int64)
+
+    def docs(self, texts):
+        return np.fromiter((self.index[text] for text in texts), dtype=np.int64, count=len(texts))
+
+    def ngrams(self, n):
+        """Returns (doc index, n-gram id) for every n-gram position in the corpus."""
+        counts = np.maximum(self.lengths - n + 1, 0)
+        doc = np.repeat(np.arange(len(self.lengths)), counts)
+        if not len(doc):
+            return doc, doc
+        offsets = np.arange(len(doc)) - np.repeat(np.cumsum(counts) - counts, counts)
+        positions = self.starts[doc] + offsets
+        if n == 1:
+            return doc, self.ids[positions]
+        windows = self.ids[positions[:, None] + np.arange(n)]
+        if self.vocab_size**n < 2**62:
+            gram = np.zeros(len(doc), dtype=np.int64)
+            for column in windows.T:
+                gram = gram * self.vocab_size + column
+        else:
+            gram = np.unique(windows, axis=0, return_inverse=True)[1].reshape(-1)
+        # Compact ids keep (pair, n-gram) keys well inside int64.
+        return doc, np.unique(gram, return_inverse=True)[1].reshape(-1)
+
+
+def _pair_counts(pair, doc, doc_of_pair, gram):
+    """Counts each n-gram per pair, returning sorted (pair, n-gram) keys and their counts."""
+    # Map every n-gram occurrence of a document onto every pair that uses that document.
+    order = np.argsort(doc_of_pair, kind="stable")
+    sorted_docs = doc_of_pair[order]
+    first = np.searchsorted(sorted_docs, doc, side="left")
+    last = np.searchsorted(sorted_docs, doc, side="right")
+    repeats = last - first
+    occurrence = np.repeat(np.arange(len(doc)), repeats)
+    within = np.arange(len(occurrence)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    pairs = pair[order][np.repeat(first, repeats) + within]
+    grams = gram[occurrence]
+    width = int(gram.max()) + 1 if len(gram) else 1
+    keys, counts = np.unique(pairs * width + grams, return_counts=True)
+    return keys, counts, width
+
+
+def _fmeasure(precision, recall):
+    total = precision + recall
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total > 0, 2 * precision * recall / total, 0.0)
+
+
+def _score_ngrams(corpus, target_docs, prediction_docs, n):
+    """Vectorized equivalent of `rouge_scorer._score_ngrams` for every pair of the batch."""
+    num_pairs = len(target_docs)
+    pair = np.arange(num_pairs)
+    doc, gram = corpus.ngrams(n)
+    target_keys, target_counts, width = _pair_counts(pair, doc, target_docs, gram)
+    prediction_keys, prediction_counts, _ = _pair_counts(pair, doc, prediction_docs, gram)
+    common, target_at, prediction_at = np.intersect1d(
+        target_keys, prediction_keys, assume_unique=True, return_indices=True
+    )
+    overlap = np.minimum(target_counts[target_at], prediction_counts[prediction_at])
+    intersection = np.bincount(common // width, weights=overlap, minlength=num_pairs)
+
+    target_total = np.maximum(corpus.lengths[target_docs] - n + 1, 0)
+    prediction_total = np.maximum(corpus.lengths[prediction_docs] - n + 1, 0)
+    precision = intersection / np.maximum(prediction_total, 1)
+    recall = intersection / np.maximum(target_total, 1)
+    return np.stack([precision, recall, _fmeasure(precision, recall)], axis=1)
+
+
+def _best_reference(group, fmeasure, num_groups):
+    """Index of the first maximal f-measure inside each group, like `np.argmax` in `score_multi`."""
+    best = np.full(num_groups, -np.inf)
+    np.maximum.at(best, group, fmeasure)
+    candidates = np.flatnonzero(fmeasure == best[group])
+    _, first = np.unique(group[candidates], return_index=True)
+    return candidates[first]
+
+
+def _score_shard(predictions, references, rouge_types, tokenizer, lcs_backend):
+    """Scores one shard, returning a dict mapping each rouge type to an (n, 3) precision/recall/fmeasure array."""
+    multi_ref = len(references) > 0 and isinstance(references[0], list)
+    if multi_ref:
+        if any(not refs for refs in references):
+            raise ValueError("score_batch needs at least one target per prediction")
+        group = np.repeat(np.arange(len(predictions)), [len(refs) for refs in references])
+        targets = [ref for refs in references for ref in refs]
+        paired_predictions = [predictions[i] for i in group]
+    else:
+        group = None
+        targets = list(references)
+        paired_predictions = list(predictions)
+
+    ngram_types = [rouge_type for rouge_type in rouge_types if _ROUGE_N_RE.match(rouge_type)]
+    result = {}
+    if ngram_types:
+        with span("rouge.tokenize", texts=len(targets) + len(paired_predictions)):
+            corpus = _Corpus(targets + paired_predictions, tokenizer)
+            target_docs = corpus.docs(targets)
+            prediction_docs = corpus.docs(paired_predictions)
+        for rouge_type in ngram_types:
+            n = int(rouge_type[5:])
+            if n <= 0:
+                raise ValueError("rougen requires positive n: %s" % rouge_type)
+            with span("rouge.ngrams", rouge_type=rouge_type):
+                result[rouge_type] = _score_ngrams(corpus, target_docs, prediction_docs, n)
+
+    lcs_types = [rouge_type for rouge_type in rouge_types if rouge_type in _LCS_TYPES]
+    if lcs_types:
+        scorer = make_scorer(lcs_types, tokenizer=tokenizer, lcs_backend=lcs_backend)
+        with span("rouge.lcs_pairs", pairs=len(targets)):
+            scores = [scorer.score(target, prediction) for target, prediction in zip(targets, paired_predictions)]
+        for rouge_type in lcs_types:
+            values = [score[rouge_type] for score in scores]
+            result[rouge_type] = np.asarray(values, dtype=np.float64).reshape(-1, 3)
+
+    for rouge_type in rouge_types:
+        if rouge_type not in result:
+            raise ValueError("Invalid rouge type: %s" % rouge_type)
+
+    if multi_ref:
+        with span("rouge.best_reference"):
+            for rouge_type, values in result.items():
+                result[rouge_type] = values[_best_reference(group, values[:, 2], len(predictions))]
+    return result
+
+
+def score_batch(
+    predictions, references, rouge_types, use_stemmer=False, tokenizer=None, num_processes=None, lcs_backend="table"
+):
+    """Scores every prediction against its reference(s) and returns per-pair score arrays.
+
+    The returned dict maps each rouge type to a float64 array of shape (len(predictions), 3) holding
+    precision, recall and fmeasure, with the same values `rouge_scorer.RougeScorer.score` (or `score_multi`
+    when each reference is a list) produces pair by pair.
+
+    With `num_processes` > 1 the batch is split into contiguous shards scored in a process pool, in which
+    case `tokenizer` must be picklable. `lcs_backend` selects how rougeL / rougeLsum are computed, see
+    `rouge_lcs.make_scorer`.
+    """
+    if tokenizer is None:
+        tokenizer = DefaultTokenizer(use_stemmer)
+    if num_processes is None or num_processes <= 1 or len(predictions) < 2:
+        return _score_shard(predictions, references, rouge_types, tokenizer, lcs_backend)
+
+    num_shards = min(num_processes, len(predictions))
+    bounds = np.linspace(0, len(predictions), num_shards + 1).astype(int)
+    with ProcessPoolExecutor(max_workers=min(num_processes, os.cpu_count() or 1)) as pool:
+        futures = [
+            pool.submit(_score_shard, predictions[lo:hi], references[lo:hi], rouge_types, tokenizer, lcs_backend)
+            for lo, hi in zip(bounds[:-1], bounds[1:])
+        ]
+        shards = [future.result() for future in futures]
+    return {rouge_type: np.concatenate([shard[rouge_type] for shard in shards]) for rouge_type in rouge_types}
+
+
+def iter_scores(batch):
+    """Yields one `{rouge_type: Score}` dict per pair of a `score_batch` result."""
+    columns = {rouge_type: values.tolist() for rouge_type, values in batch.items()}
+    for row in zip(*columns.values()):
+        yield {rouge_type: scoring.Score(*values) for rouge_type, values in zip(columns, row)}
@@ -0,0 +1,258 @@
+""" Bit-parallel LCS kernel for rougeL and rougeLsum. """
+
+import collections
+import sys
+from contextlib import nullcontext
+
+import numpy as np
+import six
+from rouge_score import scoring, tokenize
+
+# Stage timings are recorded by this repository's `src.profiling` when it has been imported. The metric never
+# imports it, so a copy of rouge/ used on its own gets no-op spans.
+PROFILER_MODULE = "src.profiling"
+_NULL_SPAN = nullcontext()
+
+
+def span(name, **args):
+    """`src.profiling.span(name, **args)` when the profiler is loaded, otherwise a no-op context manager."""
+    profiler = sys.modules.get(PROFILER_MODULE)
+    return _NULL_SPAN if profiler is None else profiler.span(name, **args)
+
+
+def profiling_enabled():
+    """True inside a `src.profiling.profile()` block."""
+    profiler = sys.modules.get(PROFILER_MODULE)
+    return profiler is not None and profiler.is_enabled()
+
+
+LCS_BACKENDS = ("table", "bitparallel")
+_LCS_TYPES = ("rougeL", "rougeLsum")
+
+
+class DefaultTokenizer:
+    """Same tokens as `rouge_score.tokenizers.DefaultTokenizer`, with Porter stems memoized per tokenizer.
+
+    NLTK (whose import dominates start-up time) is only loaded when `use_stemmer` is set.
+    """
+
+    def __init__(self, use_stemmer=False):
+        self._stems = None
+        if use_stemmer:
+            from nltk.stem import porter
+
+            self._stems = _StemCache(porter.PorterStemmer())
+
+    def tokenize(self, text):
+        # After the substitution only [a-z0-9] and spaces are left, so `str.split` yields exactly
+        # the non-empty tokens `tokenize.tokenize` keeps.
+        tokens = tokenize.NON_ALPHANUM_RE.sub(" ", text.lower()).split()
+        if self._stems is None:
+            return tokens
+        tokens = [self._stems[token] if len(token) > 3 else token for token in tokens]
+        return [token for token in tokens if tokenize.VALID_TOKEN_RE.match(token)]
+
+
+class TimedTokenizer:
+    """Wraps a rouge_score-style tokenizer so that each call is recorded as a "rouge.tokenize" span."""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+
+    def tokenize(self, text):
+        with span("rouge.tokenize"):
+            return self.tokenizer.tokenize(text)
+
+
+class _StemCache(dict):
+    def __init__(self, stemmer):
+        super().__init__()
+        self._stemmer = stemmer
+
+    def __missing__(self, token):
+        stem = self[token] = self._stemmer.stem(token)
+        return stem
+
+
+def token_masks(tokens):
+    """Maps each distinct token to an int bitset of the positions where it occurs."""
+    masks = {}
+    for position, token in enumerate(tokens):
+        masks[token] = masks.get(token, 0) | (1 << position)
+    return masks
+
+
+def _lcs_rows(ref, can, masks):
+    """Hyyro's bit-vector LCS: one row state per prefix of `ref`.
+
+    Bit j of a row state is 0 where the LCS table row increases at column j + 1, so the table cell
+    t[i][j] equals j - popcount(rows[i] & ((1 << j) - 1)).
+    """
+    full = (1 << len(can)) - 1
+    row = full
+    rows = [row]
+    for token in ref:
+        matches = row & masks.get(token, 0)
+        row = ((row + matches) | (row - matches)) & full
+        rows.append(row)
+    return rows
+
+
+def lcs_length(ref, can, masks=None):
+    """Length of the longest common subsequence of two token lists."""
+    if not ref or not can:
+        return 0
+    if masks is None:
+        masks = token_masks(can)
+    full = (1 << len(can)) - 1
+    row = full
+    for token in ref:
+        matches = row & masks.get(token, 0)
+        row = ((row + matches) | (row - matches)) & full
+    return len(can) - row.bit_count()
+
+
+def lcs_ind(ref, can, masks=None):
+    """Indices into `ref` of the same LCS `rouge_scorer.lcs_ind` reads out of the full DP table."""
+    if masks is None:
+        masks = token_masks(can)
+    rows = _lcs_rows(ref, can, masks)
+
+    def cell(i, j):
+        return j - (rows[i] & ((1 << j) - 1)).bit_count()
+
+    i = len(ref)
+    j = len(can)
+    lcs = []
+    while i > 0 and j > 0:
+        if ref[i - 1] == can[j - 1]:
+            lcs.append(i - 1)
+            i -= 1
+            j -= 1
+        elif cell(i, j - 1) > cell(i - 1, j):
+            j -= 1
+        else:
+            i -= 1
+    lcs.reverse()
+    return lcs
+
+
+def score_lcs(target_tokens, prediction_tokens):
+    """Bit-parallel equivalent of `rouge_scorer._score_lcs`."""
+    if not target_tokens or not prediction_tokens:
+        return scoring.Score(precision=0, recall=0, fmeasure=0)
+
+    length = lcs_length(target_tokens, prediction_tokens)
+    precision = length / len(prediction_tokens)
+    recall = length / len(target_tokens)
+    return scoring.Score(precision=precision, recall=recall, fmeasure=scoring.fmeasure(precision, recall))
+
+
+def summary_level_lcs(ref_sent, can_sent, can_masks=None):
+    """Bit-parallel equivalent of `rouge_scorer._summary_level_lcs`.
+
+    The position bitsets of each candidate sentence (`can_masks`, built here unless given) are reused for every
+    reference sentence.
+    """
+    if not ref_sent or not can_sent:
+        return scoring.Score(precision=0, recall=0, fmeasure=0)
+
+    m = sum(map(len, ref_sent))
+    n = sum(map(len, can_sent))
+    if not n or not m:
+        return scoring.Score(precision=0, recall=0, fmeasure=0)
+
+    token_cnts_r = collections.Counter()
+    token_cnts_c = collections.Counter()
+    for s in ref_sent:
+        token_cnts_r.update(s)
+    for s in can_sent:
+        token_cnts_c.update(s)
+
+    if can_masks is None:
+        can_masks = [token_masks(c) for c in can_sent]
+    hits = 0
+    for r in ref_sent:
+        union = sorted(set().union(*(lcs_ind(r, c, masks) for c, masks in zip(can_sent, can_masks))))
+        # Same double-counting guard as ROUGE 1.5.5 and rouge_score.
+        for t in (r[i] for i in union):
+            if token_cnts_c[t] > 0 and token_cnts_r[t] > 0:
+                hits += 1
+                token_cnts_c[t] -= 1
+                token_cnts_r[t] -= 1
+
+    recall = hits / m
+    precision = hits / n
+    return scoring.Score(precision=precision, recall=recall, fmeasure=scoring.fmeasure(precision, recall))
+
+
+class BitParallelRougeScorer(scoring.BaseScorer):
+    """Drop-in `RougeScorer` whose rougeL and rougeLsum go through the bit-parallel LCS kernel.
+
+    rouge{n} types are delegated to a plain `RougeScorer`; every score matches `RougeScorer.score` and
+    `RougeScorer.score_multi`. rouge_score's scorer module (and with it NLTK) is only imported for rouge{n} types.
+    """
+
+    def __init__(self, rouge_types, use_stemmer=False, split_summaries=False, tokenizer=None):
+        self.rouge_types = rouge_types
+        self._tokenizer = tokenizer or DefaultTokenizer(use_stemmer)
+        self._split_summaries = split_summaries
+        ngram_types = [rouge_type for rouge_type in rouge_types if rouge_type not in _LCS_TYPES]
+        self._ngram_scorer = None
+        if ngram_types:
+            from rouge_score import rouge_scorer
+
+            self._ngram_scorer = rouge_scorer.RougeScorer(
+                ngram_types, split_summaries=split_summaries, tokenizer=self._tokenizer
+            )
+
+    def _sents(self, text):
+        if self._split_summaries:
+            import nltk
+
+            sents = nltk.sent_tokenize(text)
+        else:
+            sents = six.ensure_str(text).split("\n")
+        return [x for x in sents if len(x)]
+
+    def score(self, target, prediction):
+        with span("rouge.ngrams"):
+            result = self._ngram_scorer.score(target, prediction) if self._ngram_scorer else {}
+        if "rougeL" in self.rouge_types:
+            target_tokens, prediction_tokens = self._tokenizer.tokenize(target), self._tokenizer.tokenize(prediction)
+            with span("rouge.lcs"):
+                result["rougeL"] = score_lcs(target_tokens, prediction_tokens)
+        if "rougeLsum" in self.rouge_types:
+            target_sents = [self._tokenizer.tokenize(s) for s in self._sents(target)]
+            prediction_sents = [self._tokenizer.tokenize(s) for s in self._sents(prediction)]
+            with span("rouge.lcs"):
+                result["rougeLsum"] = summary_level_lcs(target_sents, prediction_sents)
+        return {rouge_type: result[rouge_type] for rouge_type in self.rouge_types}
+
+    def score_multi(self, targets, prediction):
+        """Scores against each target and keeps, per rouge type, the first target with the best fmeasure."""
+        score_dicts = [self.score(target, prediction) for target in targets]
+        return {
+            rouge_type: score_dicts[np.argmax([score[rouge_type].fmeasure for score in score_dicts])][rouge_type]
+            for rouge_type in self.rouge_types
+        }
+
+
+def make_scorer(rouge_types, use_stemmer=False, tokenizer=None, lcs_backend="table"):
+    """Builds the scorer for `lcs_backend`: `"table"` (rouge_score's O(n*m) DP table) or `"bitparallel"`.
+
+    Inside `src.profiling.profile()` the scorer's tokenizer records "rouge.tokenize" spans.
+    """
+    if lcs_backend == "table":
+        from rouge_score import rouge_scorer
+
+        if profiling_enabled():
+            from rouge_score import tokenizers
+
+            tokenizer = TimedTokenizer(tokenizer or tokenizers.DefaultTokenizer(use_stemmer))
+        return rouge_scorer.RougeScorer(rouge_types=rouge_types, use_stemmer=use_stemmer, tokenizer=tokenizer)
+    if lcs_backend == "bitparallel":
+        if profiling_enabled():
+            tokenizer = TimedTokenizer(tokenizer or DefaultTokenizer(use_stemmer))
+        return BitParallelRougeScorer(rouge_types=rouge_types, use_stemmer=use_stemmer, tokenizer=tokenizer)
+    raise ValueError(f"Unknown lcs_backend {lcs_backend!r}, expected one of {LCS_BACKENDS}")
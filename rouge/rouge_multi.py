@@ -0,0 +1,198 @@
+""" Multi-reference ROUGE that prepares the prediction once and prunes references by an upper bound. """
+
+import collections
+import re
+from collections import namedtuple
+
+import six
+from rouge_score import scoring
+
+from .rouge_lcs import (
+    DefaultTokenizer,
+    TimedTokenizer,
+    lcs_length,
+    profiling_enabled,
+    span,
+    summary_level_lcs,
+    token_masks,
+)
+
+
+MULTI_REF_BACKENDS = ("score_multi", "shared")
+_ROUGE_N_RE = re.compile(r"rouge[0-9]$")
+_ZERO = scoring.Score(precision=0, recall=0, fmeasure=0)
+# Bounds are compared with this much slack so that float rounding can never prune a reference that ties the best.
+_EPS = 1e-12
+
+MultiRefStats = namedtuple("MultiRefStats", ["predictions", "references", "scored", "pruned"])
+
+
+def _overlap(counts, other):
+    if len(counts) > len(other):
+        counts, other = other, counts
+    return sum(min(count, other[key]) for key, count in counts.items())
+
+
+class _Text:
+    """Tokens of one text and the structures scoring derives from them, each built on first use."""
+
+    __slots__ = ("tokens", "sentences", "_ngrams", "_masks", "_sentence_masks", "_sentence_counts")
+
+    def __init__(self, tokens, sentences):
+        self.tokens = tokens
+        self.sentences = sentences
+        self._ngrams = {}
+        self._masks = None
+        self._sentence_masks = None
+        self._sentence_counts = None
+
+    def ngrams(self, n):
+        counts = self._ngrams.get(n)
+        if counts is None:
+            tokens = self.tokens
+            counts = self._ngrams[n] = collections.Counter(
+                tuple(tokens[i : i + n]) for i in range(len(tokens) - n + 1)
+            )
+        return counts
+
+    @property
+    def masks(self):
+        if self._masks is None:
+            self._masks = token_masks(self.tokens)
+        return self._masks
+
+    @property
+    def sentence_masks(self):
+        if self._sentence_masks is None:
+            self._sentence_masks = [token_masks(sentence) for sentence in self.sentences]
+        return self._sentence_masks
+
+    @property
+    def sentence_counts(self):
+        if self._sentence_counts is None:
+            self._sentence_counts = collections.Counter(token for sentence in self.sentences for token in sentence)
+        return self._sentence_counts
+
+
+def _score(overlap, prediction_count, target_count):
+    precision = overlap / prediction_count
+    recall = overlap / target_count
+    return scoring.Score(precision=precision, recall=recall, fmeasure=scoring.fmeasure(precision, recall))
+
+
+class MultiReferenceScorer(scoring.BaseScorer):
+    """`RougeScorer.score_multi` that tokenizes and counts the prediction once for all of its references.
+
+    Per rouge type, each reference first gets a cheap upper bound on its fmeasure: for rouge{n} the overlap can
+    not exceed the smaller n-gram count, for rougeL and rougeLsum not the unigram (multiset) overlap. References
+    are scored from the highest bound down, and once the best fmeasure exceeds every remaining bound the rest are
+    skipped. Scores, and the reference chosen on ties (the first with the best fmeasure), are identical to
+    `RougeScorer.score_multi`. LCS goes through the bit-parallel kernel with the prediction's bitsets built once.
+    """
+
+    def __init__(self, rouge_types, use_stemmer=False, split_summaries=False, tokenizer=None, prune=True):
+        for rouge_type in rouge_types:
+            if rouge_type not in ("rougeL", "rougeLsum") and not _ROUGE_N_RE.match(rouge_type):
+                raise ValueError("Invalid rouge type: %s" % rouge_type)
+            if _ROUGE_N_RE.match(rouge_type) and int(rouge_type[5:]) <= 0:
+                raise ValueError("rougen requires positive n: %s" % rouge_type)
+        self.rouge_types = rouge_types
+        self.prune = prune
+        self._tokenizer = tokenizer or DefaultTokenizer(use_stemmer)
+        if profiling_enabled():
+            self._tokenizer = TimedTokenizer(self._tokenizer)
+        self._split_summaries = split_summaries
+        self._needs_tokens = any(rouge_type != "rougeLsum" for rouge_type in rouge_types)
+        self._needs_sentences = "rougeLsum" in rouge_types
+        self.predictions = 0
+        self.references = 0
+        self.scored = 0
+        self.pruned = 0
+
+    def _sents(self, text):
+        if self._split_summaries:
+            import nltk
+
+            sents = nltk.sent_tokenize(text)
+        else:
+            sents = six.ensure_str(text).split("\n")
+        return [x for x in sents if len(x)]
+
+    def _prepare(self, text):
+        tokens = self._tokenizer.tokenize(text) if self._needs_tokens else None
+        sentences = [self._tokenizer.tokenize(s) for s in self._sents(text)] if self._needs_sentences else None
+        return _Text(tokens, sentences)
+
+    def _bound(self, rouge_type, target, prediction):
+        if rouge_type == "rougeL":
+            if not target.tokens or not prediction.tokens:
+                return 0.0
+            overlap = _overlap(target.ngrams(1), prediction.ngrams(1))
+            return _score(overlap, len(prediction.tokens), len(target.tokens)).fmeasure
+        if rouge_type == "rougeLsum":
+            m = sum(map(len, target.sentences))
+            n = sum(map(len, prediction.sentences))
+            if not m or not n:
+                return 0.0
+            return _score(_overlap(target.sentence_counts, prediction.sentence_counts), n, m).fmeasure
+        n = int(rouge_type[5:])
+        prediction_count = max(len(prediction.tokens) - n + 1, 0)
+        target_count = max(len(target.tokens) - n + 1, 0)
+        return _score(min(prediction_count, target_count), max(prediction_count, 1), max(target_count, 1)).fmeasure
+
+    def _exact(self, rouge_type, target, prediction):
+        if rouge_type == "rougeL":
+            if not target.tokens or not prediction.tokens:
+                return _ZERO
+            with span("rouge.lcs"):
+                length = lcs_length(target.tokens, prediction.tokens, prediction.masks)
+            return _score(length, len(prediction.tokens), len(target.tokens))
+        if rouge_type == "rougeLsum":
+            with span("rouge.lcs"):
+                return summary_level_lcs(target.sentences, prediction.sentences, prediction.sentence_masks)
+        n = int(rouge_type[5:])
+        with span("rouge.ngrams"):
+            target_ngrams = target.ngrams(n)
+            prediction_ngrams = prediction.ngrams(n)
+            overlap = sum(min(count, prediction_ngrams[ngram]) for ngram, count in target_ngrams.items())
+        return _score(overlap, max(sum(prediction_ngrams.values()), 1), max(sum(target_ngrams.values()), 1))
+
+    def score(self, target, prediction):
+        return self.score_multi([target], prediction)
+
+    def score_multi(self, targets, prediction, return_index=False):
+        """Best score per rouge type over `targets`; with `return_index` also {rouge_type: index of its target}."""
+        if not targets:
+            raise ValueError("score_multi needs at least one target")
+        self.predictions += 1
+        self.references += len(targets)
+        prepared = self._prepare(prediction)
+        references = [self._prepare(target) for target in targets]
+        result = {}
+        indices = {}
+        for rouge_type in self.rouge_types:
+            order = range(len(references))
+            bounds = None
+            if self.prune and len(references) > 1:
+                bounds = [self._bound(rouge_type, reference, prepared) for reference in references]
+                # Stable: equal bounds keep reference order.
+                order = sorted(order, key=lambda i: -bounds[i])
+            best, best_index = None, 0
+            for position, i in enumerate(order):
+                if best is not None and bounds is not None and bounds[i] < best.fmeasure - _EPS:
+                    # Bounds only decrease from here on.
+                    self.pruned += len(order) - position
+                    break
+                score = self._exact(rouge_type, references[i], prepared)
+                self.scored += 1
+                if best is None or score.fmeasure > best.fmeasure or (
+                    score.fmeasure == best.fmeasure and i < best_index
+                ):
+                    best, best_index = score, i
+            result[rouge_type] = best
+            indices[rouge_type] = best_index
+        return (result, indices) if return_index else result
+
+    def stats(self):
+        """`MultiRefStats`: predictions and references seen, (reference, rouge type) pairs scored and pruned."""
+        return MultiRefStats(self.predictions, self.references, self.scored, self.pruned)
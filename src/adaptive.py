@@ -0,0 +1,164 @@
+"""Adaptive evaluation: estimate dataset-level metric means from a random sample of rows, to a target precision.
+
+A release gate usually needs the dataset mean of a judge metric to within some margin, not every row's score.
+`run_adaptive` scores rows in randomized batches through `run_jobs` (so judge calls share its scheduler and
+cache). After each batch it recomputes every metric's mean and a normal-approximation confidence interval,
+and it stops as soon as every interval's half-width is at most `target`.
+
+Rows can carry tags (e.g. the source or topic of each question). The dataset is then sampled as strata: each
+batch draws from every tag in proportion to its share of the dataset, and the estimate is the stratified mean
+with its stratified variance. Strata that differ from each other but are uniform inside then need far fewer
+rows. Variances use the finite-population correction, so scoring the whole dataset gives a zero-width interval
+around the exact mean. Rows whose score is NaN count as scored but are left out of the estimate.
+"""
+
+import asyncio
+import math
+import random
+import statistics
+import time
+from collections import namedtuple
+
+from src.judge_scheduler import EvaluationJob, JudgeScheduler, arun_jobs, to_samples
+
+Estimate = namedtuple("Estimate", ["mean", "low", "high", "half_width", "rows"])
+AdaptiveResult = namedtuple(
+    "AdaptiveResult", ["estimates", "rows_scored", "total_rows", "converged", "elapsed", "scheduler"]
+)
+
+
+def _tags(dataset, tags, size):
+    if tags is None:
+        return [None] * size
+    if isinstance(tags, str):
+        # A column of the dataset; `to_samples` would drop it.
+        if isinstance(dataset, (list, tuple)):
+            return [row[tags] for row in dataset]
+        return list(dataset[tags])
+    tags = list(tags)
+    if len(tags) != size:
+        raise ValueError("tags must have one entry per row")
+    return tags
+
+
+def stratified_estimate(strata, confidence=0.95):
+    """`Estimate` of a population mean from per-stratum samples.
+
+    `strata` is a list of (population size, sampled scores) pairs. NaN scores are ignored. A stratum with one
+    valid score contributes no variance unless it has further unsampled rows, in which case the interval is
+    unbounded: one value says nothing about the spread.
+    """
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    total = sum(size for size, scores in strata if any(not math.isnan(score) for score in scores))
+    if not total:
+        return Estimate(math.nan, math.nan, math.nan, math.inf, 0)
+    mean = 0.0
+    variance = 0.0
+    rows = 0
+    for size, scores in strata:
+        values = [score for score in scores if not math.isnan(score)]
+        if not values:
+            continue
+        weight = size / total
+        mean += weight * statistics.fmean(values)
+        rows += len(values)
+        # Sampled NaN rows are treated as missing at random, so `size` shrinks with them.
+        remaining = size * len(values) / len(scores) - len(values)
+        if remaining <= 0:
+            continue
+        if len(values) < 2:
+            variance = math.inf
+            continue
+        correction = remaining / (size * len(values) / len(scores))
+        variance += weight**2 * statistics.variance(values) / len(values) * correction
+    half_width = z * math.sqrt(variance)
+    return Estimate(mean, mean - half_width, mean + half_width, half_width, rows)
+
+
+async def arun_adaptive(
+    dataset,
+    metrics,
+    target=0.01,
+    confidence=0.95,
+    batch_size=64,
+    min_rows=30,
+    max_rows=None,
+    tags=None,
+    seed=None,
+    scheduler=None,
+    **kwargs,
+):
+    """Scores random rows of `dataset` until every metric's mean is known to within `target`.
+
+    Returns an `AdaptiveResult`. `estimates` maps each metric name to an `Estimate` at the given `confidence`.
+    `rows_scored` counts the rows that were scored, and `converged` says whether the target was reached
+    before running out of rows or hitting `max_rows`. `scheduler` holds the `SchedulerStats` of the judge calls
+    made through the scheduler. `tags` is a list with one label per row, or the name of a column of `dataset`.
+    At least `min_rows` rows are scored, and two from each tag where it has them, before the estimates are trusted.
+    Other keyword arguments (llm=, cache=, ...) go to `arun_jobs`.
+    """
+    if target <= 0 or batch_size <= 0:
+        raise ValueError("target and batch_size must be positive")
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    start = time.perf_counter()
+    samples = to_samples(dataset)
+    labels = _tags(dataset, tags, len(samples))
+    limit = len(samples) if max_rows is None else min(max_rows, len(samples))
+    scheduler = scheduler or JudgeScheduler()
+    rng = random.Random(seed)
+
+    strata = {}
+    for i, label in enumerate(labels):
+        strata.setdefault(label, []).append(i)
+    for rows in strata.values():
+        rng.shuffle(rows)
+    drawn = {label: 0 for label in strata}
+    scores = {metric.name: {label: [] for label in strata} for metric in metrics}
+
+    def estimates():
+        return {
+            name: stratified_estimate([(len(strata[label]), by_label[label]) for label in strata], confidence)
+            for name, by_label in scores.items()
+        }
+
+    scored = 0
+    current = estimates()
+    converged = False
+    while scored < limit:
+        # Proportional allocation: every stratum is drawn up to its share of the rows scored after this batch.
+        # Rounding up can overshoot the batch; the overshoot is taken back from randomly chosen strata, but never
+        # below two rows per stratum. Each stratum's rows are always taken from the front of its shuffled order.
+        goal = min(scored + batch_size, limit)
+        takes = {}
+        spare = []
+        for label, rows in strata.items():
+            share = min(max(min(2, len(rows)), math.ceil(goal * len(rows) / len(samples))), len(rows))
+            takes[label] = max(share - drawn[label], 0)
+            minimum = max(min(2, len(rows)) - drawn[label], 0)
+            spare.extend([label] * max(takes[label] - minimum, 0))
+        rng.shuffle(spare)
+        for label in spare[: max(sum(takes.values()) - (goal - scored), 0)]:
+            takes[label] -= 1
+        batch = []
+        for label, rows in strata.items():
+            batch.extend((label, i) for i in rows[drawn[label] : drawn[label] + takes[label]])
+            drawn[label] += takes[label]
+
+        result = await arun_jobs(
+            [EvaluationJob("adaptive", [samples[i] for _, i in batch], metrics)], scheduler=scheduler, **kwargs
+        )
+        for name, values in result.results["adaptive"].scores.items():
+            for (label, _), value in zip(batch, values):
+                scores[name][label].append(math.nan if value is None else float(value))
+        scored += len(batch)
+        current = estimates()
+        if scored >= min(min_rows, limit) and all(e.half_width <= target for e in current.values()):
+            converged = True
+            break
+    return AdaptiveResult(current, scored, len(samples), converged, time.perf_counter() - start, scheduler.stats())
+
+
+def run_adaptive(dataset, metrics, **kwargs):
+    """Synchronous entry point: runs `arun_adaptive` on a single event loop."""
+    return asyncio.run(arun_adaptive(dataset, metrics, **kwargs))
@@ -0,0 +1,223 @@
+"""Evaluation inputs stored as Arrow IPC or Parquet files, with every distinct context stored once.
+
+`convert` writes question/answer/contexts/reference rows to a dataset file one batch at a time. The input can be
+a dict of columns, a list of rows, or a .parquet/.arrow file with plain context lists. The dataset file keeps
+`user_input`, `response` and `reference` strings and a `context_ids` list per row. Each id indexes
+`<path>.contexts.arrow`, a pool that holds every distinct context once, so a retrieval log where the same
+passages come back for many questions stores each passage a single time.
+
+`RagDataset` opens a converted dataset, or a raw file whose `contexts` column holds the strings themselves.
+`.arrow` files and the context pool are memory-mapped, and Parquet files are decoded one row group at a time.
+`iter_samples` yields `SingleTurnSample` lists of `batch_size` rows, so only the batch being scored exists as
+Python objects. `evaluate_dataset` scores a dataset batch by batch through `run_jobs`, so all judge calls go
+through one scheduler. It can stream the per-row scores to a `ScoreWriter`.
+
+Convert from the repository root with `python -m src.arrow_dataset logs.parquet dataset.arrow`.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import math
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from ragas.dataset_schema import SingleTurnSample
+
+from src.columnar import ScoreWriter, read_scores
+from src.judge_scheduler import _V1_COLUMNS, EvaluationJob, JudgeScheduler, arun_jobs
+
+ConversionStats = namedtuple("ConversionStats", ["rows", "contexts", "unique_contexts"])
+DatasetResult = namedtuple("DatasetResult", ["rows", "aggregates", "elapsed", "stats"])
+
+CONTEXTS_SUFFIX = ".contexts.arrow"
+TEXT_FIELDS = ("user_input", "response", "reference")
+SCHEMA = pa.schema(
+    [
+        ("user_input", pa.string()),
+        ("response", pa.string()),
+        ("reference", pa.string()),
+        ("context_ids", pa.list_(pa.int32())),
+    ]
+)
+
+
+def _field(column):
+    return _V1_COLUMNS.get(column, column)
+
+
+def _iter_file(path, batch_size):
+    if os.path.splitext(path)[1].lower() == ".parquet":
+        yield from pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=batch_size)
+    else:
+        yield from read_scores(path).to_batches(max_chunksize=batch_size)
+
+
+def _iter_columns(source, batch_size):
+    # Yields {field: list} batches of at most `batch_size` rows, with legacy column names mapped to fields.
+    if isinstance(source, str):
+        for batch in _iter_file(source, batch_size):
+            yield {_field(name): column.to_pylist() for name, column in zip(batch.schema.names, batch.columns)}
+        return
+    if isinstance(source, dict):
+        columns = {_field(name): list(values) for name, values in source.items()}
+        size = len(next(iter(columns.values()), []))
+        for start in range(0, size, batch_size):
+            yield {name: values[start : start + batch_size] for name, values in columns.items()}
+        return
+    rows = list(source)
+    for start in range(0, len(rows), batch_size):
+        chunk = [
+            row.to_dict() if isinstance(row, SingleTurnSample) else row for row in rows[start : start + batch_size]
+        ]
+        yield {_field(name): [row.get(name) for row in chunk] for name in chunk[0]}
+
+
+def _context_key(text):
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+def convert(source, path, batch_size=10_000, row_group_size=65_536):
+    """Writes `source` as a dataset at `path` (.arrow or .parquet) plus its context pool; returns `ConversionStats`.
+
+    `source` is a dict of columns, a list of rows or samples, or the path of a .parquet/.arrow file. Legacy column
+    names (question, answer, contexts, ground_truth) are accepted. The pool maps each distinct context to its id
+    through a 20-byte digest, so conversion memory grows with the number of distinct contexts, not their size.
+    """
+    ids = {}
+    rows = 0
+    contexts = 0
+    writer = ScoreWriter(path, row_group_size=row_group_size)
+    pool = ScoreWriter(path + CONTEXTS_SUFFIX, row_group_size=row_group_size)
+    with writer, pool:
+        for columns in _iter_columns(source, batch_size):
+            size = len(next(iter(columns.values())))
+            new = []
+            context_ids = []
+            for row_contexts in columns.get("retrieved_contexts") or [None] * size:
+                if row_contexts is None:
+                    context_ids.append(None)
+                    continue
+                row_ids = []
+                for text in row_contexts:
+                    key = _context_key(text)
+                    if key not in ids:
+                        ids[key] = len(ids)
+                        new.append(text)
+                    row_ids.append(ids[key])
+                context_ids.append(row_ids)
+                contexts += len(row_ids)
+            table = {field: columns.get(field) or [None] * size for field in TEXT_FIELDS}
+            table["context_ids"] = context_ids
+            writer.write(pa.Table.from_pydict(table, schema=SCHEMA))
+            if new:
+                pool.write({"context": pa.array(new, type=pa.string())})
+            rows += size
+        if not ids:
+            pool.write({"context": pa.array([], type=pa.string())})
+    return ConversionStats(rows, contexts, len(ids))
+
+
+class RagDataset:
+    """Rows of a dataset file, read a batch at a time.
+
+    `path` is a file written by `convert`, or any .parquet/.arrow file with (legacy or sample) question, answer,
+    contexts and reference columns, whose contexts are read as they are.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        pool_path = path + CONTEXTS_SUFFIX
+        self.contexts = read_scores(pool_path).column("context") if os.path.exists(pool_path) else None
+        if os.path.splitext(path)[1].lower() == ".parquet":
+            self._parquet = pq.ParquetFile(path, memory_map=True)
+            self._table = None
+            self.num_rows = self._parquet.metadata.num_rows
+        else:
+            self._parquet = None
+            self._table = read_scores(path)
+            self.num_rows = self._table.num_rows
+
+    def __len__(self):
+        return self.num_rows
+
+    def _batches(self, batch_size):
+        if self._parquet is not None:
+            return self._parquet.iter_batches(batch_size=batch_size)
+        return self._table.to_batches(max_chunksize=batch_size)
+
+    def _resolve(self, context_ids):
+        # One vectorized `take` from the pool for the whole batch, then split back into rows.
+        lengths = pc.list_value_length(context_ids).fill_null(0).to_numpy()
+        texts = self.contexts.take(pc.list_flatten(context_ids)).to_pylist()
+        bounds = np.concatenate([[0], np.cumsum(lengths)])
+        valid = context_ids.is_valid().to_numpy(zero_copy_only=False)
+        return [texts[bounds[i] : bounds[i + 1]] if valid[i] else None for i in range(len(context_ids))]
+
+    def iter_samples(self, batch_size=1024):
+        """Yields lists of at most `batch_size` `SingleTurnSample`s, in row order."""
+        for batch in self._batches(batch_size):
+            names = batch.schema.names
+            columns = {}
+            for name, column in zip(names, batch.columns):
+                field = _field(name)
+                if field == "context_ids" and self.contexts is not None:
+                    columns["retrieved_contexts"] = self._resolve(column)
+                elif field in SingleTurnSample.model_fields:
+                    columns.setdefault(field, column.to_pylist())
+            yield [SingleTurnSample(**dict(zip(columns, values))) for values in zip(*columns.values())]
+
+
+async def aevaluate_dataset(dataset, metrics, batch_size=1024, writer=None, scheduler=None, **kwargs):
+    """Scores every row of `dataset` (a `RagDataset`) with `metrics`, one batch at a time; returns a `DatasetResult`.
+
+    Each batch goes through `arun_jobs` (remaining keyword arguments are passed on) with one shared scheduler.
+    `aggregates` holds the NaN-ignoring mean of each metric over all rows and `stats` the scheduler's
+    `SchedulerStats`. With a `writer` (a `ScoreWriter`) each batch's per-row scores are written to it.
+    """
+    scheduler = scheduler or JudgeScheduler()
+    sums = {metric.name: 0.0 for metric in metrics}
+    counts = {metric.name: 0 for metric in metrics}
+    rows = 0
+    start = time.perf_counter()
+    for index, samples in enumerate(dataset.iter_samples(batch_size)):
+        result = await arun_jobs([EvaluationJob(index, samples, metrics)], scheduler=scheduler, **kwargs)
+        batch = result.results[index]
+        if writer is not None:
+            writer.write(batch)
+        for name, scores in batch.scores.items():
+            values = np.asarray(scores, dtype=np.float64)
+            values = values[~np.isnan(values)]
+            sums[name] += float(values.sum())
+            counts[name] += len(values)
+        rows += len(samples)
+    aggregates = {name: sums[name] / counts[name] if counts[name] else math.nan for name in sums}
+    return DatasetResult(rows, aggregates, time.perf_counter() - start, scheduler.stats())
+
+
+def evaluate_dataset(dataset, metrics, **kwargs):
+    """Synchronous entry point: runs `aevaluate_dataset` on a single event loop."""
+    return asyncio.run(aevaluate_dataset(dataset, metrics, **kwargs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help=".parquet or .arrow file with question/answer/contexts/reference columns")
+    parser.add_argument("output", help=".arrow (memory-mapped) or .parquet dataset to write")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    stats = convert(args.source, args.output, batch_size=args.batch_size)
+    print(
+        f"{stats.rows} rows with {stats.contexts} contexts written to {args.output}; "
+        f"{stats.unique_contexts} distinct contexts stored in {args.output + CONTEXTS_SUFFIX}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Batch scoring of ragas single-turn samples on one event loop.
+
+Every (metric, sample) pair is awaited concurrently with `asyncio.gather` under a semaphore, and each metric
+instance is shared by all samples instead of being rebuilt per sample with its own `asyncio.run`.
+"""
+
+import asyncio
+import math
+import time
+from collections import namedtuple
+
+BatchResult = namedtuple("BatchResult", ["scores", "elapsed", "samples_per_second"])
+
+
+async def ascore_samples(samples, metrics, max_concurrency=64, timeout=None, raise_exceptions=True):
+    """Scores every sample with every metric and returns a `BatchResult`.
+
+    `scores` maps each metric's name to its scores in sample order. With `raise_exceptions=False` a failed
+    score becomes NaN instead of aborting the batch, like `ragas.evaluate`.
+    """
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency must be positive")
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def score(metric, sample):
+        async with semaphore:
+            try:
+                return await metric.single_turn_ascore(sample, timeout=timeout)
+            except Exception:
+                if raise_exceptions:
+                    raise
+                return math.nan
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(score(metric, sample) for metric in metrics for sample in samples))
+    elapsed = time.perf_counter() - start
+
+    scores = {metric.name: results[i * len(samples) : (i + 1) * len(samples)] for i, metric in enumerate(metrics)}
+    return BatchResult(scores, elapsed, len(samples) / elapsed if elapsed > 0 else math.inf)
+
+
+def score_samples(samples, metrics, max_concurrency=64, timeout=None, raise_exceptions=True):
+    """Synchronous entry point: runs `ascore_samples` on a single event loop."""
+    return asyncio.run(
+        ascore_samples(
+            samples, metrics, max_concurrency=max_concurrency, timeout=timeout, raise_exceptions=raise_exceptions
+        )
+    )
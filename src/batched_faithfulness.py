@@ -0,0 +1,185 @@
+"""Faithfulness scoring that packs several rows into each judge request.
+
+ragas' `Faithfulness` sends two prompts per row: statement extraction, then verification of those statements
+against the row's contexts. `BatchedFaithfulness` sends each step once per batch of `batch_size` rows, as a
+single structured request whose response holds one result per row. A batch whose response does not parse, or
+does not hold exactly one result per row, is scored again with the metric's own per-row prompts; any other judge
+error (authentication, quota, network) is raised. `stats()` reports how many judge requests were sent and how
+many round trips a per-row run would have needed.
+"""
+
+import asyncio
+import math
+import time
+import typing as t
+from collections import namedtuple
+
+from pydantic import BaseModel, Field
+from ragas.exceptions import RagasOutputParserException
+from ragas.metrics import Faithfulness
+from ragas.metrics._faithfulness import (
+    NLIStatementInput,
+    NLIStatementOutput,
+    NLIStatementPrompt,
+    StatementGeneratorInput,
+    StatementGeneratorOutput,
+    StatementGeneratorPrompt,
+)
+from ragas.prompt import PydanticPrompt
+
+from src.batch_scoring import BatchResult
+from src.judge_scheduler import to_samples
+
+BatchedJudgeStats = namedtuple("BatchedJudgeStats", ["rows", "requests", "per_row_requests", "saved", "fallbacks"])
+
+_BATCH_INSTRUCTION = (
+    "The input holds several independent rows. Perform the task below on each row separately and return "
+    "exactly one result per input row, in the same order as the rows.\n\n"
+)
+
+
+class BatchedStatementInput(BaseModel):
+    rows: t.List[StatementGeneratorInput] = Field(description="The rows to break into statements")
+
+
+class BatchedStatementOutput(BaseModel):
+    rows: t.List[StatementGeneratorOutput] = Field(description="The statements of each row, in row order")
+
+
+class BatchedNLIInput(BaseModel):
+    rows: t.List[NLIStatementInput] = Field(description="The rows whose statements are to be judged")
+
+
+class BatchedNLIOutput(BaseModel):
+    rows: t.List[NLIStatementOutput] = Field(description="The verdicts of each row, in row order")
+
+
+def _batched_examples(examples, input_model, output_model):
+    # All of the single-row examples, shown as one multi-row example.
+    return [
+        (
+            input_model(rows=[example_input for example_input, _ in examples]),
+            output_model(rows=[example_output for _, example_output in examples]),
+        )
+    ]
+
+
+class BatchedStatementPrompt(PydanticPrompt[BatchedStatementInput, BatchedStatementOutput]):
+    instruction = _BATCH_INSTRUCTION + StatementGeneratorPrompt.instruction
+    input_model = BatchedStatementInput
+    output_model = BatchedStatementOutput
+    examples = _batched_examples(StatementGeneratorPrompt.examples, BatchedStatementInput, BatchedStatementOutput)
+
+
+class BatchedNLIPrompt(PydanticPrompt[BatchedNLIInput, BatchedNLIOutput]):
+    instruction = _BATCH_INSTRUCTION + NLIStatementPrompt.instruction
+    input_model = BatchedNLIInput
+    output_model = BatchedNLIOutput
+    examples = _batched_examples(NLIStatementPrompt.examples, BatchedNLIInput, BatchedNLIOutput)
+
+
+class BatchedFaithfulness:
+    """Scores samples with `metric` (a `Faithfulness` with its `llm` set), `batch_size` rows per judge request.
+
+    Batches are sent concurrently, at most `max_concurrency` at a time. A malformed batched response is not
+    sent back to the model for fixing; its rows fall back to `metric`'s per-row prompts, which are. Rows
+    without statements score NaN, as with `Faithfulness`.
+    """
+
+    def __init__(self, metric=None, batch_size=8, max_concurrency=8):
+        if batch_size <= 0 or max_concurrency <= 0:
+            raise ValueError("batch_size and max_concurrency must be positive")
+        self.metric = metric or Faithfulness()
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.statement_prompt = BatchedStatementPrompt()
+        self.nli_prompt = BatchedNLIPrompt()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.rows = 0
+        self.requests = 0
+        self.per_row_requests = 0
+        self.fallbacks = 0
+
+    def stats(self):
+        return BatchedJudgeStats(
+            rows=self.rows,
+            requests=self.requests,
+            per_row_requests=self.per_row_requests,
+            saved=self.per_row_requests - self.requests,
+            fallbacks=self.fallbacks,
+        )
+
+    async def _batched(self, prompt, data, expected):
+        # One request for the whole batch; None when its response cannot be split back into `expected` rows.
+        self.requests += 1
+        try:
+            output = await prompt.generate(llm=self.metric.llm, data=data, retries_left=0)
+        except RagasOutputParserException:
+            return None
+        return output.rows if len(output.rows) == expected else None
+
+    async def _statements(self, rows):
+        data = BatchedStatementInput(
+            rows=[StatementGeneratorInput(question=row["user_input"], answer=row["response"]) for row in rows]
+        )
+        results = await self._batched(self.statement_prompt, data, len(rows))
+        if results is None:
+            self.fallbacks += 1
+            self.requests += len(rows)
+            results = await asyncio.gather(*(self.metric._create_statements(row, None) for row in rows))
+        return [result.statements for result in results]
+
+    async def _verdicts(self, rows, statements):
+        data = BatchedNLIInput(
+            rows=[
+                NLIStatementInput(context="\n".join(row["retrieved_contexts"]), statements=row_statements)
+                for row, row_statements in zip(rows, statements)
+            ]
+        )
+        results = await self._batched(self.nli_prompt, data, len(rows))
+        if results is None:
+            self.fallbacks += 1
+            self.requests += len(rows)
+            results = await asyncio.gather(
+                *(self.metric._create_verdicts(row, row_statements, None) for row, row_statements in zip(rows, statements))
+            )
+        return results
+
+    async def _score_batch(self, rows):
+        statements = await self._statements(rows)
+        judged = [i for i, row_statements in enumerate(statements) if row_statements]
+        scores = [math.nan] * len(rows)
+        if judged:
+            verdicts = await self._verdicts([rows[i] for i in judged], [statements[i] for i in judged])
+            for i, row_verdicts in zip(judged, verdicts):
+                scores[i] = self.metric._compute_score(row_verdicts)
+        # A per-row run sends one extraction prompt per row and one verification prompt per row with statements.
+        self.rows += len(rows)
+        self.per_row_requests += len(rows) + len(judged)
+        return scores
+
+    async def ascore_samples(self, samples):
+        """Scores `samples` (anything `to_samples` accepts) and returns a `BatchResult`."""
+        if self.metric.llm is None:
+            raise ValueError("metric.llm must be set to compute faithfulness")
+        rows = [sample.to_dict() for sample in to_samples(samples)]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def score(batch):
+            async with semaphore:
+                return await self._score_batch(batch)
+
+        start = time.perf_counter()
+        batches = await asyncio.gather(
+            *(score(rows[i : i + self.batch_size]) for i in range(0, len(rows), self.batch_size))
+        )
+        elapsed = time.perf_counter() - start
+
+        scores = [score for batch in batches for score in batch]
+        return BatchResult({self.metric.name: scores}, elapsed, len(rows) / elapsed if elapsed > 0 else math.inf)
+
+    def score_samples(self, samples):
+        """Synchronous entry point: runs `ascore_samples` on a single event loop."""
+        return asyncio.run(self.ascore_samples(samples))
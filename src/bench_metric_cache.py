@@ -0,0 +1,58 @@
+"""Microbenchmark of cold vs. warm `rouge()` calls through the metric cache.
+
+Run from the repository root with `python -m src.bench_metric_cache`.
+"""
+
+import argparse
+import statistics
+import time
+
+import evaluate
+
+from src.metric_cache import compute_rouge, metric_cache, scorer_cache
+
+REFERENCES = ["The quick brown fox jumps over the lazy dog in the field."]
+PREDICTIONS = ["A fox jumps over a dog in the field, quickly."]
+
+
+def timed(func, repeats):
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def uncached(use_aggregator):
+    metric = evaluate.load("rouge")
+    return metric.compute(predictions=PREDICTIONS, references=REFERENCES, use_aggregator=use_aggregator)
+
+
+def cold(use_aggregator):
+    metric_cache.clear()
+    scorer_cache.clear()
+    return compute_rouge(PREDICTIONS, REFERENCES, use_aggregator=use_aggregator)
+
+
+def warm(use_aggregator):
+    return compute_rouge(PREDICTIONS, REFERENCES, use_aggregator=use_aggregator)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    # Bootstrap aggregation is part of the scoring work and dominates a single-pair call, so both modes are shown.
+    for use_aggregator in (False, True):
+        print(f"use_aggregator={use_aggregator}")
+        results = {}
+        for name, func in [("uncached", uncached), ("cold", cold), ("warm", warm)]:
+            results[name] = timed(lambda: func(use_aggregator), args.repeats)
+            print(f"{name:>9}: {results[name] * 1000:8.2f} ms (median of {args.repeats})")
+        print(f"warm speedup vs. evaluate.load per call: {results['uncached'] / results['warm']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Benchmarks the bit-parallel LCS backend against rouge_score's DP table as documents grow.
+
+Run from the repository root with `python -m src.bench_rouge_lcs`.
+"""
+
+import argparse
+import random
+import time
+
+from rouge.rouge_lcs import make_scorer
+
+WORDS = "the cat sat on a mat dog ran over lazy fox quick brown jumps and of to in is it".split()
+
+
+def make_document(rng, num_tokens, tokens_per_sentence=25):
+    tokens = [rng.choice(WORDS) for _ in range(num_tokens)]
+    sentences = [tokens[i : i + tokens_per_sentence] for i in range(0, num_tokens, tokens_per_sentence)]
+    return "\n".join(" ".join(sentence) for sentence in sentences)
+
+
+def time_backend(lcs_backend, rouge_type, pairs):
+    scorer = make_scorer([rouge_type], lcs_backend=lcs_backend)
+    start = time.perf_counter()
+    for reference, prediction in pairs:
+        scorer.score(reference, prediction)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[25, 50, 100, 200, 400, 800])
+    parser.add_argument("--pairs", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'tokens':>8} {'type':>10} {'table (s)':>10} {'bitparallel (s)':>16} {'speedup':>8}")
+    for length in args.lengths:
+        pairs = [(make_document(rng, length), make_document(rng, length)) for _ in range(args.pairs)]
+        for rouge_type in ("rougeL", "rougeLsum"):
+            table = time_backend("table", rouge_type, pairs)
+            bitparallel = time_backend("bitparallel", rouge_type, pairs)
+            print(f"{length:>8} {rouge_type:>10} {table:>10.4f} {bitparallel:>16.4f} {table / bitparallel:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
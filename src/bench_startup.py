@@ -0,0 +1,72 @@
+"""Benchmarks cold-start import time of each scoring entry point.
+
+Every entry point is imported in a fresh interpreter with `python -X importtime`, a few times over, and the
+median of the cumulative import time is reported with the slowest top-level imports it pulled in. The last
+column shows whether NLTK was imported.
+
+Run from the repository root with `python -m src.bench_startup`.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = [
+    "rouge.rouge",
+    "rouge.rouge_batched",
+    "rouge.rouge_lcs",
+    "src.bleu_stats",
+    "src.token_cache",
+    "src.lexical",
+    "src.streaming",
+    "src.metric_cache",
+    "src.batch_scoring",
+    "src.llm_cache",
+    "src.judge_scheduler",
+    "src.batched_faithfulness",
+]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(module):
+    """Imports `module` in a new interpreter; returns [(cumulative seconds, depth, name)] in import order."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in process.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            rows.append((int(match.group(2)) / 1e6, len(match.group(3)) // 2, match.group(4)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=ENTRY_POINTS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=3, help="slowest direct imports to list per entry point")
+    args = parser.parse_args()
+
+    print(f"{'entry point':<28} {'import (s)':>10} {'nltk':>5}  slowest imports")
+    for module in args.modules:
+        runs = [import_times(module) for _ in range(args.repeat)]
+        total = statistics.median(run[-1][0] for run in runs)
+        last = runs[-1]
+        direct = sorted((row for row in last if row[1] == 1), reverse=True)[: args.top]
+        nltk = "yes" if any(name == "nltk" for _, _, name in last) else "no"
+        slowest = ", ".join(f"{name} {seconds:.2f}" for seconds, _, name in direct)
+        print(f"{module:<28} {total:>10.3f} {nltk:>5}  {slowest}")
+
+
+if __name__ == "__main__":
+    main()
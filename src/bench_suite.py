@@ -0,0 +1,375 @@
+"""Benchmark suite for every metric path, with a stored baseline to catch performance regressions.
+
+Each case scores a synthetic corpus of `--size` rows in batches of `--batch-size` rows and records the
+throughput (rows per second), the p50 and p99 latency of one batch, and the peak resident set size. Cases run in
+their own interpreter by default so that one case's imports and allocations do not inflate another's peak RSS.
+
+Cases:
+    rouge-*           `Rouge._compute` of the local rouge metric, with and without the aggregator, with one or
+                      several references per prediction, and with the Porter stemmer on or off; the
+                      `-shared` variants use `multi_ref_backend="shared"`
+    nltk-sentence-bleu  NLTK `sentence_bleu` row by row (whitespace tokens, method1 smoothing)
+    sacrebleu-corpus  sacrebleu `corpus_bleu` over each batch
+    ragas-bleu        ragas `BleuScore.single_turn_ascore` row by row on one event loop
+    ragas-evaluate    the ragas `evaluate` pipeline with Faithfulness judged by `FakeChatModel`
+
+Results are written as JSON next to output.json (bench_results.json) and compared with bench_baseline.json when
+it exists; a case whose throughput, latency or peak RSS is worse than the baseline by more than `--threshold`
+(a fraction) is reported, and the exit status is 1. Record a baseline on the reference machine with
+`--save-baseline`. Timings are only comparable on the same hardware and software, so each results document
+records its environment (CPU, Python, and the numpy, rouge_score, sacrebleu, nltk and ragas versions), and the
+comparison warns about every field where the baseline's environment differs from the current one.
+
+Run from the repository root with `python -m src.bench_suite`.
+"""
+
+import argparse
+import asyncio
+import importlib.metadata
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from src.bench_startup import ROOT
+
+RESULTS_PATH = os.path.join(ROOT, "bench_results.json")
+BASELINE_PATH = os.path.join(ROOT, "bench_baseline.json")
+ROUGE_DIR = os.path.join(ROOT, "rouge")
+# Libraries whose version changes the timings.
+VERSIONED_PACKAGES = ("numpy", "rouge_score", "sacrebleu", "nltk", "ragas")
+
+WORDS = (
+    "the a cat dog fox sat ran jumps over under lazy quick brown mat field river city capital of in on and is was "
+    "painted wrote running runs walked walking paris france tokyo japan river mountains"
+).split()
+
+Case = namedtuple("Case", ["name", "multi_ref", "setup"])
+CaseResult = namedtuple("CaseResult", ["rows", "batches", "rows_per_second", "p50_ms", "p99_ms", "peak_rss_mb"])
+Regression = namedtuple("Regression", ["case", "field", "baseline", "current", "change"])
+
+# Field -> +1 when a larger value is better, -1 when a smaller one is.
+_DIRECTIONS = {"rows_per_second": 1, "p50_ms": -1, "p99_ms": -1, "peak_rss_mb": -1}
+
+
+def make_corpus(size, refs_per_row=1, seed=0, min_words=8, max_words=40):
+    """`size` predictions and their references; references are lists when `refs_per_row` > 1.
+
+    Each reference shares roughly half of its prediction's words, so every n-gram order has some overlap.
+    """
+    rng = random.Random(seed)
+
+    def sentence():
+        return [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+
+    predictions, references = [], []
+    for _ in range(size):
+        prediction = sentence()
+        refs = []
+        for _ in range(refs_per_row):
+            reference = [word if rng.random() < 0.5 else rng.choice(WORDS) for word in prediction]
+            refs.append(" ".join(reference + sentence()[: rng.randint(0, 5)]))
+        predictions.append(" ".join(prediction))
+        references.append(refs if refs_per_row > 1 else refs[0])
+    return predictions, references
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB, or None where `resource` is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _rouge(use_aggregator, use_stemmer, multi_ref_backend="score_multi"):
+    def setup():
+        from src.metric_cache import load_metric
+
+        metric = load_metric(ROUGE_DIR)
+
+        def run(predictions, references):
+            return metric._compute(
+                predictions,
+                references,
+                use_aggregator=use_aggregator,
+                use_stemmer=use_stemmer,
+                multi_ref_backend=multi_ref_backend,
+            )
+
+        return run
+
+    return setup
+
+
+def _nltk_sentence_bleu():
+    from nltk.translate.bleu_score import SmoothingFunction, sentence_bleu
+
+    smoothing = SmoothingFunction().method1
+
+    def run(predictions, references):
+        return [
+            sentence_bleu([reference.split()], prediction.split(), smoothing_function=smoothing)
+            for prediction, reference in zip(predictions, references)
+        ]
+
+    return run
+
+
+def _sacrebleu_corpus():
+    from sacrebleu import corpus_bleu
+
+    def run(predictions, references):
+        return corpus_bleu(predictions, [references]).score
+
+    return run
+
+
+def _ragas_bleu():
+    from ragas import SingleTurnSample
+    from ragas.metrics import BleuScore
+
+    metric = BleuScore()
+    loop = asyncio.new_event_loop()
+
+    async def score(samples):
+        return await asyncio.gather(*(metric.single_turn_ascore(sample) for sample in samples))
+
+    def run(predictions, references):
+        return loop.run_until_complete(
+            score([SingleTurnSample(response=p, reference=r) for p, r in zip(predictions, references)])
+        )
+
+    return run
+
+
+def _ragas_evaluate():
+    from ragas import EvaluationDataset, evaluate
+    from ragas.llms import LangchainLLMWrapper
+    from ragas.metrics import Faithfulness
+
+    from src.fake_llm import FakeChatModel, faithfulness_responder
+
+    llm = LangchainLLMWrapper(FakeChatModel(responder=faithfulness_responder))
+
+    def run(predictions, references):
+        dataset = EvaluationDataset.from_list(
+            [
+                {"user_input": "Summarize the text.", "response": p, "retrieved_contexts": [r], "reference": r}
+                for p, r in zip(predictions, references)
+            ]
+        )
+        return evaluate(dataset, metrics=[Faithfulness()], llm=llm, show_progress=False, raise_exceptions=True)
+
+    return run
+
+
+CASES = [
+    Case(f"rouge-{agg}-{refs}-{stem}", refs == "multi", _rouge(agg == "agg", stem == "stem"))
+    for agg in ("agg", "noagg")
+    for refs in ("single", "multi")
+    for stem in ("stem", "nostem")
+] + [
+    Case(f"rouge-{agg}-multi-shared", True, _rouge(agg == "agg", True, multi_ref_backend="shared"))
+    for agg in ("agg", "noagg")
+] + [
+    Case("nltk-sentence-bleu", False, _nltk_sentence_bleu),
+    Case("sacrebleu-corpus", False, _sacrebleu_corpus),
+    Case("ragas-bleu", False, _ragas_bleu),
+    Case("ragas-evaluate", False, _ragas_evaluate),
+]
+CASES_BY_NAME = {case.name: case for case in CASES}
+
+
+def run_case(name, size=512, batch_size=32, refs_per_row=3, repeats=1, seed=0):
+    """Runs case `name` in this process and returns a `CaseResult`."""
+    case = CASES_BY_NAME[name]
+    predictions, references = make_corpus(size, refs_per_row if case.multi_ref else 1, seed=seed)
+    run = case.setup()
+    # One untimed batch pays for lazy imports and first-call caches.
+    run(predictions[:batch_size], references[:batch_size])
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for i in range(0, size, batch_size):
+            batch_start = time.perf_counter()
+            run(predictions[i : i + batch_size], references[i : i + batch_size])
+            latencies.append(time.perf_counter() - batch_start)
+    elapsed = time.perf_counter() - start
+    return CaseResult(
+        rows=size * repeats,
+        batches=len(latencies),
+        rows_per_second=size * repeats / elapsed,
+        p50_ms=float(np.percentile(latencies, 50)) * 1000,
+        p99_ms=float(np.percentile(latencies, 99)) * 1000,
+        peak_rss_mb=peak_rss_mb(),
+    )
+
+
+def _run_isolated(name, config):
+    args = [f"--{key.replace('_', '-')}={value}" for key, value in config.items()]
+    process = subprocess.run(
+        [sys.executable, "-m", "src.bench_suite", "--child", name, *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return CaseResult(**json.loads(process.stdout.strip().splitlines()[-1]))
+
+
+def _cpu_model():
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def _version(package):
+    try:
+        return importlib.metadata.version(package)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def environment():
+    """The hardware and software a run's timings depend on, as a flat dict."""
+    return {
+        "cpu": _cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        **{package: _version(package) for package in VERSIONED_PACKAGES},
+    }
+
+
+def environment_differences(current, baseline):
+    """{field: (baseline value, current value)} for every environment field the two documents disagree on."""
+    old, new = baseline.get("environment", {}), current.get("environment", {})
+    return {key: (old.get(key), new.get(key)) for key in sorted(set(old) | set(new)) if old.get(key) != new.get(key)}
+
+
+def run_suite(names=None, isolate=True, **config):
+    """Runs the cases in `names` (all by default) and returns the results document written to JSON."""
+    results = {}
+    for name in names or list(CASES_BY_NAME):
+        result = _run_isolated(name, config) if isolate else run_case(name, **config)
+        results[name] = result._asdict()
+    return {
+        "created": time.time(),
+        "environment": environment(),
+        "config": config,
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=0.2):
+    """`Regression`s of cases in both documents that got worse than `baseline` by more than `threshold`."""
+    regressions = []
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        for field, direction in _DIRECTIONS.items():
+            old, new = previous.get(field), result.get(field)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change * direction < -threshold:
+                regressions.append(Regression(name, field, old, new, change))
+    return regressions
+
+
+def write_json(document, path):
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cases", nargs="*", help=f"cases to run (default: all): {', '.join(CASES_BY_NAME)}")
+    parser.add_argument("--size", type=int, default=512, help="rows in the synthetic corpus")
+    parser.add_argument("--batch-size", type=int, default=32, help="rows per timed call")
+    parser.add_argument("--refs-per-row", type=int, default=3, help="references per row in multi-reference cases")
+    parser.add_argument("--repeats", type=int, default=1, help="passes over the corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--in-process", action="store_true", help="run every case in this interpreter")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="also write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change reported as a regression")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    config = {
+        "size": args.size,
+        "batch_size": args.batch_size,
+        "refs_per_row": args.refs_per_row,
+        "repeats": args.repeats,
+        "seed": args.seed,
+    }
+    if args.child:
+        print(json.dumps(run_case(args.child, **config)._asdict()))
+        return
+
+    unknown = sorted(set(args.cases) - set(CASES_BY_NAME))
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    document = run_suite(args.cases, isolate=not args.in_process, **config)
+    print(f"{'case':<26} {'rows/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'peak RSS (MiB)':>15}")
+    for name, result in document["results"].items():
+        result = CaseResult(**result)
+        rss = "n/a" if result.peak_rss_mb is None else f"{result.peak_rss_mb:.1f}"
+        print(f"{name:<26} {result.rows_per_second:>10.1f} {result.p50_ms:>10.2f} {result.p99_ms:>10.2f} {rss:>15}")
+
+    write_json(document, args.output)
+    print(f"results written to {args.output}")
+    if args.save_baseline:
+        write_json(document, args.baseline)
+        print(f"baseline written to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print("no baseline to compare with; record one with --save-baseline")
+        return
+
+    baseline = read_json(args.baseline)
+    if baseline.get("config") != config:
+        print(f"warning: baseline was recorded with {baseline.get('config')}, not {config}")
+    if "environment" not in baseline:
+        print("warning: baseline does not record its environment; timings may not be comparable")
+    for key, (old, new) in environment_differences(document, baseline).items():
+        print(f"warning: baseline {key} is {old!r}, this run's is {new!r}; timings may not be comparable")
+    regressions = compare(document, baseline, args.threshold)
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression.case} {regression.field}: {regression.baseline:.2f} -> "
+            f"{regression.current:.2f} ({regression.change:+.0%})"
+        )
+    if regressions:
+        sys.exit(1)
+    print(f"no regressions beyond {args.threshold:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""BLEU sufficient statistics kept per segment in compact integer arrays.
+
+Each segment is tokenized once and reduced to the same row sacrebleu computes internally:
+`[hyp_len, ref_len, correct_1..correct_N, total_1..total_N]`. Corpus BLEU, sentence BLEU and bootstrap confidence
+intervals are all derived from these rows, and accumulators built by different workers merge without rescoring.
+"""
+
+import numpy as np
+from sacrebleu.metrics import BLEU
+from sacrebleu.metrics.helpers import extract_all_word_ngrams
+
+from src.profiling import span
+
+
+def _closest_ref_len(hyp_len, ref_lens):
+    # Same tie-breaking as sacrebleu: the closest length, preferring the shorter reference.
+    return min(ref_lens, key=lambda ref_len: (abs(hyp_len - ref_len), ref_len))
+
+
+def scores_from_stats(stats, max_ngram_order=4, smooth_method="exp", smooth_value=None, effective_order=False):
+    """Vectorized `BLEU.compute_bleu` over rows of segment statistics; returns one BLEU score (0-100) per row."""
+    stats = np.atleast_2d(np.asarray(stats, dtype=np.float64))
+    if smooth_method not in BLEU.SMOOTH_DEFAULTS:
+        raise ValueError(f"Unknown smooth_method {smooth_method!r}")
+    if smooth_value is None:
+        smooth_value = BLEU.SMOOTH_DEFAULTS[smooth_method]
+
+    sys_len = stats[:, 0]
+    ref_len = stats[:, 1]
+    correct = stats[:, 2 : 2 + max_ngram_order].copy()
+    total = stats[:, 2 + max_ngram_order :].copy()
+    any_correct = correct.any(axis=1)
+    if smooth_method == "add-k":
+        correct[:, 1:] += smooth_value
+        total[:, 1:] += smooth_value
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bp = np.where(sys_len < ref_len, np.where(sys_len > 0, np.exp(1 - ref_len / sys_len), 0.0), 1.0)
+        precisions = np.zeros_like(correct)
+        active = np.ones(len(stats), dtype=bool)
+        eff_order = np.full(len(stats), max_ngram_order)
+        smooth_mteval = np.ones(len(stats))
+        for n in range(max_ngram_order):
+            active &= total[:, n] != 0
+            if effective_order:
+                eff_order = np.where(active, n + 1, eff_order)
+            zero = active & (correct[:, n] == 0)
+            if smooth_method == "exp":
+                smooth_mteval = np.where(zero, smooth_mteval * 2, smooth_mteval)
+                precisions[:, n] = np.where(zero, 100.0 / (smooth_mteval * total[:, n]), precisions[:, n])
+            elif smooth_method == "floor":
+                precisions[:, n] = np.where(zero, 100.0 * smooth_value / total[:, n], precisions[:, n])
+            matched = active & (correct[:, n] != 0)
+            precisions[:, n] = np.where(matched, 100.0 * correct[:, n] / total[:, n], precisions[:, n])
+
+        logs = np.where(precisions == 0, -9999999999.0, np.log(precisions))
+    logs[np.arange(max_ngram_order) >= eff_order[:, None]] = 0.0
+    scores = bp * np.exp(logs.sum(axis=1) / eff_order)
+    return np.where(any_correct, scores, 0.0)
+
+
+def score_from_totals(totals, max_ngram_order=4, smooth_method="exp", smooth_value=None, effective_order=False):
+    """sacrebleu `BLEUScore` of one statistics row; the column sums of a corpus' segment rows give corpus BLEU."""
+    return BLEU.compute_bleu(
+        [int(x) for x in totals[2 : 2 + max_ngram_order]],
+        [int(x) for x in totals[2 + max_ngram_order :]],
+        int(totals[0]),
+        int(totals[1]),
+        smooth_method=smooth_method,
+        smooth_value=smooth_value,
+        effective_order=effective_order,
+        max_ngram_order=max_ngram_order,
+    )
+
+
+class BleuAccumulator:
+    """Collects BLEU segment statistics as int32 rows.
+
+    `tokenize` is a sacrebleu tokenizer name (default "13a", matching `sacrebleu.corpus_bleu` and ragas' `BleuScore`)
+    or a callable returning a list of tokens (e.g. `nltk.word_tokenize`, matching `nltk.translate.bleu_score`).
+    """
+
+    def __init__(self, max_ngram_order=4, tokenize="13a", lowercase=False):
+        self.max_ngram_order = max_ngram_order
+        self.lowercase = lowercase
+        if callable(tokenize):
+            self._tokenize = lambda text: " ".join(tokenize(text))
+        else:
+            self._tokenize = BLEU(tokenize=tokenize).tokenizer
+        self._blocks = []
+        self._pending = []
+        self._totals = np.zeros(2 + 2 * max_ngram_order, dtype=np.int64)
+        self._stats = None
+
+    def __len__(self):
+        return sum(len(block) for block in self._blocks) + len(self._pending)
+
+    def _preprocess(self, text):
+        if self.lowercase:
+            text = text.lower()
+        return self._tokenize(text.rstrip())
+
+    def _segment_stats(self, hypothesis, references):
+        order = self.max_ngram_order
+        with span("bleu.tokenize"):
+            hypothesis = self._preprocess(hypothesis)
+            references = [self._preprocess(reference) for reference in references]
+        with span("bleu.ngrams"):
+            ref_ngrams = {}
+            ref_lens = []
+            for reference in references:
+                ngrams, ref_len = extract_all_word_ngrams(reference, 1, order)
+                ref_lens.append(ref_len)
+                for ngram, count in ngrams.items():
+                    if count > ref_ngrams.get(ngram, 0):
+                        ref_ngrams[ngram] = count
+
+            hyp_ngrams, hyp_len = extract_all_word_ngrams(hypothesis, 1, order)
+            correct = [0] * order
+            total = [0] * order
+            for ngram, count in hyp_ngrams.items():
+                n = len(ngram) - 1
+                total[n] += count
+                if ngram in ref_ngrams:
+                    correct[n] += min(count, ref_ngrams[ngram])
+        return [hyp_len, _closest_ref_len(hyp_len, ref_lens)] + correct + total
+
+    def add(self, hypothesis, references):
+        """Adds one segment; `references` is a string or a list of alternative reference strings."""
+        if isinstance(references, str):
+            references = [references]
+        if not references:
+            raise ValueError("Each hypothesis needs at least one reference")
+        row = self._segment_stats(hypothesis, references)
+        self._pending.append(row)
+        self._totals += row
+        self._stats = None
+        return row
+
+    def add_corpus(self, hypotheses, references):
+        """Adds many segments, `references` holding one string or list of strings per hypothesis."""
+        for hypothesis, refs in zip(hypotheses, references):
+            self.add(hypothesis, refs)
+        self._flush()
+        return self
+
+    def _flush(self):
+        if self._pending:
+            self._blocks.append(np.asarray(self._pending, dtype=np.int32).reshape(-1, len(self._totals)))
+            self._pending = []
+
+    def merge(self, other):
+        """Appends another accumulator's segments; only block references and running totals are touched."""
+        if other.max_ngram_order != self.max_ngram_order:
+            raise ValueError("Cannot merge accumulators with different max_ngram_order")
+        self._flush()
+        other._flush()
+        self._blocks.extend(other._blocks)
+        self._totals += other._totals
+        self._stats = None
+        return self
+
+    @property
+    def stats(self):
+        """All segment rows as one (segments, 2 + 2 * max_ngram_order) int32 array."""
+        if self._stats is None:
+            self._flush()
+            width = len(self._totals)
+            self._stats = np.concatenate(self._blocks) if self._blocks else np.empty((0, width), dtype=np.int32)
+            self._blocks = [self._stats]
+        return self._stats
+
+    @property
+    def totals(self):
+        """Column sums of every segment row as an int64 array (a copy)."""
+        return self._totals.copy()
+
+    def _compute(self, row, smooth_method, smooth_value, effective_order):
+        return score_from_totals(row, self.max_ngram_order, smooth_method, smooth_value, effective_order)
+
+    def corpus_score(self, smooth_method="exp", smooth_value=None, effective_order=False):
+        """Corpus BLEU from the running totals, same as `sacrebleu.corpus_bleu` on every added segment."""
+        return self._compute(self._totals, smooth_method, smooth_value, effective_order)
+
+    def sentence_score(self, index, smooth_method="exp", smooth_value=None, effective_order=True):
+        """BLEU of one segment, same as `sacrebleu.sentence_bleu` with the defaults."""
+        return self._compute(self.stats[index], smooth_method, smooth_value, effective_order)
+
+    def sentence_scores(self, smooth_method="exp", smooth_value=None, effective_order=True):
+        """BLEU (0-100) of every segment as a float64 array."""
+        with span("bleu.score"):
+            return scores_from_stats(self.stats, self.max_ngram_order, smooth_method, smooth_value, effective_order)
+
+    def bootstrap(
+        self, n_samples=1000, confidence_interval=0.95, seed=0, smooth_method="exp", smooth_value=None
+    ):
+        """Returns (low, mid, high) percentiles of corpus BLEU over segment-level bootstrap resamples."""
+        stats = self.stats
+        size = len(stats)
+        if not size:
+            raise ValueError("Cannot bootstrap an empty accumulator")
+        rng = np.random.RandomState(seed)
+        with span("bleu.bootstrap", samples=n_samples):
+            sample_stats = np.empty((n_samples, stats.shape[1]), dtype=np.int64)
+            chunk = max(1, (1 << 22) // (size * stats.shape[1]))
+            for start in range(0, n_samples, chunk):
+                stop = min(start + chunk, n_samples)
+                sample_idx = rng.randint(0, size, size=(stop - start, size))
+                sample_stats[start:stop] = stats[sample_idx].sum(axis=1, dtype=np.int64)
+            scores = scores_from_stats(sample_stats, self.max_ngram_order, smooth_method, smooth_value)
+        percentile_delta = (1 - confidence_interval) / 2
+        return tuple(np.percentile(scores, 100 * np.array([percentile_delta, 0.5, 1 - percentile_delta])))
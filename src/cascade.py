@@ -0,0 +1,178 @@
+"""Cascaded evaluation: rows a lexical rule can decide are scored without a judge call.
+
+`run_cascade` first computes cheap lexical features of every row: exact match, sentence BLEU and ROUGE of the
+response against the reference, and how much of the response appears word for word in the retrieved contexts.
+A `CascadeRule` gives a metric a fixed score for rows whose feature falls in `[low, high]`. For example,
+a response whose every sentence is copied from its contexts is fully faithful. Rows no rule decides are the
+ambiguous remainder, and only those are sent to the judge, through `run_jobs` so they share its scheduler and
+cache. The result reports, per metric, the fraction of rows that were short-circuited. It also estimates the
+judge time saved, which is the resolved rows times the judge's mean wall time per judged row in this run.
+
+The default rules are deliberately narrow:
+
+- `faithfulness` is 1.0 when every sentence of the response appears in the contexts as the same sequence of
+  words (case and punctuation aside).
+- `answer_relevancy` is 1.0 when the response is the reference answer (up to case, spacing and final
+  punctuation), which takes the reference as a fully relevant answer.
+
+Pass `rules=` to loosen or extend them.
+"""
+
+import asyncio
+import math
+import re
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from src.batch_scoring import BatchResult
+from src.context_dedup import split_statements
+from src.judge_scheduler import EvaluationJob, arun_jobs, to_samples
+from src.lexical import score_lexical
+
+CascadeRule = namedtuple("CascadeRule", ["metric", "feature", "low", "high", "score"])
+CascadeStats = namedtuple(
+    "CascadeStats", ["rows", "resolved", "judged", "short_circuited", "judge_elapsed", "estimated_saved"]
+)
+CascadeResult = namedtuple("CascadeResult", ["result", "stats", "features", "lexical_elapsed", "scheduler"])
+
+# Per-row features a rule can test, all computed from the response.
+FEATURES = ("exact_match", "bleu", "rouge1", "rouge2", "rougeL", "context_coverage", "context_precision")
+DEFAULT_RULES = (
+    CascadeRule("faithfulness", "context_coverage", 1.0, 1.0, 1.0),
+    CascadeRule("answer_relevancy", "exact_match", 1.0, 1.0, 1.0),
+)
+
+_SPACES = re.compile(r"\s+")
+# Words and numbers, keeping "14.5" and "1,000" whole so that "14" does not match inside them.
+_TOKEN = re.compile(r"\w+(?:[.,]\w+)*")
+
+
+def _normalize(text):
+    return _SPACES.sub(" ", text).strip().rstrip(".!?").lower()
+
+
+def _token_text(text):
+    # Lowercased tokens joined and padded with spaces, so substring tests only match whole token sequences.
+    return " " + " ".join(_TOKEN.findall(text.lower())) + " "
+
+
+def _coverage(response, contexts):
+    sentences = split_statements(response)
+    if not sentences or not contexts:
+        return math.nan
+    context = _token_text(" ".join(contexts))
+    covered = 0
+    for sentence in sentences:
+        tokens = _token_text(sentence)
+        covered += tokens.strip() != "" and tokens in context
+    return covered / len(sentences)
+
+
+def lexical_features(samples, features):
+    """{feature: float64 array} of the named `FEATURES` for each of `samples` (`SingleTurnSample`s).
+
+    Reference features are NaN for rows without a reference, context features for rows without contexts
+    or with an empty response. `bleu` is on sacrebleu's 0-100 scale; ROUGE values are fmeasures.
+    """
+    unknown = set(features) - set(FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown features {sorted(unknown)}, expected some of {', '.join(FEATURES)}")
+    size = len(samples)
+    responses = [sample.response or "" for sample in samples]
+    values = {}
+
+    lexical = [feature for feature in features if feature in ("bleu", "rouge1", "rouge2", "rougeL")]
+    with_reference = [i for i, sample in enumerate(samples) if sample.reference is not None]
+    if lexical:
+        result = score_lexical(
+            [responses[i] for i in with_reference], [samples[i].reference for i in with_reference], lexical
+        )
+        for feature in lexical:
+            column = np.full(size, math.nan)
+            if with_reference:
+                column[with_reference] = result.sentence_bleu if feature == "bleu" else result.rouge[feature][:, 2]
+            values[feature] = column
+    if "exact_match" in features:
+        values["exact_match"] = np.array(
+            [
+                math.nan if sample.reference is None else float(_normalize(response) == _normalize(sample.reference))
+                for sample, response in zip(samples, responses)
+            ]
+        )
+    if "context_coverage" in features:
+        values["context_coverage"] = np.array(
+            [_coverage(response, sample.retrieved_contexts) for sample, response in zip(samples, responses)]
+        )
+    if "context_precision" in features:
+        column = np.full(size, math.nan)
+        with_contexts = [i for i, sample in enumerate(samples) if sample.retrieved_contexts and responses[i]]
+        if with_contexts:
+            # The share of the response's unigrams that occur in the joined contexts.
+            result = score_lexical(
+                [responses[i] for i in with_contexts],
+                [" ".join(samples[i].retrieved_contexts) for i in with_contexts],
+                ("rouge1",),
+            )
+            column[with_contexts] = result.rouge["rouge1"][:, 0]
+        values["context_precision"] = column
+    return {feature: values[feature] for feature in features}
+
+
+async def arun_cascade(dataset, metrics, rules=DEFAULT_RULES, **kwargs):
+    """Scores `dataset` (anything `to_samples` accepts) with `metrics`, judging only rows no rule decides.
+
+    Rules are tried in order and the first one that matches a row decides that metric's score. Returns a
+    `CascadeResult`. `result` is a `BatchResult` of every row's scores, and `stats` maps each metric name to
+    its `CascadeStats`. `features` holds the lexical features the rules used. `scheduler` holds the
+    `SchedulerStats` of the judge calls. Other keyword arguments (llm=, scheduler=, cache=, ...) go to `arun_jobs`.
+    """
+    start = time.perf_counter()
+    samples = to_samples(dataset)
+    names = {metric.name for metric in metrics}
+    rules = [rule for rule in rules if rule.metric in names]
+    features = lexical_features(samples, list(dict.fromkeys(rule.feature for rule in rules)))
+    scores = {metric.name: [None] * len(samples) for metric in metrics}
+    for rule in rules:
+        column = scores[rule.metric]
+        matched = (features[rule.feature] >= rule.low) & (features[rule.feature] <= rule.high)
+        for i in np.flatnonzero(matched):
+            if column[i] is None:
+                column[i] = rule.score
+    lexical_elapsed = time.perf_counter() - start
+
+    pending = {}
+    for metric in metrics:
+        rows = [i for i, score in enumerate(scores[metric.name]) if score is None]
+        if rows:
+            pending[metric.name] = (rows, EvaluationJob(metric.name, [samples[i] for i in rows], [metric]))
+    judge_start = time.perf_counter()
+    judged = await arun_jobs([job for _, job in pending.values()], **kwargs)
+    judge_elapsed = time.perf_counter() - judge_start
+    for name, (rows, _) in pending.items():
+        for i, score in zip(rows, judged.results[name].scores[name]):
+            scores[name][i] = score
+
+    stats = {}
+    for metric in metrics:
+        rows = pending.get(metric.name, ((), None))[0]
+        resolved = len(samples) - len(rows)
+        # All judged rows run concurrently, so their wall time is shared out over every judged row of the run.
+        per_row = judge_elapsed / sum(len(r) for r, _ in pending.values()) if pending else 0.0
+        stats[metric.name] = CascadeStats(
+            rows=len(samples),
+            resolved=resolved,
+            judged=len(rows),
+            short_circuited=resolved / len(samples) if samples else 0.0,
+            judge_elapsed=judge_elapsed if rows else 0.0,
+            estimated_saved=resolved * per_row,
+        )
+    elapsed = time.perf_counter() - start
+    result = BatchResult(scores, elapsed, len(samples) / elapsed if elapsed > 0 else math.inf)
+    return CascadeResult(result, stats, features, lexical_elapsed, judged.stats)
+
+
+def run_cascade(dataset, metrics, **kwargs):
+    """Synchronous entry point: runs `arun_cascade` on a single event loop."""
+    return asyncio.run(arun_cascade(dataset, metrics, **kwargs))
@@ -0,0 +1,188 @@
+"""Per-row scores as Arrow tables, written to Parquet or Arrow IPC files a chunk at a time.
+
+`to_table` turns the per-row output of any scoring entry point into an Arrow table with one column per score.
+Entry points include the rouge metric (`output_format="arrow"` returns one directly), `score_lexical`, a
+`BatchResult` from `score_samples`/`run_jobs`/`run_incremental`, or a ragas `EvaluationResult`. Contiguous 1-D
+NumPy score arrays become Arrow columns without a copy. The columns of (rows, 3) precision/recall/fmeasure
+arrays are strided, so each is copied once into its own buffer. NaN stays NaN rather than null.
+
+`ScoreWriter` streams tables to a file and buffers small writes into row groups of `row_group_size` rows. A
+`.parquet` file is compressed and compact. A `.arrow` (Arrow IPC) file is stored uncompressed, so `read_scores`
+memory-maps it and the returned table, its pandas frame (`scores_frame`) and its NumPy columns
+(`column_array`) are views of the mapped file: nothing is copied onto the heap. Parquet files are decoded once
+on read.
+"""
+
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.batch_scoring import BatchResult
+from src.lexical import LexicalResult
+
+FORMATS = {".parquet": "parquet", ".arrow": "ipc", ".feather": "ipc"}
+MEASURES = ("precision", "recall", "fmeasure")
+
+
+def _column(values):
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        return values
+    if isinstance(values, np.ndarray):
+        # Contiguous numeric arrays are wrapped, not copied; strided ones (e.g. a column of a 2-D array) are copied.
+        return pa.array(np.ascontiguousarray(values))
+    return pa.array(values)
+
+
+def _columns(scores):
+    columns = {}
+    for name, values in scores.items():
+        if isinstance(values, np.ndarray) and values.ndim == 2 and values.shape[1] == len(MEASURES):
+            # (rows, 3) precision/recall/fmeasure arrays, as `score_batch` and `score_lexical` return.
+            for index, measure in enumerate(MEASURES):
+                columns[f"{name}_{measure}"] = _column(values[:, index])
+        else:
+            columns[name] = _column(values)
+    return columns
+
+
+def to_table(result):
+    """Per-row scores of `result` as a `pyarrow.Table`.
+
+    `result` is a dict of score columns (lists or NumPy arrays), a `BatchResult`, a `LexicalResult`, a ragas
+    `EvaluationResult` or a table. (rows, 3) arrays of precision, recall and fmeasure become three columns
+    named `<metric>_precision`, `<metric>_recall` and `<metric>_fmeasure`.
+    """
+    if isinstance(result, pa.Table):
+        return result
+    if isinstance(result, BatchResult):
+        return pa.table(_columns(result.scores))
+    if isinstance(result, LexicalResult):
+        scores = {} if result.sentence_bleu is None else {"bleu": result.sentence_bleu}
+        scores.update(result.rouge)
+        return pa.table(_columns(scores))
+    if isinstance(result, dict):
+        return pa.table(_columns(result))
+    if isinstance(getattr(result, "scores", None), list):
+        # ragas `EvaluationResult`: one dict of metric scores per row.
+        return pa.Table.from_pylist(result.scores)
+    raise TypeError(f"Cannot build a score table from {type(result).__name__}")
+
+
+def _format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported file type {extension!r}, expected one of {', '.join(FORMATS)}")
+    return FORMATS[extension]
+
+
+class ScoreWriter:
+    """Appends per-row scores to a Parquet or Arrow IPC file in row groups of `row_group_size` rows.
+
+    Every `write` takes anything `to_table` accepts, all with the same columns. Rows are buffered until a full
+    row group is available; `close` (or leaving the `with` block) writes the remainder and finalizes the file.
+    `compression` applies to Parquet only ("zstd" by default); IPC files stay uncompressed so they can be
+    memory-mapped.
+    """
+
+    def __init__(self, path, row_group_size=65_536, compression="zstd"):
+        if row_group_size <= 0:
+            raise ValueError("row_group_size must be positive")
+        self.path = path
+        self.format = _format(path)
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.rows = 0
+        self.row_groups = 0
+        self._writer = None
+        self._sink = None
+        self._pending = []
+        self._pending_rows = 0
+
+    def _open(self, schema):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.format == "parquet":
+            self._writer = pq.ParquetWriter(self.path, schema, compression=self.compression)
+        else:
+            self._sink = pa.OSFile(self.path, "wb")
+            self._writer = pa.ipc.new_file(self._sink, schema)
+
+    def write(self, result):
+        table = to_table(result)
+        if self._writer is None:
+            self._open(table.schema)
+        self._pending.append(table)
+        self._pending_rows += table.num_rows
+        if self._pending_rows >= self.row_group_size:
+            self._flush(final=False)
+
+    def _flush(self, final):
+        if not self._pending:
+            return
+        table = pa.concat_tables(self._pending)
+        full = table.num_rows if final else table.num_rows - table.num_rows % self.row_group_size
+        for start in range(0, full, self.row_group_size):
+            group = table.slice(start, min(self.row_group_size, full - start)).combine_chunks()
+            if self.format == "parquet":
+                self._writer.write_table(group, row_group_size=self.row_group_size)
+            else:
+                self._writer.write_table(group, max_chunksize=self.row_group_size)
+            self.rows += group.num_rows
+            self.row_groups += 1
+        rest = table.slice(full)
+        self._pending = [rest] if rest.num_rows else []
+        self._pending_rows = rest.num_rows
+
+    def close(self):
+        if self._writer is None:
+            return
+        self._flush(final=True)
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_scores(result, path, row_group_size=65_536, compression="zstd"):
+    """Writes `result` (anything `to_table` accepts) to `path` in one go; returns the number of rows."""
+    with ScoreWriter(path, row_group_size=row_group_size, compression=compression) as writer:
+        writer.write(result)
+    return writer.rows
+
+
+def read_scores(path, columns=None):
+    """Reads a score file back as a `pyarrow.Table`; `.arrow` files are memory-mapped, not copied."""
+    if _format(path) == "parquet":
+        return pq.read_table(path, columns=columns, memory_map=True)
+    # The table's buffers keep the mapping alive after `source` goes out of scope.
+    source = pa.memory_map(path, "r")
+    table = pa.ipc.open_file(source).read_all()
+    return table.select(columns) if columns is not None else table
+
+
+def scores_frame(table):
+    """A pandas DataFrame over `table`'s Arrow buffers (ArrowDtype columns), without converting them."""
+    import pandas as pd
+
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def column_array(table, name):
+    """Column `name` as a NumPy array; a read-only view when the column is a single chunk without nulls.
+
+    Columns spanning several row groups are concatenated, which copies them; iterate over
+    `table.column(name).chunks` for one view per row group instead.
+    """
+    column = table.column(name)
+    if column.num_chunks == 1:
+        return column.chunk(0).to_numpy(zero_copy_only=column.null_count == 0)
+    return column.to_numpy()
@@ -0,0 +1,4 @@
+import os
+
+# Keep ragas from sending usage analytics while the test suite runs.
+os.environ.setdefault("RAGAS_DO_NOT_TRACK", "true")
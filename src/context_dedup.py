@@ -0,0 +1,273 @@
+"""Context recall and relevance scoring that judges each distinct piece of text once across a dataset.
+
+ragas' `ContextRecall` sends one prompt per row. The prompt asks the judge to split the row's reference into
+statements and to attribute each one to the row's joined contexts. When the same retrieved chunks and
+references show up in many rows, the same (statement, context) judgements are made over and over.
+`DedupedContextRecall` splits references into sentences locally and interns every statement and context. It
+then sends one request per distinct context, listing the statements not yet judged against it, so each
+distinct (statement, context) pair is judged once. A row's statement counts as attributed when any of the
+row's contexts supports it. A grouped response that does not hold one verdict per statement is retried one
+statement at a time.
+
+`ContextRelevance` rates a question against its joined contexts, so `DedupedContextRelevance` runs the metric
+once per distinct (question, contexts) pair and copies the rating to every row that repeats it.
+
+Both keep their verdicts for the lifetime of the scorer, so later batches reuse earlier ones. Verdicts that
+could not be parsed and NaN ratings are not kept, so later batches ask for them again; any other judge error
+is raised. `stats()` reports the pairs seen, the distinct pairs judged, and the judge requests sent against
+what a per-row run needs.
+"""
+
+import asyncio
+import math
+import re
+import time
+import typing as t
+from collections import namedtuple
+
+from pydantic import BaseModel, Field
+from ragas.dataset_schema import SingleTurnSample
+from ragas.exceptions import RagasOutputParserException
+from ragas.metrics import ContextRecall, ContextRelevance
+from ragas.metrics._context_recall import ContextRecallClassificationPrompt, ContextRecallClassifications
+from ragas.prompt import PydanticPrompt
+
+from src.batch_scoring import BatchResult
+from src.judge_scheduler import to_samples
+
+DedupStats = namedtuple(
+    "DedupStats", ["rows", "pairs", "unique_pairs", "requests", "per_row_requests", "saved", "fallbacks"]
+)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_statements(text):
+    """The sentences of `text`, stripped, in order; the statements `DedupedContextRecall` judges."""
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text or "") if sentence.strip()]
+
+
+class ContextStatementsInput(BaseModel):
+    context: str = Field(description="The context to attribute the statements to")
+    statements: t.List[str] = Field(description="The statements to classify")
+
+
+def _grouped_example():
+    example_input, example_output = ContextRecallClassificationPrompt.examples[0]
+    statements = [classification.statement for classification in example_output.classifications]
+    return ContextStatementsInput(context=example_input.context, statements=statements), example_output
+
+
+class ContextStatementsPrompt(PydanticPrompt[ContextStatementsInput, ContextRecallClassifications]):
+    name: str = "context_statements_classification"
+    instruction = (
+        "Given a context and a list of statements, classify whether each statement can be attributed to the "
+        "given context or not. Use only 'Yes' (1) or 'No' (0) as a binary classification. Return exactly one "
+        "classification per statement, in the same order as the statements, and output json with reason."
+    )
+    input_model = ContextStatementsInput
+    output_model = ContextRecallClassifications
+    examples = [_grouped_example()]
+
+
+class _Interner:
+    # Maps each distinct string to a small integer id.
+
+    def __init__(self):
+        self.ids = {}
+        self.texts = []
+
+    def __call__(self, text):
+        if text not in self.ids:
+            self.ids[text] = len(self.texts)
+            self.texts.append(text)
+        return self.ids[text]
+
+
+class DedupedContextRecall:
+    """Scores samples with `metric` (a `ContextRecall` with its `llm` set), one judgement per distinct pair.
+
+    Requests for different contexts are sent concurrently, at most `max_concurrency` at a time, and a context
+    with more than `max_statements` new statements is split over several requests. Rows whose reference has no
+    statements score NaN, as with `ContextRecall`; so do rows where a statement's verdicts could not be parsed
+    and none of its other contexts supports it.
+    """
+
+    def __init__(self, metric=None, max_statements=16, max_concurrency=8, splitter=split_statements):
+        if max_statements <= 0 or max_concurrency <= 0:
+            raise ValueError("max_statements and max_concurrency must be positive")
+        self.metric = metric or ContextRecall()
+        self.max_statements = max_statements
+        self.max_concurrency = max_concurrency
+        self.splitter = splitter
+        self.prompt = ContextStatementsPrompt()
+        self.statements = _Interner()
+        self.contexts = _Interner()
+        # (statement id, context id) -> True/False; pairs whose verdict could not be parsed are left out.
+        self.verdicts = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.rows = 0
+        self.pairs = 0
+        self.unique_pairs = 0
+        self.requests = 0
+        self.per_row_requests = 0
+        self.fallbacks = 0
+
+    def stats(self):
+        return DedupStats(
+            rows=self.rows,
+            pairs=self.pairs,
+            unique_pairs=self.unique_pairs,
+            requests=self.requests,
+            per_row_requests=self.per_row_requests,
+            saved=self.per_row_requests - self.requests,
+            fallbacks=self.fallbacks,
+        )
+
+    async def _classify(self, context, statements):
+        # Verdicts for `statements` in order; None when the response cannot be matched up with them.
+        self.requests += 1
+        try:
+            output = await self.prompt.generate(
+                llm=self.metric.llm, data=ContextStatementsInput(context=context, statements=statements)
+            )
+        except RagasOutputParserException:
+            return None
+        if len(output.classifications) != len(statements):
+            return None
+        return [bool(classification.attributed) for classification in output.classifications]
+
+    async def _judge(self, context_id, statement_ids):
+        context = self.contexts.texts[context_id]
+        verdicts = await self._classify(context, [self.statements.texts[i] for i in statement_ids])
+        if verdicts is None:
+            self.fallbacks += 1
+            singles = await asyncio.gather(
+                *(self._classify(context, [self.statements.texts[i]]) for i in statement_ids)
+            )
+            verdicts = [None if single is None else single[0] for single in singles]
+        for statement_id, verdict in zip(statement_ids, verdicts):
+            # Unparsed verdicts are not kept, so a later batch asks again.
+            if verdict is not None:
+                self.verdicts[statement_id, context_id] = verdict
+
+    def _score(self, statement_ids, context_ids):
+        attributed = 0
+        for statement_id in statement_ids:
+            verdicts = [self.verdicts.get((statement_id, context_id)) for context_id in context_ids]
+            if any(verdicts):
+                attributed += 1
+            elif None in verdicts:
+                return math.nan
+        return attributed / len(statement_ids) if statement_ids else math.nan
+
+    async def ascore_samples(self, samples):
+        """Scores `samples` (anything `to_samples` accepts) and returns a `BatchResult`."""
+        if self.metric.llm is None:
+            raise ValueError("metric.llm must be set to compute context recall")
+        start = time.perf_counter()
+        rows = []
+        pending = {}
+        for sample in to_samples(samples):
+            statement_ids = [self.statements(statement) for statement in self.splitter(sample.reference)]
+            context_ids = list(dict.fromkeys(self.contexts(context) for context in sample.retrieved_contexts or ()))
+            rows.append((statement_ids, context_ids))
+            for context_id in context_ids:
+                for statement_id in statement_ids:
+                    if (statement_id, context_id) not in self.verdicts:
+                        pending.setdefault(context_id, {})[statement_id] = None
+            self.pairs += len(statement_ids) * len(context_ids)
+
+        groups = [
+            (context_id, list(statement_ids)[i : i + self.max_statements])
+            for context_id, statement_ids in pending.items()
+            for i in range(0, len(statement_ids), self.max_statements)
+        ]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def judge(context_id, statement_ids):
+            async with semaphore:
+                await self._judge(context_id, statement_ids)
+
+        await asyncio.gather(*(judge(context_id, statement_ids) for context_id, statement_ids in groups))
+        elapsed = time.perf_counter() - start
+
+        scores = [self._score(statement_ids, context_ids) for statement_ids, context_ids in rows]
+        self.rows += len(rows)
+        self.unique_pairs += sum(len(statement_ids) for statement_ids in pending.values())
+        # A per-row run sends one classification prompt per row.
+        self.per_row_requests += len(rows)
+        return BatchResult({self.metric.name: scores}, elapsed, len(rows) / elapsed if elapsed > 0 else math.inf)
+
+    def score_samples(self, samples):
+        """Synchronous entry point: runs `ascore_samples` on a single event loop."""
+        return asyncio.run(self.ascore_samples(samples))
+
+
+class DedupedContextRelevance:
+    """Scores samples with `metric` (a `ContextRelevance` with its `llm` set), once per distinct row.
+
+    Rows are distinct by question and contexts; at most `max_concurrency` are scored at a time. Requests are
+    counted in ratings, each of which is the metric's own pair of prompts (plus any retries it makes).
+    """
+
+    def __init__(self, metric=None, max_concurrency=8):
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be positive")
+        self.metric = metric or ContextRelevance()
+        self.max_concurrency = max_concurrency
+        # (question, contexts) -> score; NaN ratings are left out.
+        self.ratings = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.rows = 0
+        self.unique_pairs = 0
+        self.requests = 0
+
+    def stats(self):
+        return DedupStats(
+            rows=self.rows,
+            pairs=self.rows,
+            unique_pairs=self.unique_pairs,
+            requests=self.requests,
+            per_row_requests=self.rows,
+            saved=self.rows - self.requests,
+            fallbacks=0,
+        )
+
+    async def _rate(self, key):
+        question, contexts = key
+        sample = SingleTurnSample(user_input=question, retrieved_contexts=list(contexts))
+        self.requests += 1
+        score = await self.metric._single_turn_ascore(sample, None)
+        if not math.isnan(score):
+            self.ratings[key] = score
+        return score
+
+    async def ascore_samples(self, samples):
+        """Scores `samples` (anything `to_samples` accepts) and returns a `BatchResult`."""
+        if self.metric.llm is None:
+            raise ValueError("metric.llm must be set to compute context relevance")
+        start = time.perf_counter()
+        keys = [(sample.user_input, tuple(sample.retrieved_contexts or ())) for sample in to_samples(samples)]
+        new = [key for key in dict.fromkeys(keys) if key not in self.ratings]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def rate(key):
+            async with semaphore:
+                return await self._rate(key)
+
+        fresh = dict(zip(new, await asyncio.gather(*(rate(key) for key in new))))
+        elapsed = time.perf_counter() - start
+
+        self.rows += len(keys)
+        self.unique_pairs += len(new)
+        scores = [fresh[key] if key in fresh else self.ratings[key] for key in keys]
+        return BatchResult({self.metric.name: scores}, elapsed, len(keys) / elapsed if elapsed > 0 else math.inf)
+
+    def score_samples(self, samples):
+        """Synchronous entry point: runs `ascore_samples` on a single event loop."""
+        return asyncio.run(self.ascore_samples(samples))
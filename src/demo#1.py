@@ -1,16 +1,16 @@
 
 import os
+import sys
 from dotenv import load_dotenv
-import asyncio
 
 from ragas.dataset_schema import SingleTurnSample
 from ragas.metrics import BleuScore
 
-load_dotenv()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.batch_scoring import score_samples
 
-async def main_evaluation(description): # Define an async function
-    final_score = await scorer.single_turn_ascore(sample)
-    print(f"For {description} the BLEU Score: {final_score}")
+load_dotenv()
 
 if __name__ == "__main__":
     test_cases = [
@@ -63,13 +63,16 @@ if __name__ == "__main__":
     ]
     
     print("--- BLEU Evaluation Examples (using NLTK) ---")
-    for i, case in enumerate(test_cases):
-        response=case['response']
-        reference=case['reference']
-        description=case['description']
-        sample = SingleTurnSample(
-            response=response,
-            reference=reference
+    samples = [
+        SingleTurnSample(
+            response=case['response'],
+            reference=case['reference']
         )
-        scorer = BleuScore()
-        asyncio.run(main_evaluation(description)) # Run the async function
\ No newline at end of file
+        for case in test_cases
+    ]
+    # One metric instance and one event loop for all samples
+    scorer = BleuScore()
+    result = score_samples(samples, [scorer])
+    for case, final_score in zip(test_cases, result.scores[scorer.name]):
+        print(f"For {case['description']} the BLEU Score: {final_score}")
+    print(f"Scored {len(samples)} samples at {result.samples_per_second:.1f} samples/sec")
\ No newline at end of file
@@ -1,5 +1,10 @@
-# Importing evaluate library
-import evaluate
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The rouge metric and its scorer are loaded once per process and reused across calls
+from src.metric_cache import compute_rouge
 
 
 def rouge(reference, candidate):
@@ -13,8 +18,7 @@ def rouge(reference, candidate):
     Returns:
         dict: ROUGE scores.
     """
-    rouge_metric = evaluate.load("rouge")
-    results = rouge_metric.compute(predictions=candidate, references=reference)
+    results = compute_rouge(predictions=candidate, references=reference)
     return results
 
 
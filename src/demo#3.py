@@ -1,26 +1,34 @@
 # NLTK and rouge-score (Traditional & Granular)
 
-import nltk
+import os
+import sys
+
 from nltk.translate.bleu_score import sentence_bleu
 from rouge_score import rouge_scorer
 
-# Download necessary NLTK data
-nltk.download("punkt_tab")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.nltk_resources import ensure_nltk_resource  # noqa: E402
+from src.token_cache import get_tokenizer  # noqa: E402
+
+# Use the local NLTK data directory; only download when missing (never with NLTK_OFFLINE=1)
+ensure_nltk_resource("punkt_tab")
 
 # Example sentences
 reference = ["the cat is on the mat"]
 candidate = ["the cat is on mat"]
 
-# Tokenize the reference and candidate
-reference_tokenized = [nltk.word_tokenize(ref) for ref in reference]
-candidate_tokenized = [nltk.word_tokenize(cand) for cand in candidate]
+# Tokenize the reference and candidate (memoized, so repeated texts are tokenized once)
+word_tokenize = get_tokenizer("nltk")
+reference_tokenized = [word_tokenize(ref) for ref in reference]
+candidate_tokenized = [word_tokenize(cand) for cand in candidate]
 
 # BLEU Score Calculation using NLTK
 bleu_score = sentence_bleu(reference_tokenized, candidate_tokenized[0])
 print(f"BLEU Score (NLTK): {bleu_score * 100:.2f}")
 
 # ROUGE Score Calculation using rouge-score
-scorer = rouge_scorer.RougeScorer(["rouge1", "rougeL"], use_stemmer=True)
+# The shared "rouge_stem" tokenizer gives the same tokens as use_stemmer=True, with stems memoized
+scorer = rouge_scorer.RougeScorer(["rouge1", "rougeL"], tokenizer=get_tokenizer("rouge_stem"))
 scores = scorer.score(reference[0], candidate[0])
 print(f"ROUGE-1 F1 Score: {scores['rouge1'].fmeasure:.2f}")
 print(f"ROUGE-L F1 Score: {scores['rougeL'].fmeasure:.2f}")
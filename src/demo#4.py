@@ -1,8 +1,17 @@
 # sacrebleu and rouge-score (Standardized & Robust)
 
+import os
+import sys
+from contextlib import nullcontext
+
 from sacrebleu import corpus_bleu
 from rouge_score import rouge_scorer
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.lexical import score_lexical  # noqa: E402
+from src.profiling import profile  # noqa: E402
+from src.token_cache import get_tokenizer  # noqa: E402
+
 # Example sentences
 reference = ["the cat is on the mat"]
 candidate = ["the cat is on mat"]
@@ -12,7 +21,15 @@ bleu = corpus_bleu(candidate, [reference])
 print(f"BLEU Score: {bleu.score}")
 
 # ROUGE Score Calculation
-scorer = rouge_scorer.RougeScorer(['rouge1', 'rougeL'], use_stemmer=True)
+# Same tokens as use_stemmer=True, with stems memoized in the shared token cache
+scorer = rouge_scorer.RougeScorer(['rouge1', 'rougeL'], tokenizer=get_tokenizer("rouge_stem"))
 scores = scorer.score(reference[0], candidate[0])
 print(f"ROUGE-1: {scores['rouge1']}")
 print(f"ROUGE-L: {scores['rougeL']}")
+
+# BLEU and ROUGE together in one pass over shared tokens and n-gram counts; --profile times each stage
+with profile() if "--profile" in sys.argv else nullcontext() as run:
+    fused = score_lexical(candidate, reference, ["bleu", "rouge1", "rougeL"], use_stemmer=True)
+print(f"Fused BLEU: {fused.bleu}, ROUGE-1 F1: {fused.rouge['rouge1'][0, 2]:.4f}, ROUGE-L F1: {fused.rouge['rougeL'][0, 2]:.4f}")
+if run is not None:
+    print(run.summary())
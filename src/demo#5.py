@@ -7,6 +7,13 @@ from datasets import Dataset
 from ragas.llms import LangchainLLMWrapper
 from langchain_openai import ChatOpenAI
 import inspect
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.batched_faithfulness import BatchedFaithfulness  # noqa: E402
+from src.cascade import arun_cascade  # noqa: E402
+from src.llm_cache import CachedLLM, SQLiteCache  # noqa: E402
+from src.profiling import profile, ragas_callback  # noqa: E402
 
 load_dotenv()
 
@@ -15,48 +22,104 @@ if not open_ai_api_key:
     print("OPENAI_API_KEY not found. Please set it in your .env file or environment variables.")
     exit(1)
 
-evaluator_llm = LangchainLLMWrapper(ChatOpenAI(model="gpt-4o", openai_api_key=open_ai_api_key))
+# Judge responses are cached on disk, so rerunning unchanged rows makes no model calls.
+evaluator_llm = CachedLLM(
+    LangchainLLMWrapper(ChatOpenAI(model="gpt-4o", openai_api_key=open_ai_api_key)), SQLiteCache()
+)
+
+
+# With --profile, ragas' metric, prompt and LLM runs are timed and summarized per stage.
+PROFILE = "--profile" in sys.argv
+callbacks = [ragas_callback()] if PROFILE else None
 
 
 async def maybe_await(obj):
     return await obj if inspect.isawaitable(obj) else obj
 
 
-async def evaluate_faithfulness():
-    data_faithful = {
+def faithful_scenario():
+    return {
         "question": ["What is the capital of France?"],
         "answer": ["Paris is the capital of France."],
         "contexts": [
             ["Paris is the capital and most populous city of France. It is located on the Seine River."]
         ],
     }
-    dataset_faithful = Dataset.from_dict(data_faithful)
 
-    data_unfaithful = {
+
+def unfaithful_scenario():
+    return {
         "question": ["What is the capital of France?"],
         "answer": ["The capital of France is Berlin, which is also a major city in Germany."],
         "contexts": [
             ["Paris is the capital and most populous city of France. It is located on the Seine River."]
         ],
     }
-    dataset_unfaithful = Dataset.from_dict(data_unfaithful)
+
+
+async def evaluate_faithfulness():
+    dataset_faithful = Dataset.from_dict(faithful_scenario())
+    dataset_unfaithful = Dataset.from_dict(unfaithful_scenario())
 
     faithfulness_metric = Faithfulness()
 
     print("\n--- Evaluating Faithfulness (Faithful Scenario) ---")
-    eval_return_obj_faithful = evaluate(dataset_faithful, metrics=[faithfulness_metric], llm=evaluator_llm)
+    eval_return_obj_faithful = evaluate(dataset_faithful, metrics=[faithfulness_metric], llm=evaluator_llm,
+                                        callbacks=callbacks)
     print(f"Type of object returned by ragas.evaluate (faithful): {type(eval_return_obj_faithful)}")
     print(f"Is it awaitable? {inspect.isawaitable(eval_return_obj_faithful)}")
     result_faithful = await maybe_await(eval_return_obj_faithful)
     print(result_faithful)
 
     print("\n--- Evaluating Faithfulness (Unfaithful Scenario - Hallucination) ---")
-    eval_return_obj_unfaithful = evaluate(dataset_unfaithful, metrics=[faithfulness_metric], llm=evaluator_llm)
+    eval_return_obj_unfaithful = evaluate(dataset_unfaithful, metrics=[faithfulness_metric], llm=evaluator_llm,
+                                          callbacks=callbacks)
     print(f"Type of object returned by ragas.evaluate (unfaithful): {type(eval_return_obj_unfaithful)}")
     print(f"Is it awaitable? {inspect.isawaitable(eval_return_obj_unfaithful)}")
     result_unfaithful = await maybe_await(eval_return_obj_unfaithful)
     print(result_unfaithful)
 
 
+async def evaluate_faithfulness_batched():
+    """Scores both scenarios with one statement-extraction and one verification request in total."""
+    rows = {column: faithful_scenario()[column] + unfaithful_scenario()[column] for column in faithful_scenario()}
+    batched = BatchedFaithfulness(Faithfulness(llm=evaluator_llm), batch_size=16)
+
+    print("\n--- Evaluating Faithfulness (Both Scenarios, Batched Judge Requests) ---")
+    result = await batched.ascore_samples(rows)
+    print(result.scores)
+    stats = batched.stats()
+    print(f"{stats.requests} judge requests for {stats.rows} rows instead of {stats.per_row_requests}: "
+          f"{stats.saved} round trips saved, {stats.fallbacks} batches fell back to per-row prompts")
+
+
+async def evaluate_faithfulness_cascaded():
+    """Scores both scenarios plus an extractive answer; answers copied from the contexts skip the judge."""
+    rows = {column: faithful_scenario()[column] + unfaithful_scenario()[column] for column in faithful_scenario()}
+    rows["question"].append("Which river is Paris on?")
+    rows["answer"].append("It is located on the Seine River.")
+    rows["contexts"].append(faithful_scenario()["contexts"][0])
+
+    print("\n--- Evaluating Faithfulness (Lexical Cascade) ---")
+    result = await arun_cascade(rows, [Faithfulness()], llm=evaluator_llm)
+    print(result.result.scores)
+    stats = result.stats["faithfulness"]
+    print(f"{stats.resolved} of {stats.rows} rows ({stats.short_circuited:.0%}) decided lexically in "
+          f"{result.lexical_elapsed * 1000:.1f} ms, {stats.judged} judged in {stats.judge_elapsed:.2f}s, "
+          f"about {stats.estimated_saved:.2f}s of judge time saved")
+
+
 if __name__ == "__main__":
-    asyncio.run(evaluate_faithfulness())
+    if "--cascade" in sys.argv:
+        main = evaluate_faithfulness_cascaded
+    else:
+        main = evaluate_faithfulness_batched if "--batched" in sys.argv else evaluate_faithfulness
+    if PROFILE:
+        with profile(sample_interval=0.005) as run:
+            asyncio.run(main())
+        print("\n--- Time per Stage ---")
+        print(run.summary())
+        run.write_chrome_trace("profile_trace.json")
+        print("Chrome trace written to profile_trace.json")
+    else:
+        asyncio.run(main())
@@ -5,8 +5,13 @@ from ragas.metrics import AnswerRelevancy
 from ragas import evaluate
 from datasets import Dataset
 from ragas.llms import LangchainLLMWrapper
-from langchain_openai import ChatOpenAI
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 import inspect
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.embedding_cache import CachedEmbeddings, EmbeddingStore  # noqa: E402
+from src.llm_cache import CachedLLM, SQLiteCache  # noqa: E402
 
 load_dotenv()
 
@@ -15,8 +20,12 @@ if not open_ai_api_key:
     print("OPENAI_API_KEY not found. Please set it in your .env file or environment variables.")
     exit(1)
 
-evaluator_llm = LangchainLLMWrapper(ChatOpenAI(
-    model="gpt-4o", openai_api_key=open_ai_api_key))
+# Judge responses are cached on disk, so rerunning unchanged rows makes no model calls.
+evaluator_llm = CachedLLM(LangchainLLMWrapper(ChatOpenAI(
+    model="gpt-4o", openai_api_key=open_ai_api_key)), SQLiteCache())
+# Question embeddings are kept in a memory-mapped store, so reruns only embed new questions.
+evaluator_embeddings = CachedEmbeddings(
+    OpenAIEmbeddings(openai_api_key=open_ai_api_key), EmbeddingStore())
 
 
 async def maybe_await(obj):
@@ -54,7 +63,7 @@ async def evaluate_faithfulness():
 
     print("\n--- Evaluating Answer Relevancy (Relevant Scenario) ---")
     result_relevant = evaluate(dataset_relevant, metrics=[
-                               metrics], llm=evaluator_llm)
+                               metrics], llm=evaluator_llm, embeddings=evaluator_embeddings)
     print(
         f"Type of object returned by ragas.evaluate (result_relevant): {type(result_relevant)}")
     print(f"Is it awaitable? {inspect.isawaitable(result_relevant)}")
@@ -63,13 +72,17 @@ async def evaluate_faithfulness():
 
     print("\n--- Evaluating Answer Relevancy (Irrelevant Scenario) ---")
     result_irrelevant = evaluate(dataset_irrelevant, metrics=[
-                                 metrics], llm=evaluator_llm)
+                                 metrics], llm=evaluator_llm, embeddings=evaluator_embeddings)
     print(
         f"Type of object returned by ragas.evaluate (result_irrelevant): {type(result_irrelevant)}")
     print(f"Is it awaitable? {inspect.isawaitable(result_irrelevant)}")
     result_irrelevant = await maybe_await(result_irrelevant)
     print(result_irrelevant)
 
+    stats = evaluator_embeddings.stats()
+    print(f"\nEmbedding cache: {stats.hit_rate:.0%} hit rate ({stats.hits} hits, {stats.misses} misses), "
+          f"{stats.embed_seconds:.2f}s embedding, ~{stats.saved_seconds:.2f}s saved")
+
 
 if __name__ == "__main__":
     asyncio.run(evaluate_faithfulness())
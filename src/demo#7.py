@@ -1,12 +1,17 @@
 import os
+import sys
 from dotenv import load_dotenv
-import asyncio
 from ragas.metrics import ContextRelevance, ContextRecall
-from ragas import evaluate
 from datasets import Dataset
 from ragas.llms import LangchainLLMWrapper
 from langchain_openai import ChatOpenAI
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.context_dedup import DedupedContextRecall, DedupedContextRelevance  # noqa: E402
+from src.incremental import ResultStore, run_incremental  # noqa: E402
+from src.judge_scheduler import EvaluationJob, JudgeScheduler, RateBudget, ScheduledLLM  # noqa: E402
+from src.llm_cache import CachedLLM, SQLiteCache  # noqa: E402
+
 load_dotenv()
 
 open_ai_api_key = os.environ.get("OPENAI_API_KEY")
@@ -14,8 +19,17 @@ if not open_ai_api_key:
     print("OPENAI_API_KEY not found. Please set it in your .env file or environment variables.")
     exit(1)
 
+# Rate limits are handled by the scheduler, so the client itself must not retry 429s.
 evaluator_llm = LangchainLLMWrapper(ChatOpenAI(
-    model="gpt-4o", openai_api_key=open_ai_api_key))
+    model="gpt-4o", openai_api_key=open_ai_api_key, max_retries=0))
+judge_scheduler = JudgeScheduler(
+    max_concurrency=16,
+    budgets={"gpt-4o": RateBudget(requests_per_minute=500, tokens_per_minute=30_000)},
+)
+# Judge responses are cached on disk, so rerunning unchanged rows makes no model calls.
+judge_cache = SQLiteCache()
+# Per-row scores are stored by row fingerprint, so a rerun only scores rows that are new or changed.
+result_store = ResultStore()
 
 # Initialize Ragas metrics globally or within functions if preferred
 # Initializing here avoids re-instantiating them if they don't hold state
@@ -23,11 +37,10 @@ context_relevancy_metric = ContextRelevance()
 context_recall_metric = ContextRecall()
 
 
-async def evaluate_positive_scenarios():
+def positive_scenarios():
     """
-    Evaluates scenarios where contexts are expected to have high relevance and recall.
+    Scenarios where contexts are expected to have high relevance and recall.
     """
-    print("\n--- Evaluating Positive Scenarios (Expected High Scores) ---")
 
     data_positive = {
         "question": ["What is the capital of Japan?",
@@ -55,20 +68,13 @@ async def evaluate_positive_scenarios():
             ["The Mona Lisa was painted by Leonardo da Vinci between 1503 and 1519."],
         ],
     }
-    dataset_positive = Dataset.from_dict(data_positive)
-
-    results = evaluate(
-        dataset_positive, metrics=[
-            context_relevancy_metric, context_recall_metric], llm=evaluator_llm
-    )
-    print(results)
+    return Dataset.from_dict(data_positive)
 
 
-async def evaluate_negative_scenarios():
+def negative_scenarios():
     """
-    Evaluates scenarios where contexts are expected to have low relevance and/or recall.
+    Scenarios where contexts are expected to have low relevance and/or recall.
     """
-    print("\n--- Evaluating Negative Scenarios (Expected Low Scores) ---")
 
     data_negative = {
         "question": [
@@ -122,16 +128,57 @@ async def evaluate_negative_scenarios():
             ]
         ],
     }
-    dataset_negative = Dataset.from_dict(data_negative)
+    return Dataset.from_dict(data_negative)
+
+
+def evaluate_scenarios():
+    """
+    Evaluates both scenario datasets in one run; their judge calls share one rate-limited queue.
+    Rows scored by an earlier run with the same metrics are read from the result store.
+    """
+    metrics = [context_relevancy_metric, context_recall_metric]
+    jobs = [
+        EvaluationJob("Positive Scenarios (Expected High Scores)", positive_scenarios(), metrics),
+        EvaluationJob("Negative Scenarios (Expected Low Scores)", negative_scenarios(), metrics),
+    ]
+    result = run_incremental(jobs, result_store, llm=evaluator_llm, scheduler=judge_scheduler, cache=judge_cache)
+
+    for name, aggregates in result.aggregates.items():
+        print(f"\n--- Evaluating {name} ---")
+        print({metric: round(score, 4) for metric, score in aggregates.items()})
+
+    incremental = result.stats
+    print(f"\n{incremental.computed} of {incremental.pairs} row scores computed, {incremental.reused} reused")
+    stats = result.scheduler
+    print(f"{stats.completed} judge calls at {stats.qps:.2f} QPS, "
+          f"mean queue delay {stats.mean_queue_delay:.3f}s, {stats.rate_limited} rate limited, "
+          f"{stats.retries} retries")
+    cache_stats = judge_cache.stats()
+    print(f"Judge cache: {cache_stats.hits} hits, {cache_stats.misses} misses, {cache_stats.entries} responses stored")
+
+
+def evaluate_scenarios_deduplicated():
+    """
+    Evaluates both scenario datasets with each distinct (statement, context) and (question, contexts) pair
+    judged once, sharing verdicts between the datasets.
+    """
+    judge_llm = CachedLLM(ScheduledLLM(evaluator_llm, judge_scheduler), judge_cache)
+    scorers = [
+        DedupedContextRelevance(ContextRelevance(llm=judge_llm)),
+        DedupedContextRecall(ContextRecall(llm=judge_llm)),
+    ]
+    for name, dataset in [("Positive Scenarios", positive_scenarios()), ("Negative Scenarios", negative_scenarios())]:
+        print(f"\n--- Evaluating {name} (deduplicated) ---")
+        for scorer in scorers:
+            scores = scorer.score_samples(dataset).scores
+            print({metric: round(sum(values) / len(values), 4) for metric, values in scores.items()})
 
-    results = evaluate(
-        dataset_negative, metrics=[
-            context_relevancy_metric, context_recall_metric], llm=evaluator_llm
-    )
-    print(results)
+    for scorer in scorers:
+        stats = scorer.stats()
+        print(f"{scorer.metric.name}: {stats.unique_pairs} of {stats.pairs} pairs judged, "
+              f"{stats.requests} judge requests instead of {stats.per_row_requests} ({stats.saved} avoided)")
 
 
 if __name__ == "__main__":
-    # Run both evaluation functions
-    asyncio.run(evaluate_positive_scenarios())
-    asyncio.run(evaluate_negative_scenarios())
+    evaluate_scenarios()
+    evaluate_scenarios_deduplicated()
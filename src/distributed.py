@@ -0,0 +1,423 @@
+"""Sharded evaluation across worker processes, on this host or others.
+
+A `Coordinator` listens on a TCP address. Workers (`python -m src.distributed worker --connect host:port`)
+connect to it, authenticate with a shared key, and receive shards: slices of the input rows plus the name of a
+task and its options. Each worker runs the task on its shard and sends back a partial result, and the
+coordinator merges the partials in shard order. Messages are pickled over `multiprocessing.connection`, so only
+run workers you trust. The built-in default key is only accepted on loopback addresses; listening on or
+connecting to any other address needs a key of your own.
+
+Built-in tasks (`TASKS`) and what their partials hold:
+    rouge  per-row precision/recall/fmeasure arrays per rouge type (`score_batch`); merged by concatenation
+    bleu   per-segment BLEU statistics (`BleuAccumulator`); merged by appending, so `corpus_score()` of the result
+           is corpus BLEU of every row
+    judge  per-row ragas scores (`run_jobs`) of the metrics in `metrics`, with the LLM built by the worker
+           from `llm_factory` ("module:callable"); merged by concatenation
+
+A worker whose connection drops, or that takes longer than `shard_timeout` on a shard, is dropped and its shard
+goes back on the queue for another worker. A shard whose task raises is retried up to `max_attempts` times.
+
+Run a coordinator with local workers from the repository root with
+`python -m src.distributed coordinator rouge pairs.jsonl --local-workers 4`; pass `--listen 0.0.0.0:7777` and
+start `worker` processes on other hosts to spread the shards wider, with the same key from `--authkey` or the
+RAGAS_EVAL_AUTHKEY environment variable on every host.
+"""
+
+import argparse
+import importlib
+import ipaddress
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from collections import namedtuple
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+Task = namedtuple("Task", ["run", "merge"])
+Shard = namedtuple("Shard", ["index", "rows"])
+DistributedStats = namedtuple(
+    "DistributedStats", ["shards", "workers", "reassigned", "failed_attempts", "elapsed", "shards_per_worker"]
+)
+DistributedResult = namedtuple("DistributedResult", ["value", "stats"])
+
+AUTHKEY_ENV = "RAGAS_EVAL_AUTHKEY"
+DEFAULT_AUTHKEY = b"ragas-eval"
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _is_loopback(host):
+    # True when every address `host` resolves to is a loopback one; "" and unresolvable names are not.
+    if not host:
+        return False
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+        return all(ipaddress.ip_address(address.partition("%")[0]).is_loopback for address in addresses)
+    except (OSError, ValueError):
+        return False
+
+
+def _authkey(address, authkey):
+    # The default key is public, so it only protects connections that never leave this host.
+    if authkey is None:
+        authkey = DEFAULT_AUTHKEY
+    if authkey == DEFAULT_AUTHKEY and not _is_loopback(address[0]):
+        raise ValueError(
+            f"{address[0]!r} is not a loopback address; pass an authkey of your own (--authkey or {AUTHKEY_ENV})"
+        )
+    return authkey
+
+
+def _rouge_run(rows, rouge_types=("rouge1", "rouge2", "rougeL"), use_stemmer=False, **score_kwargs):
+    from rouge.rouge_batched import score_batch
+
+    predictions = [row["prediction"] for row in rows]
+    references = [row["reference"] for row in rows]
+    return score_batch(predictions, references, list(rouge_types), use_stemmer=use_stemmer, **score_kwargs)
+
+
+def _rouge_merge(partials):
+    return {key: np.concatenate([partial[key] for partial in partials]) for key in partials[0]}
+
+
+def _bleu_run(rows, **bleu_kwargs):
+    from src.bleu_stats import BleuAccumulator
+
+    return BleuAccumulator(**bleu_kwargs).add_corpus(
+        [row["prediction"] for row in rows], [row["reference"] for row in rows]
+    )
+
+
+def _bleu_merge(partials):
+    merged = partials[0]
+    for partial in partials[1:]:
+        merged.merge(partial)
+    return merged
+
+
+def load_callable(path):
+    """The object named by "package.module:attribute"."""
+    module, _, attribute = path.partition(":")
+    return getattr(importlib.import_module(module), attribute)
+
+
+def _judge_run(rows, metrics, llm_factory=None, embeddings_factory=None, **kwargs):
+    from src.judge_scheduler import EvaluationJob, run_jobs
+
+    llm = load_callable(llm_factory)() if llm_factory else None
+    embeddings = load_callable(embeddings_factory)() if embeddings_factory else None
+    return run_jobs([EvaluationJob(0, rows, metrics)], llm=llm, embeddings=embeddings, **kwargs).results[0].scores
+
+
+def _judge_merge(partials):
+    return {name: [score for partial in partials for score in partial[name]] for name in partials[0]}
+
+
+TASKS = {
+    "rouge": Task(_rouge_run, _rouge_merge),
+    "bleu": Task(_bleu_run, _bleu_merge),
+    "judge": Task(_judge_run, _judge_merge),
+}
+
+
+def shard_rows(rows, shard_size):
+    """`Shard`s of at most `shard_size` consecutive rows."""
+    if shard_size <= 0:
+        raise ValueError("shard_size must be positive")
+    rows = list(rows)
+    starts = range(0, len(rows), shard_size)
+    return [Shard(index, rows[start : start + shard_size]) for index, start in enumerate(starts)]
+
+
+class _Run:
+    """Book-keeping of one `Coordinator.run`."""
+
+    def __init__(self, task, options, shards):
+        self.task = task
+        self.options = options
+        self.pending = queue.Queue()
+        for shard in shards:
+            self.pending.put(shard)
+        self.results = {}
+        self.attempts = {}
+        self.remaining = len(shards)
+        self.reassigned = 0
+        self.failed_attempts = 0
+        self.error = None
+        self.done = threading.Event()
+        if not shards:
+            self.done.set()
+
+
+class Coordinator:
+    """Hands out shards to connected workers and merges their partial results.
+
+    `address` is the (host, port) to listen on; port 0 picks a free one (see `.address`). Workers may connect
+    at any time and serve every later `run`. `shard_timeout` (seconds) bounds how long one shard may take before
+    its worker is considered hung. `authkey` may only be left out (or be `DEFAULT_AUTHKEY`) on a loopback address.
+    """
+
+    def __init__(self, address=("127.0.0.1", 0), authkey=None, shard_timeout=None, max_attempts=3):
+        self.shard_timeout = shard_timeout
+        self.max_attempts = max_attempts
+        self._listener = Listener(address, authkey=_authkey(address, authkey))
+        self._lock = threading.Lock()
+        self._run = None
+        self._run_ready = threading.Condition(self._lock)
+        self._workers = {}
+        self._served = {}
+        self._closed = False
+        self._accepter = threading.Thread(target=self._accept, daemon=True)
+        self._accepter.start()
+
+    @property
+    def address(self):
+        return self._listener.address
+
+    @property
+    def workers(self):
+        with self._lock:
+            return len(self._workers)
+
+    def wait_for_workers(self, count, timeout=None):
+        """Blocks until at least `count` workers are connected; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.workers < count:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                connection = self._listener.accept()
+            except Exception:
+                # Closed listener, or a client that failed authentication.
+                if self._closed:
+                    return
+                continue
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _next_shard(self):
+        # Blocks until a run has a pending shard (returned with the run) or the coordinator closes (None).
+        while True:
+            with self._lock:
+                while not self._closed and (self._run is None or self._run.done.is_set()):
+                    self._run_ready.wait(0.1)
+                if self._closed:
+                    return None, None
+                run = self._run
+            try:
+                return run, run.pending.get(timeout=0.05)
+            except queue.Empty:
+                continue
+
+    def _serve(self, connection):
+        try:
+            hello = connection.recv()
+        except (EOFError, OSError):
+            connection.close()
+            return
+        name = hello[1] if isinstance(hello, tuple) and hello[:1] == ("hello",) else repr(hello)
+        with self._lock:
+            self._workers[id(connection)] = name
+        try:
+            while True:
+                run, shard = self._next_shard()
+                if shard is None:
+                    connection.send(("stop",))
+                    return
+                try:
+                    connection.send(("task", shard.index, run.task, shard.rows, run.options))
+                    if not connection.poll(self.shard_timeout):
+                        raise TimeoutError(f"worker {name} took longer than {self.shard_timeout}s on a shard")
+                    reply = connection.recv()
+                except (EOFError, OSError, TimeoutError):
+                    # Dead or hung worker: its shard goes to another one.
+                    with self._lock:
+                        run.reassigned += 1
+                    run.pending.put(shard)
+                    return
+                self._record(run, shard, reply, name)
+        finally:
+            with self._lock:
+                self._workers.pop(id(connection), None)
+            connection.close()
+
+    def _record(self, run, shard, reply, worker):
+        with self._lock:
+            if reply[0] == "result":
+                if shard.index not in run.results:
+                    run.results[shard.index] = reply[2]
+                    run.remaining -= 1
+                    self._served[worker] = self._served.get(worker, 0) + 1
+                if run.remaining == 0:
+                    run.done.set()
+                return
+            run.failed_attempts += 1
+            attempts = run.attempts[shard.index] = run.attempts.get(shard.index, 0) + 1
+            if attempts >= self.max_attempts:
+                run.error = f"shard {shard.index} failed {attempts} times; last error on {worker}:\n{reply[2]}"
+                run.done.set()
+                return
+        run.pending.put(shard)
+
+    def run(self, task, rows, shard_size=1000, timeout=None, **options):
+        """Scores `rows` with `task` (a name in `TASKS`) across the workers; returns a `DistributedResult`.
+
+        `options` are passed to the task on every worker. Blocks until every shard has a result; raises
+        `RuntimeError` when a shard keeps failing and `TimeoutError` after `timeout` seconds.
+        """
+        if task not in TASKS:
+            raise ValueError(f"Unknown task {task!r}, expected one of {', '.join(TASKS)}")
+        shards = shard_rows(rows, shard_size)
+        start = time.perf_counter()
+        run = _Run(task, options, shards)
+        with self._lock:
+            if self._run is not None and not self._run.done.is_set():
+                raise RuntimeError("Coordinator.run is already in progress")
+            self._run = run
+            self._served = {}
+            self._run_ready.notify_all()
+        if not run.done.wait(timeout):
+            run.error = run.error or "timed out"
+            run.done.set()
+            raise TimeoutError(f"{run.remaining} of {len(shards)} shards unfinished after {timeout}s")
+        if run.error is not None:
+            raise RuntimeError(run.error)
+        partials = [run.results[index] for index in range(len(shards))]
+        value = TASKS[task].merge(partials) if partials else None
+        with self._lock:
+            stats = DistributedStats(
+                len(shards),
+                len(self._workers),
+                run.reassigned,
+                run.failed_attempts,
+                time.perf_counter() - start,
+                dict(self._served),
+            )
+        return DistributedResult(value, stats)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._run_ready.notify_all()
+        self._listener.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def run_worker(address, authkey=None, name=None):
+    """Serves shards from the coordinator at `address` until it says stop or goes away; returns shards done.
+
+    As with `Coordinator`, `authkey` may only be left out on a loopback address.
+    """
+    connection = Client(address, authkey=_authkey(address, authkey))
+    connection.send(("hello", name or f"{socket.gethostname()}:{os.getpid()}"))
+    done = 0
+    try:
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                return done
+            if message[0] == "stop":
+                return done
+            _, index, task, rows, options = message
+            try:
+                reply = ("result", index, TASKS[task].run(rows, **options))
+            except Exception:
+                reply = ("error", index, traceback.format_exc())
+            connection.send(reply)
+            done += 1
+    finally:
+        connection.close()
+
+
+def start_local_workers(address, count, authkey=None):
+    """Starts `count` worker processes on this host connected to `address`; returns their `Popen`s."""
+    env = dict(os.environ, **{AUTHKEY_ENV: _authkey(address, authkey).decode("utf-8")})
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [_ROOT, env.get("PYTHONPATH")]))
+    host, port = address
+    return [
+        subprocess.Popen(
+            [sys.executable, "-m", "src.distributed", "worker", "--connect", f"{host}:{port}", "--name", f"local-{i}"],
+            cwd=_ROOT,
+            env=env,
+        )
+        for i in range(count)
+    ]
+
+
+def _parse_address(text):
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--authkey",
+        default=os.environ.get(AUTHKEY_ENV),
+        help=f"shared key (default: ${AUTHKEY_ENV}); required unless every address is loopback",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    worker = commands.add_parser("worker", help="serve shards from a coordinator")
+    worker.add_argument("--connect", required=True, help="coordinator host:port")
+    worker.add_argument("--name")
+    coordinator = commands.add_parser("coordinator", help="shard a file of prediction/reference pairs")
+    coordinator.add_argument("task", choices=["rouge", "bleu"])
+    coordinator.add_argument("path", help=".jsonl or .parquet file with one prediction/reference pair per row")
+    coordinator.add_argument("--listen", default="127.0.0.1:0", help="host:port to accept workers on")
+    coordinator.add_argument("--local-workers", type=int, default=os.cpu_count())
+    coordinator.add_argument("--shard-size", type=int, default=1000)
+    coordinator.add_argument("--shard-timeout", type=float)
+    args = parser.parse_args()
+    authkey = args.authkey.encode("utf-8") if args.authkey else None
+    try:
+        _authkey(_parse_address(args.connect if args.command == "worker" else args.listen), authkey)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.command == "worker":
+        run_worker(_parse_address(args.connect), authkey=authkey, name=args.name)
+        return
+
+    from src.streaming import iter_chunks
+
+    rows = [
+        {"prediction": prediction, "reference": reference}
+        for predictions, references in iter_chunks(args.path)
+        for prediction, reference in zip(predictions, references)
+    ]
+    with Coordinator(_parse_address(args.listen), authkey=authkey, shard_timeout=args.shard_timeout) as coordinator:
+        print(f"listening on {coordinator.address[0]}:{coordinator.address[1]}")
+        processes = start_local_workers(coordinator.address, args.local_workers, authkey=authkey)
+        try:
+            result = coordinator.run(args.task, rows, shard_size=args.shard_size)
+        finally:
+            coordinator.close()
+            for process in processes:
+                process.wait()
+    stats = result.stats
+    print(f"{stats.shards} shards on {len(stats.shards_per_worker)} workers in {stats.elapsed:.2f}s, "
+          f"{stats.reassigned} reassigned")
+    if args.task == "bleu":
+        print(result.value.corpus_score())
+    else:
+        for rouge_type, values in result.value.items():
+            print(f"{rouge_type}: {values[:, 2].mean():.4f}")
+
+
+if __name__ == "__main__":
+    main()
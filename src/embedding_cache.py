@@ -0,0 +1,270 @@
+"""Persistent embedding store and batched AnswerRelevancy scoring.
+
+`EmbeddingStore` keeps embeddings in a memory-mapped float32 matrix (`<path>.f32`). A sidecar file
+(`<path>.keys`) holds the dimension followed by one SHA-256 digest of (model, text) per matrix row, and is
+loaded into a hash-to-row index on open. Rows are only appended, and a key is written after its row, so an
+interrupted run never indexes a missing vector. `CachedEmbeddings` answers embedding calls from a store and embeds only the texts it has not
+seen, in one call per batch. `BatchedAnswerRelevancy` scores a batch of rows with ragas' question generation,
+then compares every generated question with its row's question in a single vectorized pass over normalized
+matrices.
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+from ragas.embeddings import BaseRagasEmbeddings
+from ragas.metrics import AnswerRelevancy
+from ragas.metrics._answer_relevance import ResponseRelevanceInput
+from ragas.run_config import RunConfig
+
+from src.batch_scoring import BatchResult
+from src.judge_scheduler import to_samples
+
+EmbeddingStats = namedtuple(
+    "EmbeddingStats", ["hits", "misses", "hit_rate", "embed_seconds", "saved_seconds", "rows"]
+)
+
+DEFAULT_STORE_PATH = os.path.join(".cache", "embeddings")
+_DIGEST_SIZE = 32
+_HEADER_SIZE = 8
+
+
+def embedding_key(model, text):
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).digest()
+
+
+class EmbeddingStore:
+    """Append-only, memory-mapped float32 matrix of embeddings indexed by `embedding_key`."""
+
+    def __init__(self, path=DEFAULT_STORE_PATH, initial_capacity=1024):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.dim = None
+        self._initial_capacity = initial_capacity
+        self._matrix = None
+        self._index = {}
+        if os.path.exists(path + ".keys"):
+            with open(path + ".keys", "rb") as f:
+                self.dim = int.from_bytes(f.read(_HEADER_SIZE), "little")
+                keys = f.read()
+            count = len(keys) // _DIGEST_SIZE
+            self._index = {keys[i * _DIGEST_SIZE : (i + 1) * _DIGEST_SIZE]: i for i in range(count)}
+            capacity = os.path.getsize(path + ".f32") // (4 * self.dim) if os.path.exists(path + ".f32") else 0
+            if capacity:
+                self._matrix = np.memmap(path + ".f32", dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def _reserve(self, rows):
+        # Grows the backing file (doubling) so that `rows` more vectors fit.
+        needed = len(self._index) + rows
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(self._initial_capacity, capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        with open(self.path + ".f32", "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._matrix = np.memmap(self.path + ".f32", dtype=np.float32, mode="r+", shape=(new_capacity, self.dim))
+
+    def rows(self, keys):
+        """Row numbers of `keys`, -1 where a key is not stored."""
+        return np.fromiter((self._index.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+
+    def get(self, keys):
+        """Stored vectors of `keys` as an (n, dim) float32 array; raises `KeyError` if any key is not stored."""
+        rows = self.rows(keys)
+        missing = [keys[i] for i in np.flatnonzero(rows < 0)]
+        if missing:
+            raise KeyError(f"{len(missing)} keys not stored: {', '.join(key.hex() for key in missing[:5])}")
+        return np.asarray(self._matrix[rows])
+
+    def add(self, keys, vectors):
+        """Appends `vectors` (n, dim) under `keys`; keys already stored are skipped."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(keys), -1)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            with open(self.path + ".keys", "wb") as f:
+                f.write(self.dim.to_bytes(_HEADER_SIZE, "little"))
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional embeddings, got {vectors.shape[1]}")
+        new = [(key, vector) for key, vector in zip(keys, vectors) if key not in self._index]
+        if not new:
+            return
+        self._reserve(len(new))
+        start = len(self._index)
+        self._matrix[start : start + len(new)] = np.stack([vector for _, vector in new])
+        self._matrix.flush()
+        with open(self.path + ".keys", "ab") as f:
+            f.write(b"".join(key for key, _ in new))
+        for offset, (key, _) in enumerate(new):
+            self._index[key] = start + offset
+
+    def close(self):
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+
+
+def _model_name(embeddings):
+    inner = getattr(embeddings, "embeddings", embeddings)
+    return getattr(inner, "model", None) or getattr(inner, "model_name", None) or type(inner).__name__
+
+
+class CachedEmbeddings(BaseRagasEmbeddings):
+    """ragas embeddings that answer repeated texts from an `EmbeddingStore`.
+
+    `embeddings` is a langchain or ragas embeddings object. Texts missing from the store are de-duplicated and
+    embedded in one call. `stats()` reports the hit rate and an estimate of the embedding time saved: hits times
+    the mean time per embedded text.
+    """
+
+    def __init__(self, embeddings, store, model=None, run_config=None):
+        super().__init__()
+        self.embeddings = embeddings
+        self.store = store
+        self.model = model or _model_name(embeddings)
+        self.hits = 0
+        self.misses = 0
+        self.embed_seconds = 0.0
+        self.set_run_config(run_config or RunConfig())
+
+    def _lookup(self, texts):
+        keys = [embedding_key(self.model, text) for text in texts]
+        missing = list(dict.fromkeys(text for text, key in zip(texts, keys) if key not in self.store))
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return keys, missing
+
+    def _store(self, texts, vectors, elapsed):
+        self.embed_seconds += elapsed
+        self.store.add([embedding_key(self.model, text) for text in texts], vectors)
+
+    def embed_matrix(self, texts):
+        """Embeddings of `texts` as an (n, dim) float32 array."""
+        keys, missing = self._lookup(texts)
+        if missing:
+            start = time.perf_counter()
+            vectors = self.embeddings.embed_documents(missing)
+            self._store(missing, vectors, time.perf_counter() - start)
+        return self.store.get(keys)
+
+    async def aembed_matrix(self, texts):
+        keys, missing = self._lookup(texts)
+        if missing:
+            start = time.perf_counter()
+            vectors = await self.embeddings.aembed_documents(missing)
+            self._store(missing, vectors, time.perf_counter() - start)
+        return self.store.get(keys)
+
+    def embed_query(self, text):
+        return self.embed_matrix([text])[0].tolist()
+
+    def embed_documents(self, texts):
+        return self.embed_matrix(texts).tolist()
+
+    async def aembed_query(self, text):
+        return (await self.aembed_matrix([text]))[0].tolist()
+
+    async def aembed_documents(self, texts):
+        return (await self.aembed_matrix(texts)).tolist()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        per_text = self.embed_seconds / self.misses if self.misses else 0.0
+        return EmbeddingStats(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / lookups if lookups else 0.0,
+            embed_seconds=self.embed_seconds,
+            saved_seconds=self.hits * per_text,
+            rows=len(self.store),
+        )
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return matrix / norms
+
+
+def relevancy_scores(questions, generated, noncommittal, embeddings):
+    """AnswerRelevancy scores from each row's question and its generated questions, all rows at once.
+
+    `generated` holds one list of generated questions per row and `noncommittal` one list of flags per row.
+    `embeddings` is a `CachedEmbeddings`. A row scores the mean cosine similarity of its generated questions to
+    its question, or 0 when any generation was noncommittal, or NaN when every generated question is empty.
+    """
+    owners = np.repeat(np.arange(len(questions)), [len(row) for row in generated])
+    flat = [question for row in generated for question in row]
+    matrix = _normalize(embeddings.embed_matrix(list(questions) + flat).astype(np.float64))
+    # Row-wise dot products of every generated question with its own row's question, in one vectorized pass.
+    similarities = np.einsum("ij,ij->i", matrix[len(questions) :], matrix[owners])
+    means = np.bincount(owners, weights=similarities, minlength=len(questions)) / np.maximum(
+        np.bincount(owners, minlength=len(questions)), 1
+    )
+    committal = np.array([not any(flags) for flags in noncommittal], dtype=np.float64)
+    empty = np.array([all(question == "" for question in row) for row in generated])
+    return np.where(empty, np.nan, means * committal)
+
+
+class BatchedAnswerRelevancy:
+    """Scores samples with `metric` (an `AnswerRelevancy` with its `llm` set) and `embeddings` (`CachedEmbeddings`).
+
+    Question generation is per row, as in ragas, with at most `max_concurrency` rows in flight. The similarity
+    step embeds every question of the batch through the cache and scores all rows at once.
+    """
+
+    def __init__(self, embeddings, metric=None, max_concurrency=16):
+        self.metric = metric or AnswerRelevancy()
+        self.embeddings = embeddings
+        self.max_concurrency = max_concurrency
+
+    async def _generate(self, row, semaphore):
+        prompt_input = ResponseRelevanceInput(response=row["response"])
+        async with semaphore:
+            return await asyncio.gather(
+                *(
+                    self.metric.question_generation.generate(data=prompt_input, llm=self.metric.llm)
+                    for _ in range(self.metric.strictness)
+                )
+            )
+
+    async def ascore_samples(self, samples):
+        """Scores `samples` (anything `to_samples` accepts) and returns a `BatchResult`."""
+        if self.metric.llm is None:
+            raise ValueError("metric.llm must be set to compute answer relevancy")
+        rows = [sample.to_dict() for sample in to_samples(samples)]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        start = time.perf_counter()
+        outputs = await asyncio.gather(*(self._generate(row, semaphore) for row in rows))
+        scores = relevancy_scores(
+            [row["user_input"] for row in rows],
+            [[output.question for output in row_outputs] for row_outputs in outputs],
+            [[output.noncommittal for output in row_outputs] for row_outputs in outputs],
+            self.embeddings,
+        )
+        elapsed = time.perf_counter() - start
+        return BatchResult(
+            {self.metric.name: scores.tolist()}, elapsed, len(rows) / elapsed if elapsed > 0 else math.inf
+        )
+
+    def score_samples(self, samples):
+        """Synchronous entry point: runs `ascore_samples` on a single event loop."""
+        return asyncio.run(self.ascore_samples(samples))
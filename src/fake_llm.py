@@ -0,0 +1,140 @@
+"""Local stand-ins for hosted models, for exercising LLM judges without network calls.
+
+`FakeChatModel` answers every prompt with `responder(prompt_text)` after `latency` seconds and can simulate the
+HTTP 429 responses a rate-limited provider sends, either on a fixed cadence or whenever more than
+`max_concurrent` requests are in flight. `FakeEmbeddings` embeds texts deterministically by hashing their words, and
+`faithfulness_responder` answers ragas' Faithfulness prompts.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+
+class FakeRateLimitError(Exception):
+    """Raised by `FakeChatModel` in place of a provider's HTTP 429 response."""
+
+    status_code = 429
+
+    def __init__(self, message="Rate limit exceeded", retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model whose replies come from a Python callable.
+
+    `responder` receives the prompt as one string (the message contents joined by newlines) and returns the reply.
+    Every `rate_limit_every`-th call, and every call that would exceed `max_concurrent` in-flight requests, raises
+    `FakeRateLimitError` instead. `calls`, `rate_limited` and `peak_concurrency` count what the model has seen.
+    """
+
+    responder: Callable[[str], str]
+    latency: float = 0.0
+    rate_limit_every: int = 0
+    max_concurrent: Optional[int] = None
+    retry_after: Optional[float] = None
+    model_name: str = "fake-chat"
+
+    _calls: int = PrivateAttr(default=0)
+    _rate_limited: int = PrivateAttr(default=0)
+    _in_flight: int = PrivateAttr(default=0)
+    _peak_concurrency: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    @property
+    def calls(self):
+        return self._calls
+
+    @property
+    def rate_limited(self):
+        return self._rate_limited
+
+    @property
+    def peak_concurrency(self):
+        return self._peak_concurrency
+
+    def _admit(self):
+        self._calls += 1
+        over_limit = self.max_concurrent is not None and self._in_flight >= self.max_concurrent
+        if over_limit or (self.rate_limit_every and self._calls % self.rate_limit_every == 0):
+            self._rate_limited += 1
+            raise FakeRateLimitError(retry_after=self.retry_after)
+        self._in_flight += 1
+        self._peak_concurrency = max(self._peak_concurrency, self._in_flight)
+
+    def _result(self, messages: List) -> ChatResult:
+        prompt = "\n".join(str(message.content) for message in messages)
+        message = AIMessage(content=self.responder(prompt), response_metadata={"finish_reason": "stop"})
+        return ChatResult(generations=[ChatGeneration(message=message, generation_info={"finish_reason": "stop"})])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._admit()
+        try:
+            time.sleep(self.latency)
+            return self._result(messages)
+        finally:
+            self._in_flight -= 1
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._admit()
+        try:
+            await asyncio.sleep(self.latency)
+            return self._result(messages)
+        finally:
+            self._in_flight -= 1
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings: each lowercased word adds +-1 to a hashed coordinate.
+
+    Texts sharing words get a positive cosine similarity, identical texts a similarity of 1. `calls` and
+    `texts_embedded` count the requests and texts seen; each request sleeps `latency` seconds.
+    """
+
+    def __init__(self, dim=64, latency=0.0, model="fake-embeddings"):
+        self.dim = dim
+        self.latency = latency
+        self.model = model
+        self.calls = 0
+        self.texts_embedded = 0
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = int.from_bytes(hashlib.sha256(word.encode("utf-8")).digest()[:8], "little")
+            vector[digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        self.texts_embedded += len(texts)
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def faithfulness_responder(prompt):
+    """Answers ragas' statement and NLI prompts: one statement per sentence, verdict 1 if it is in the context."""
+    data = json.loads(prompt.rsplit("input:", 1)[1].rsplit("Output:", 1)[0])
+    if "context" in data:
+        verdicts = [
+            {"statement": s, "reason": "", "verdict": int(s in data["context"])} for s in data["statements"]
+        ]
+        return json.dumps({"statements": verdicts})
+    return json.dumps({"statements": [s.strip() + "." for s in data["answer"].split(".") if s.strip()]})
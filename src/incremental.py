@@ -0,0 +1,242 @@
+"""Incremental evaluation: only rows that are new or changed since the last run are scored.
+
+Every (row, metric) pair gets a fingerprint: the SHA-256 of the row's question, answer, contexts and reference
+together with the metric's name, class, scalar settings, prompts and judge model. `ResultStore` keeps one score
+per fingerprint in SQLite. `run_incremental` looks every pair up in the store, scores only the missing ones with
+`run_jobs` (so judge calls still go through the scheduler and cache), stores the new scores, and rebuilds each
+job's per-row scores and aggregates from the store. A rerun where 1% of the rows changed scores about 1% of the
+pairs. Failed scores (NaN) are not stored, so they are retried on the next run.
+
+Inspect or clear a store from the repository root with `python -m src.incremental .cache/results.sqlite [--clear]`.
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from src.batch_scoring import BatchResult
+from src.judge_scheduler import EvaluationJob, arun_jobs, to_samples
+
+IncrementalStats = namedtuple("IncrementalStats", ["pairs", "reused", "computed", "failed", "elapsed"])
+IncrementalResult = namedtuple("IncrementalResult", ["results", "aggregates", "stats", "scheduler"])
+StoreStats = namedtuple("StoreStats", ["entries", "hits", "misses"])
+
+DEFAULT_STORE_PATH = os.path.join(".cache", "results.sqlite")
+# The row fields a fingerprint covers, in SingleTurnSample names.
+FINGERPRINT_FIELDS = ("user_input", "response", "retrieved_contexts", "reference")
+# SQLite's default limit on host parameters in one statement is 999 on older builds.
+_CHUNK = 900
+
+
+def _model_name(model):
+    if model is None:
+        return None
+    if getattr(model, "model", None):
+        return model.model
+    inner = getattr(model, "langchain_llm", None) or getattr(model, "embeddings", None) or model
+    return getattr(inner, "model_name", None) or getattr(inner, "model", None) or type(inner).__name__
+
+
+def _dump(value):
+    return value.model_dump() if hasattr(value, "model_dump") else value
+
+
+def _prompt_config(prompt):
+    return {
+        "instruction": getattr(prompt, "instruction", None),
+        "examples": [[_dump(part) for part in example] for example in getattr(prompt, "examples", ())],
+        "language": getattr(prompt, "language", None),
+    }
+
+
+def metric_config(metric, llm=None, embeddings=None):
+    """JSON-serializable description of everything about `metric` that can change its scores.
+
+    `llm` and `embeddings` stand in for the metric's own when it has none, as `run_jobs` assigns them.
+    """
+    settings = {}
+    if dataclasses.is_dataclass(metric):
+        for field in dataclasses.fields(metric):
+            value = getattr(metric, field.name)
+            if isinstance(value, (bool, int, float, str)) and not field.name.startswith("_"):
+                settings[field.name] = value
+    prompts = metric.get_prompts() if hasattr(metric, "get_prompts") else {}
+    return {
+        "class": f"{type(metric).__module__}.{type(metric).__qualname__}",
+        "settings": settings,
+        "prompts": {name: _prompt_config(prompt) for name, prompt in sorted(prompts.items())},
+        "llm": _model_name(getattr(metric, "llm", None) or (llm if hasattr(metric, "llm") else None)),
+        "embeddings": _model_name(
+            getattr(metric, "embeddings", None) or (embeddings if hasattr(metric, "embeddings") else None)
+        ),
+    }
+
+
+def metric_key(metric, llm=None, embeddings=None):
+    """Hex SHA-256 of `metric_config`."""
+    payload = json.dumps(metric_config(metric, llm, embeddings), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def row_fingerprint(sample, metric_key):
+    """Hex SHA-256 of `sample`'s `FINGERPRINT_FIELDS` and a `metric_key`."""
+    payload = json.dumps(
+        [metric_key] + [getattr(sample, field, None) for field in FINGERPRINT_FIELDS], ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultStore:
+    """Per-row scores in one SQLite table, keyed by `row_fingerprint`.
+
+    `hits` and `misses` count this process's lookups since it opened the database.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS scores "
+            "(fingerprint TEXT PRIMARY KEY, metric TEXT NOT NULL, score REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def get_many(self, fingerprints):
+        """{fingerprint: score} for the stored ones among `fingerprints`."""
+        unique = list(dict.fromkeys(fingerprints))
+        found = {}
+        with self._lock:
+            for i in range(0, len(unique), _CHUNK):
+                chunk = unique[i : i + _CHUNK]
+                found.update(
+                    self._db.execute(
+                        f"SELECT fingerprint, score FROM scores WHERE fingerprint IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                )
+        self.hits += len(found)
+        self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, entries):
+        """Stores (fingerprint, metric name, score) triples, replacing earlier scores of the same fingerprints."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO scores (fingerprint, metric, score, updated) VALUES (?, ?, ?, ?)",
+                    [(fingerprint, metric, float(score), now) for fingerprint, metric, score in entries],
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM scores")
+            self._db.execute("VACUUM")
+
+    def stats(self):
+        return StoreStats(len(self), self.hits, self.misses)
+
+    def close(self):
+        self._db.close()
+
+    def __repr__(self):
+        return f"ResultStore(path={self.path!r})"
+
+
+async def arun_incremental(jobs, store, llm=None, embeddings=None, **kwargs):
+    """Like `arun_jobs`, but answers (row, metric) pairs already in `store` from it; returns an `IncrementalResult`.
+
+    `results` maps each job name to a `BatchResult` of all of its rows, `aggregates` to the NaN-ignoring mean
+    of each metric over them. `elapsed` covers the whole run, lookups included. `scheduler` holds the
+    `SchedulerStats` of the judge calls that were made. Other keyword arguments go to `arun_jobs`.
+    """
+    start = time.perf_counter()
+    keys = {id(metric): metric_key(metric, llm, embeddings) for job in jobs for metric in job.metrics}
+    plans = []
+    pending = []
+    for job in jobs:
+        samples = to_samples(job.dataset)
+        for metric in job.metrics:
+            fingerprints = [row_fingerprint(sample, keys[id(metric)]) for sample in samples]
+            stored = store.get_many(fingerprints)
+            missing = [i for i, fingerprint in enumerate(fingerprints) if fingerprint not in stored]
+            plans.append((job, metric, fingerprints, stored, missing))
+            if missing:
+                pending.append(EvaluationJob(len(plans) - 1, [samples[i] for i in missing], [metric]))
+
+    computed = await arun_jobs(pending, llm=llm, embeddings=embeddings, **kwargs)
+    new_entries = []
+    failed = 0
+    for plan_index, batch in computed.results.items():
+        job, metric, fingerprints, stored, missing = plans[plan_index]
+        for i, score in zip(missing, batch.scores[metric.name]):
+            if score is None or math.isnan(score):
+                failed += 1
+                continue
+            stored[fingerprints[i]] = score
+            new_entries.append((fingerprints[i], metric.name, score))
+    store.put_many(new_entries)
+
+    elapsed = time.perf_counter() - start
+    scores = {job.name: {} for job in jobs}
+    for job, metric, fingerprints, stored, missing in plans:
+        scores[job.name][metric.name] = [stored.get(fingerprint, math.nan) for fingerprint in fingerprints]
+    results = {}
+    aggregates = {}
+    for job in jobs:
+        rows = len(next(iter(scores[job.name].values()), []))
+        results[job.name] = BatchResult(scores[job.name], elapsed, rows / elapsed if elapsed > 0 else math.inf)
+        aggregates[job.name] = {
+            name: float(np.nanmean(values)) if not np.all(np.isnan(values)) else math.nan
+            for name, values in scores[job.name].items()
+        }
+    pairs = sum(len(plan[2]) for plan in plans)
+    new = sum(len(plan[4]) for plan in plans)
+    stats = IncrementalStats(pairs, pairs - new, new - failed, failed, elapsed)
+    return IncrementalResult(results, aggregates, stats, computed.stats)
+
+
+def run_incremental(jobs, store, **kwargs):
+    """Synchronous entry point: runs `arun_incremental` on a single event loop."""
+    return asyncio.run(arun_incremental(jobs, store, **kwargs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=DEFAULT_STORE_PATH)
+    parser.add_argument("--clear", action="store_true", help="delete every stored score")
+    args = parser.parse_args()
+
+    store = ResultStore(args.path)
+    if args.clear:
+        store.clear()
+    print(f"{args.path}: {len(store)} stored scores")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+"""Rate-limited scheduling of LLM judge calls across several evaluation jobs.
+
+`JudgeScheduler` is a bounded-concurrency queue in front of a model provider. Each call waits for a free slot
+and for its model's requests/tokens-per-minute budget. A 429 response halves the concurrency limit, and the
+call is retried after an exponential backoff with full jitter. Successful calls grow the limit back one slot
+at a time. `ScheduledLLM` routes a ragas LLM's calls through a scheduler. `run_jobs` scores any number of
+(dataset, metrics) jobs on one event loop, so every judge call of every job shares one queue.
+"""
+
+import asyncio
+import math
+import random
+import time
+from collections import namedtuple
+
+from langchain_core.language_models import BaseLanguageModel
+from ragas.dataset_schema import SingleTurnSample
+from ragas.exceptions import LLMDidNotFinishException
+from ragas.llms import BaseRagasLLM, LangchainLLMWrapper
+from ragas.metrics.base import MetricWithEmbeddings, MetricWithLLM
+from ragas.run_config import RunConfig
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from src.batch_scoring import ascore_samples
+from src.llm_cache import CachedLLM
+from src.profiling import record
+
+SchedulerStats = namedtuple(
+    "SchedulerStats",
+    [
+        "requests",
+        "completed",
+        "failed",
+        "retries",
+        "rate_limited",
+        "elapsed",
+        "qps",
+        "mean_queue_delay",
+        "max_queue_delay",
+        "peak_concurrency",
+        "concurrency_limit",
+    ],
+)
+EvaluationJob = namedtuple("EvaluationJob", ["name", "dataset", "metrics"])
+JobsResult = namedtuple("JobsResult", ["results", "stats"])
+
+DEFAULT_MODEL = "default"
+
+# Legacy (v1) dataset columns, as used by the demos, and their SingleTurnSample fields.
+_V1_COLUMNS = {
+    "question": "user_input",
+    "answer": "response",
+    "contexts": "retrieved_contexts",
+    "ground_truth": "reference",
+}
+
+
+def is_rate_limit_error(exc):
+    """True for HTTP 429 errors: openai's `RateLimitError`, httpx errors and anything with `status_code == 429`."""
+    if getattr(exc, "status_code", None) == 429:
+        return True
+    if getattr(getattr(exc, "response", None), "status_code", None) == 429:
+        return True
+    return "RateLimit" in type(exc).__name__
+
+
+def _retry_after(exc):
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+        retry_after = headers.get("retry-after")
+    try:
+        return float(retry_after) if retry_after is not None else None
+    except ValueError:
+        return None
+
+
+class _TokenBucket:
+    """Per-minute budget that refills continuously and holds at most one minute's worth.
+
+    `reserve` takes the amount at once and may drive the level negative; the caller sleeps for the returned
+    number of seconds, which is how long the refill takes to cover the deficit.
+    """
+
+    def __init__(self, per_minute):
+        if per_minute <= 0:
+            raise ValueError("per-minute budgets must be positive")
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        self._refill()
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+    def refund(self, amount):
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateBudget:
+    """Requests-per-minute and tokens-per-minute limits of one model; either may be None (unlimited)."""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests = _TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def reserve(self, tokens=0):
+        """Takes one request and `tokens` tokens from the budget; returns the seconds to wait before sending."""
+        wait = self.requests.reserve(1) if self.requests else 0.0
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+    def refund_tokens(self, tokens):
+        """Corrects an estimate once the real usage is known; a negative `tokens` charges the difference."""
+        if self.tokens:
+            self.tokens.refund(tokens)
+
+
+class JudgeScheduler:
+    """Bounded-concurrency queue with per-model rate budgets and adaptive backoff on 429 responses.
+
+    At most `concurrency_limit` calls run at once. It starts at `max_concurrency` and is halved on a 429
+    (once per wave of calls that were in flight together), never below `min_concurrency`. It grows by one
+    after `concurrency_limit` successes in a row. A rate-limited call is retried up to `max_retries` times. The
+    wait is the provider's Retry-After when given, otherwise uniform in [0, min(max_delay, base_delay * 2**attempt)].
+    """
+
+    def __init__(
+        self,
+        max_concurrency=16,
+        budgets=None,
+        min_concurrency=1,
+        max_retries=6,
+        base_delay=0.5,
+        max_delay=60.0,
+        adaptive=True,
+        seed=None,
+    ):
+        if max_concurrency <= 0 or min_concurrency <= 0:
+            raise ValueError("max_concurrency and min_concurrency must be positive")
+        if min_concurrency > max_concurrency:
+            raise ValueError("min_concurrency must not exceed max_concurrency")
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = max_concurrency
+        self.budgets = dict(budgets or {})
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.adaptive = adaptive
+        self._random = random.Random(seed)
+        self._condition = None
+        self._loop = None
+        self._in_flight = 0
+        self._successes = 0
+        self._generation = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.requests = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.peak_concurrency = 0
+        self._queue_delays = []
+        self._started = None
+        self._finished = None
+
+    def _slots(self):
+        # asyncio primitives bind to the loop that first waits on them; rebuild for each new loop.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def _acquire(self):
+        slots = self._slots()
+        async with slots:
+            await slots.wait_for(lambda: self._in_flight < self.concurrency_limit)
+            self._in_flight += 1
+            self.peak_concurrency = max(self.peak_concurrency, self._in_flight)
+
+    async def _release(self):
+        slots = self._slots()
+        async with slots:
+            self._in_flight -= 1
+            slots.notify_all()
+
+    def _on_success(self):
+        self.completed += 1
+        if not self.adaptive:
+            return
+        self._successes += 1
+        if self._successes >= self.concurrency_limit and self.concurrency_limit < self.max_concurrency:
+            self.concurrency_limit += 1
+            self._successes = 0
+
+    def _on_rate_limit(self, generation):
+        self.rate_limited += 1
+        self._successes = 0
+        # Calls sent before the last decrease already saw the old limit; only the first of them shrinks it.
+        if self.adaptive and generation == self._generation:
+            self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit // 2)
+            self._generation += 1
+
+    def _backoff(self, attempt, exc):
+        retry_after = _retry_after(exc)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return self._random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    async def submit(self, call, model=DEFAULT_MODEL, tokens=0):
+        """Awaits `call()` (a zero-argument coroutine function) under the concurrency limit and `model`'s budget."""
+        budget = self.budgets.get(model)
+        self.requests += 1
+        if self._started is None:
+            self._started = time.perf_counter()
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            await self._acquire()
+            try:
+                wait = budget.reserve(tokens) if budget else 0.0
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                started = time.perf_counter()
+                self._queue_delays.append(started - queued)
+                record("judge.queue", queued, started, model=model)
+                generation = self._generation
+                try:
+                    result = await call()
+                except Exception as exc:
+                    if not is_rate_limit_error(exc) or attempt >= self.max_retries:
+                        self.failed += 1
+                        raise
+                    self._on_rate_limit(generation)
+                    delay = self._backoff(attempt, exc)
+                else:
+                    self._on_success()
+                    self._finished = time.perf_counter()
+                    return result
+            finally:
+                await self._release()
+            attempt += 1
+            self.retries += 1
+            backoff = time.perf_counter()
+            await asyncio.sleep(delay)
+            record("judge.backoff", backoff, time.perf_counter(), model=model)
+
+    def record_usage(self, model, estimated_tokens, actual_tokens):
+        """Settles a call's token reservation against the usage the provider reported."""
+        budget = self.budgets.get(model)
+        if budget:
+            budget.refund_tokens(estimated_tokens - actual_tokens)
+
+    def stats(self):
+        elapsed = (self._finished - self._started) if self._finished is not None else 0.0
+        delays = self._queue_delays
+        return SchedulerStats(
+            requests=self.requests,
+            completed=self.completed,
+            failed=self.failed,
+            retries=self.retries,
+            rate_limited=self.rate_limited,
+            elapsed=elapsed,
+            qps=self.completed / elapsed if elapsed > 0 else math.inf,
+            mean_queue_delay=sum(delays) / len(delays) if delays else 0.0,
+            max_queue_delay=max(delays, default=0.0),
+            peak_concurrency=self.peak_concurrency,
+            concurrency_limit=self.concurrency_limit,
+        )
+
+
+def _model_name(llm):
+    inner = getattr(llm, "langchain_llm", llm)
+    return getattr(inner, "model_name", None) or getattr(inner, "model", None) or DEFAULT_MODEL
+
+
+class ScheduledLLM(BaseRagasLLM):
+    """ragas LLM whose async calls go through a `JudgeScheduler`.
+
+    Rate-limit errors are retried by the scheduler; other errors get ragas' usual `run_config` retries. The
+    wrapped client should not retry 429s itself (e.g. `ChatOpenAI(max_retries=0)`), or the scheduler never sees
+    them. Token budgets are charged with an estimate (prompt characters / 4 plus `expected_output_tokens`) and
+    corrected from the provider's reported usage when available.
+    """
+
+    def __init__(self, llm, scheduler, model=None, expected_output_tokens=256):
+        super().__init__(run_config=llm.run_config, multiple_completion_supported=llm.multiple_completion_supported)
+        self.llm = llm
+        self.scheduler = scheduler
+        self.model = model or _model_name(llm)
+        self.expected_output_tokens = expected_output_tokens
+
+    def set_run_config(self, run_config):
+        self.run_config = run_config
+        self.llm.set_run_config(run_config)
+
+    def generate_text(self, prompt, n=1, temperature=0.01, stop=None, callbacks=None):
+        return self.llm.generate_text(prompt, n=n, temperature=temperature, stop=stop, callbacks=callbacks)
+
+    async def agenerate_text(self, prompt, n=1, temperature=0.01, stop=None, callbacks=None):
+        estimate = n * (len(prompt.to_string()) // 4 + self.expected_output_tokens)
+        result = await self.scheduler.submit(
+            lambda: self.llm.agenerate_text(prompt, n=n, temperature=temperature, stop=stop, callbacks=callbacks),
+            model=self.model,
+            tokens=estimate,
+        )
+        usage = (result.llm_output or {}).get("token_usage") or {}
+        if usage.get("total_tokens"):
+            self.scheduler.record_usage(self.model, estimate, usage["total_tokens"])
+        return result
+
+    def is_finished(self, response):
+        return self.llm.is_finished(response)
+
+    async def generate(self, prompt, n=1, temperature=0.01, stop=None, callbacks=None):
+        if temperature is None:
+            temperature = self.get_temperature(n)
+        exception_types = self.run_config.exception_types
+        retrying = AsyncRetrying(
+            wait=wait_random_exponential(multiplier=1, max=self.run_config.max_wait),
+            stop=stop_after_attempt(self.run_config.max_retries),
+            retry=retry_if_exception(lambda e: isinstance(e, exception_types) and not is_rate_limit_error(e)),
+            reraise=True,
+        )
+        result = await retrying.wraps(self.agenerate_text)(
+            prompt=prompt, n=n, temperature=temperature, stop=stop, callbacks=callbacks
+        )
+        if not self.is_finished(result):
+            raise LLMDidNotFinishException()
+        return result
+
+
+def to_samples(dataset):
+    """`SingleTurnSample`s from a datasets `Dataset`, a dict of columns, or a list of rows or samples.
+
+    Legacy column names (question, answer, contexts, ground_truth) are mapped to their sample fields and
+    columns a sample has no field for (e.g. ground_truths) are dropped.
+    """
+    if isinstance(dataset, dict):
+        columns = list(dataset)
+        rows = [dict(zip(columns, values)) for values in zip(*dataset.values())]
+    else:
+        rows = list(dataset)
+    samples = []
+    for row in rows:
+        if isinstance(row, SingleTurnSample):
+            samples.append(row)
+            continue
+        fields = {}
+        for column, value in row.items():
+            field = _V1_COLUMNS.get(column, column)
+            if field in SingleTurnSample.model_fields:
+                fields.setdefault(field, value)
+        samples.append(SingleTurnSample(**fields))
+    return samples
+
+
+def _scheduled(llm, scheduler):
+    # `llm` with a `ScheduledLLM` in its chain of wrappers; an existing one is kept, with its own scheduler.
+    if isinstance(llm, ScheduledLLM):
+        return llm
+    if isinstance(llm, CachedLLM):
+        inner = _scheduled(llm.llm, scheduler)
+        if inner is llm.llm:
+            return llm
+        return CachedLLM(inner, llm.cache, model=llm.model, offline=llm.offline)
+    return ScheduledLLM(llm, scheduler)
+
+
+async def arun_jobs(
+    jobs,
+    llm=None,
+    embeddings=None,
+    scheduler=None,
+    cache=None,
+    run_config=None,
+    max_pending=256,
+    timeout=None,
+    raise_exceptions=False,
+):
+    """Scores every job's dataset with its metrics on the running event loop; returns a `JobsResult`.
+
+    `results` maps each job name to a `BatchResult`. Metrics without an LLM (or embeddings) get `llm` (or
+    `embeddings`) for the run, as with `ragas.evaluate`. `llm` is wrapped in a `ScheduledLLM` so judge calls
+    from all jobs share `scheduler`, unless it already wraps one; a `CachedLLM` around an unscheduled LLM gets
+    the `ScheduledLLM` inside it, so cache hits still skip the queue. With a `cache` (e.g. an `SQLiteCache`) the
+    scheduled LLM is further wrapped in a `CachedLLM`, so repeated judge calls are answered without entering the
+    queue. At most `max_pending` (sample, metric) scores are in progress per job.
+    """
+    scheduler = scheduler or JudgeScheduler()
+    run_config = run_config or RunConfig()
+    if isinstance(llm, BaseLanguageModel):
+        llm = LangchainLLMWrapper(llm, run_config=run_config)
+    if llm is not None:
+        llm = _scheduled(llm, scheduler)
+    if llm is not None and cache is not None and not isinstance(llm, CachedLLM):
+        llm = CachedLLM(llm, cache)
+
+    llm_set = []
+    embeddings_set = []
+    metrics = {id(metric): metric for job in jobs for metric in job.metrics}.values()
+    for metric in metrics:
+        if isinstance(metric, MetricWithLLM) and metric.llm is None:
+            if llm is None:
+                raise ValueError(f"Metric {metric.name!r} needs an LLM; pass llm= or set metric.llm")
+            metric.llm = llm
+            llm_set.append(metric)
+        if isinstance(metric, MetricWithEmbeddings) and metric.embeddings is None:
+            if embeddings is None:
+                raise ValueError(f"Metric {metric.name!r} needs embeddings; pass embeddings= or set metric.embeddings")
+            metric.embeddings = embeddings
+            embeddings_set.append(metric)
+        metric.init(run_config)
+
+    try:
+        batches = await asyncio.gather(
+            *(
+                ascore_samples(
+                    to_samples(job.dataset),
+                    job.metrics,
+                    max_concurrency=max_pending,
+                    timeout=timeout,
+                    raise_exceptions=raise_exceptions,
+                )
+                for job in jobs
+            )
+        )
+    finally:
+        for metric in llm_set:
+            metric.llm = None
+        for metric in embeddings_set:
+            metric.embeddings = None
+    return JobsResult({job.name: batch for job, batch in zip(jobs, batches)}, scheduler.stats())
+
+
+def run_jobs(jobs, **kwargs):
+    """Synchronous entry point: runs `arun_jobs` on a single event loop."""
+    return asyncio.run(arun_jobs(jobs, **kwargs))
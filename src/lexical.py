@@ -0,0 +1,206 @@
+"""BLEU, ROUGE-N and ROUGE-L for the same prediction/reference pairs in one pass.
+
+`score_lexical` tokenizes every distinct text once through the shared token cache and counts its n-grams once.
+Per pair it derives the BLEU sufficient statistics (clipped n-gram matches, n-gram totals, hypothesis and
+closest reference length), ROUGE-N overlaps and the rougeL LCS from those shared structures. Results equal
+`sacrebleu` (13a tokenization) and `rouge_score.RougeScorer` (`score_multi` for lists of references).
+
+BLEU tokenizes case-sensitively and keeps punctuation while ROUGE does not, so by default each text gets
+two token sequences. With `shared_tokens=True` BLEU is computed over the ROUGE tokens instead, and every text is
+tokenized and counted exactly once; its BLEU then differs from sacrebleu's wherever case or punctuation matter.
+
+Run from the repository root with `python -m src.lexical predictions.txt references.txt`.
+"""
+
+import argparse
+import re
+from collections import Counter, namedtuple
+
+import numpy as np
+from sacrebleu.metrics import BLEU
+
+from rouge.rouge_lcs import lcs_length
+from src.bleu_stats import _closest_ref_len, scores_from_stats
+from src.profiling import span
+from src.token_cache import token_cache
+
+LexicalResult = namedtuple("LexicalResult", ["bleu", "bleu_stats", "sentence_bleu", "rouge"])
+
+DEFAULT_METRICS = ("bleu", "rouge1", "rouge2", "rougeL")
+
+_ROUGE_N_RE = re.compile(r"rouge([1-9][0-9]*)$")
+
+
+class _Document:
+    """Token ids of one text and its n-gram counts, built on first use."""
+
+    __slots__ = ("ids", "_counts")
+
+    def __init__(self, ids):
+        self.ids = ids.tolist()
+        self._counts = {}
+
+    def ngrams(self, n):
+        counts = self._counts.get(n)
+        if counts is None:
+            ids = self.ids
+            counts = self._counts[n] = Counter(zip(*(ids[i:] for i in range(n)))) if n > 1 else Counter(ids)
+        return counts
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def _fmeasure(precision, recall):
+    return 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0
+
+
+def _rouge_n(target, prediction, n):
+    target_counts = target.ngrams(n)
+    prediction_counts = prediction.ngrams(n)
+    if len(target_counts) > len(prediction_counts):
+        target_counts, prediction_counts = prediction_counts, target_counts
+    overlap = sum(min(count, prediction_counts[gram]) for gram, count in target_counts.items())
+    precision = overlap / max(len(prediction) - n + 1, 1)
+    recall = overlap / max(len(target) - n + 1, 1)
+    return precision, recall, _fmeasure(precision, recall)
+
+
+def _rouge_l(target, prediction):
+    if not len(target) or not len(prediction):
+        return 0.0, 0.0, 0.0
+    length = lcs_length(target.ids, prediction.ids)
+    precision = length / len(prediction)
+    recall = length / len(target)
+    return precision, recall, _fmeasure(precision, recall)
+
+
+def _bleu_row(hypothesis, references, order):
+    max_ref_counts = {}
+    for reference in references:
+        for n in range(1, order + 1):
+            for gram, count in reference.ngrams(n).items():
+                key = (n, gram)
+                if count > max_ref_counts.get(key, 0):
+                    max_ref_counts[key] = count
+    correct = [0] * order
+    total = [0] * order
+    for n in range(1, order + 1):
+        for gram, count in hypothesis.ngrams(n).items():
+            total[n - 1] += count
+            correct[n - 1] += min(count, max_ref_counts.get((n, gram), 0))
+    hyp_len = len(hypothesis)
+    return [hyp_len, _closest_ref_len(hyp_len, [len(reference) for reference in references])] + correct + total
+
+
+def score_lexical(
+    predictions,
+    references,
+    metrics=DEFAULT_METRICS,
+    use_stemmer=False,
+    shared_tokens=False,
+    max_ngram_order=4,
+    cache=None,
+):
+    """Scores every prediction against its reference(s) for all `metrics` together; returns a `LexicalResult`.
+
+    `metrics` may hold "bleu", "rouge{n}" and "rougeL". Each reference is a string or a list of alternative
+    reference strings. `bleu` is the corpus BLEU score and `sentence_bleu` the per-pair scores (0-100, sacrebleu's
+    `sentence_bleu` defaults). `bleu_stats` holds the int32 segment rows `BleuAccumulator` uses. `rouge` maps each
+    rouge type to a float64 array of shape (len(predictions), 3) holding precision, recall and fmeasure, as
+    `score_batch` does. Metrics that were not requested come back as None (or an empty dict).
+    """
+    if len(predictions) != len(references):
+        raise ValueError("predictions and references must have the same length")
+    rouge_ns = {}
+    for metric in metrics:
+        match = _ROUGE_N_RE.match(metric)
+        if match:
+            rouge_ns[metric] = int(match.group(1))
+        elif metric not in ("bleu", "rougeL"):
+            raise ValueError(f"Unsupported metric {metric!r}, expected 'bleu', 'rouge{{n}}' or 'rougeL'")
+    with_bleu = "bleu" in metrics
+    with_lcs = "rougeL" in metrics
+    cache = cache or token_cache
+    rouge_scheme = "rouge_stem" if use_stemmer else "rouge"
+    bleu_scheme = rouge_scheme if shared_tokens else "13a"
+
+    documents = {}
+
+    def document(text, scheme):
+        key = (scheme, text)
+        doc = documents.get(key)
+        if doc is None:
+            with span("lexical.tokenize"):
+                doc = documents[key] = _Document(cache.ids(text, scheme))
+        return doc
+
+    size = len(predictions)
+    rouge = {metric: np.zeros((size, 3)) for metric in metrics if metric != "bleu"}
+    bleu_stats = np.zeros((size if with_bleu else 0, 2 + 2 * max_ngram_order), dtype=np.int32)
+    for i, (prediction, refs) in enumerate(zip(predictions, references)):
+        if isinstance(refs, str):
+            refs = [refs]
+        if with_bleu:
+            hypothesis, bleu_refs = document(prediction, bleu_scheme), [document(ref, bleu_scheme) for ref in refs]
+            with span("bleu.ngrams"):
+                bleu_stats[i] = _bleu_row(hypothesis, bleu_refs, max_ngram_order)
+        if not rouge:
+            continue
+        hypothesis = document(prediction, rouge_scheme)
+        targets = [document(ref, rouge_scheme) for ref in refs]
+        with span("rouge.ngrams"):
+            for metric, n in rouge_ns.items():
+                # Like `RougeScorer.score_multi`: the first reference with the best fmeasure.
+                rouge[metric][i] = max((_rouge_n(target, hypothesis, n) for target in targets), key=lambda s: s[2])
+        if with_lcs:
+            with span("rouge.lcs"):
+                rouge["rougeL"][i] = max((_rouge_l(target, hypothesis) for target in targets), key=lambda s: s[2])
+
+    if not with_bleu:
+        return LexicalResult(None, None, None, rouge)
+    with span("bleu.score"):
+        totals = bleu_stats.sum(axis=0, dtype=np.int64)
+        order = max_ngram_order
+        corpus = BLEU.compute_bleu(
+            totals[2 : 2 + order].tolist(),
+            totals[2 + order :].tolist(),
+            int(totals[0]),
+            int(totals[1]),
+            smooth_method="exp",
+            max_ngram_order=order,
+        ).score
+        sentence = scores_from_stats(bleu_stats, order, effective_order=True)
+    return LexicalResult(corpus, bleu_stats, sentence, rouge)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("predictions", help="text file with one prediction per line")
+    parser.add_argument("references", help="text file with one reference per line")
+    parser.add_argument("--metrics", nargs="+", default=list(DEFAULT_METRICS))
+    parser.add_argument("--use-stemmer", action="store_true")
+    parser.add_argument("--shared-tokens", action="store_true")
+    parser.add_argument("--scores-out", help=".parquet or .arrow file for the per-row scores")
+    args = parser.parse_args()
+
+    with open(args.predictions, encoding="utf-8") as f:
+        predictions = f.read().splitlines()
+    with open(args.references, encoding="utf-8") as f:
+        references = f.read().splitlines()
+    result = score_lexical(
+        predictions, references, args.metrics, use_stemmer=args.use_stemmer, shared_tokens=args.shared_tokens
+    )
+    if result.bleu is not None:
+        print(f"bleu: {result.bleu:.2f}")
+    for metric, values in result.rouge.items():
+        print(f"{metric}: {values[:, 2].mean():.4f}")
+    if args.scores_out:
+        from src.columnar import write_scores
+
+        rows = write_scores(result, args.scores_out)
+        print(f"{rows} per-row scores written to {args.scores_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Persistent, content-addressed cache of LLM judge responses.
+
+Responses are stored in SQLite under the SHA-256 of (model name, prompt text, n, temperature, stop), so a rerun
+over unchanged rows is answered entirely from disk. The database is kept under `max_bytes` by evicting the
+least recently used entries. The byte total is read once when the database is opened and then kept up to date
+by this process's own writes, so sets do not rescan the table.
+
+Inspect or clear a cache from the repository root with `python -m src.llm_cache .cache/judge.sqlite [--clear]`.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from ragas.cache import CacheInterface
+from ragas.llms import BaseRagasLLM
+
+CacheStats = namedtuple("CacheStats", ["entries", "bytes", "hits", "misses", "evictions"])
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "judge.sqlite")
+
+
+def cache_key(model, prompt, n=1, temperature=None, stop=None):
+    """Hex SHA-256 of everything that determines a judge response."""
+    payload = json.dumps(
+        {"model": model, "prompt": prompt, "n": n, "temperature": temperature, "stop": stop}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteCache(CacheInterface):
+    """Pickled values in one SQLite table, evicted least-recently-used first once over `max_bytes`.
+
+    Usable as a ragas `cache=` backend. Note that ragas' own keys do not include the model name, so prefer
+    `CachedLLM` when several judge models share a cache. `hits`, `misses` and `evictions` count this process's
+    lookups since it opened the database.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=256 * 1024 * 1024):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get(self, key):
+        """Returns the cached value, or None (counted as a miss) when `key` is absent."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            total = self._bytes
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                replaced = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                    (key, blob, len(blob), time.time()),
+                )
+                self._bytes += len(blob) - (replaced[0] if replaced else 0)
+                self._evict()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._bytes = total
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _evict(self):
+        # Caller holds self._lock inside a transaction.
+        excess = self._bytes - self.max_bytes
+        if excess <= 0:
+            return
+        freed = 0
+        victims = []
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._db.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self._bytes -= freed
+        self.evictions += len(victims)
+
+    def has_key(self, key):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("VACUUM")
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return CacheStats(entries, size, self.hits, self.misses, self.evictions)
+
+    def close(self):
+        self._db.close()
+
+    def __repr__(self):
+        return f"SQLiteCache(path={self.path!r}, max_bytes={self.max_bytes})"
+
+
+def _model_name(llm):
+    inner = getattr(llm, "langchain_llm", llm)
+    return getattr(inner, "model_name", None) or getattr(inner, "model", None) or type(inner).__name__
+
+
+class CachedLLM(BaseRagasLLM):
+    """ragas LLM that answers repeated judge calls from a persistent cache.
+
+    Only completed responses (those that pass the wrapped LLM's `is_finished`) are stored. With `offline=True`
+    a miss raises `LookupError` instead of calling the model, which lets CI check that a rerun is fully cached.
+    Wrap a `ScheduledLLM` (not the other way round) so cache hits skip the rate-limited queue.
+    """
+
+    def __init__(self, llm, cache, model=None, offline=False):
+        super().__init__(run_config=llm.run_config, multiple_completion_supported=llm.multiple_completion_supported)
+        self.llm = llm
+        self.cache = cache
+        self.model = model or _model_name(llm)
+        self.offline = offline
+
+    def set_run_config(self, run_config):
+        self.run_config = run_config
+        self.llm.set_run_config(run_config)
+
+    def _key(self, prompt, n, temperature, stop):
+        if temperature is None:
+            temperature = self.get_temperature(n)
+        return cache_key(self.model, prompt.to_string(), n=n, temperature=temperature, stop=stop)
+
+    def _lookup(self, key):
+        result = self.cache.get(key)
+        if result is None and self.offline:
+            raise LookupError(f"No cached response for {key} and the cache is offline")
+        return result
+
+    def generate_text(self, prompt, n=1, temperature=0.01, stop=None, callbacks=None):
+        key = self._key(prompt, n, temperature, stop)
+        result = self._lookup(key)
+        if result is None:
+            result = self.llm.generate_text(prompt, n=n, temperature=temperature, stop=stop, callbacks=callbacks)
+            if self.llm.is_finished(result):
+                self.cache.set(key, result)
+        return result
+
+    async def agenerate_text(self, prompt, n=1, temperature=0.01, stop=None, callbacks=None):
+        key = self._key(prompt, n, temperature, stop)
+        result = self._lookup(key)
+        if result is None:
+            result = await self.llm.agenerate_text(prompt, n=n, temperature=temperature, stop=stop, callbacks=callbacks)
+            if self.llm.is_finished(result):
+                self.cache.set(key, result)
+        return result
+
+    async def generate(self, prompt, n=1, temperature=0.01, stop=None, callbacks=None):
+        # Misses go through the wrapped LLM's own `generate`, keeping its retry policy and finish check.
+        key = self._key(prompt, n, temperature, stop)
+        result = self._lookup(key)
+        if result is None:
+            result = await self.llm.generate(prompt, n=n, temperature=temperature, stop=stop, callbacks=callbacks)
+            self.cache.set(key, result)
+        return result
+
+    def is_finished(self, response):
+        return self.llm.is_finished(response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=DEFAULT_CACHE_PATH)
+    parser.add_argument("--clear", action="store_true", help="delete every cached response")
+    args = parser.parse_args()
+
+    cache = SQLiteCache(args.path)
+    if args.clear:
+        cache.clear()
+    stats = cache.stats()
+    print(f"{args.path}: {stats.entries} responses, {stats.bytes / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
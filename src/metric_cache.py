@@ -0,0 +1,164 @@
+"""Process-wide cache of loaded metrics and ROUGE scorers.
+
+`evaluate.load` re-imports the metric script and rebuilds its features on every call, and the rouge metric
+builds a new `RougeScorer` per `compute`. Callers that score request by request keep both warm here instead.
+"""
+
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from rouge.rouge_lcs import make_scorer
+
+_MetricEntry = namedtuple("_MetricEntry", ["metric", "lock"])
+
+# The repository's rouge metric, which accepts a prebuilt `scorer`; a relative "rouge" would depend on the
+# working directory and could resolve to the hub metric instead.
+ROUGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rouge")
+
+
+class LoaderCache:
+    """Thread-safe LRU cache with get-or-create semantics.
+
+    Concurrent callers asking for the same missing key wait for a single `factory()` call instead of each
+    building their own instance.
+    """
+
+    def __init__(self, maxsize=16):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _lookup(self, key):
+        # Caller holds self._lock.
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, self._entries[key]
+        return False, None
+
+    def get_or_create(self, key, factory):
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+            pending = self._pending.setdefault(key, threading.Lock())
+
+        with pending:
+            with self._lock:
+                found, value = self._lookup(key)
+                if found:
+                    return value
+            try:
+                value = factory()
+                with self._lock:
+                    self.misses += 1
+                    self._entries[key] = value
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class _CallableTokenizer:
+    def __init__(self, tokenizer_func):
+        self.tokenizer_func = tokenizer_func
+
+    def tokenize(self, text):
+        return self.tokenizer_func(text)
+
+
+metric_cache = LoaderCache(maxsize=8)
+scorer_cache = LoaderCache(maxsize=32)
+
+
+def _hashable(tokenizer):
+    try:
+        hash(tokenizer)
+    except TypeError:
+        return False
+    return True
+
+
+def _load(path, **load_kwargs):
+    # evaluate (and datasets with it) takes seconds to import; scorer-only callers never need it.
+    import evaluate
+
+    return _MetricEntry(evaluate.load(path, **load_kwargs), threading.Lock())
+
+
+def _metric_entry(path, **load_kwargs):
+    key = (path, tuple(sorted(load_kwargs.items())))
+    return metric_cache.get_or_create(key, lambda: _load(path, **load_kwargs))
+
+
+def load_metric(path, **load_kwargs):
+    """Cached `evaluate.load(path, **load_kwargs)`.
+
+    The returned metric is shared by every caller; `Metric.compute` is not thread-safe, so concurrent
+    callers should go through `compute_rouge` (or hold their own lock).
+    """
+    return _metric_entry(path, **load_kwargs).metric
+
+
+def get_rouge_scorer(rouge_types=None, use_stemmer=False, tokenizer=None, lcs_backend="table"):
+    """Cached ROUGE scorer keyed on (rouge types, use_stemmer, tokenizer, lcs backend).
+
+    Tokenizers are keyed by their own hash, which for functions and most objects is their identity; the key
+    holds the tokenizer, so its id cannot be reused by another one while the scorer is cached. Scorers for
+    unhashable tokenizers are built fresh on every call instead of being cached.
+    """
+    if rouge_types is None:
+        rouge_types = ["rouge1", "rouge2", "rougeL", "rougeLsum"]
+
+    def factory():
+        wrapped = tokenizer
+        if tokenizer is not None and not hasattr(tokenizer, "tokenize"):
+            wrapped = _CallableTokenizer(tokenizer)
+        return make_scorer(list(rouge_types), use_stemmer=use_stemmer, tokenizer=wrapped, lcs_backend=lcs_backend)
+
+    if not _hashable(tokenizer):
+        return factory()
+    return scorer_cache.get_or_create(("rouge", tuple(rouge_types), use_stemmer, tokenizer, lcs_backend), factory)
+
+
+def compute_rouge(
+    predictions,
+    references,
+    rouge_types=None,
+    use_stemmer=False,
+    tokenizer=None,
+    use_aggregator=True,
+    lcs_backend="table",
+    path=ROUGE_DIR,
+):
+    """`evaluate.load(path).compute(...)` with the metric and its scorer taken from the process-wide caches."""
+    entry = _metric_entry(path, keep_in_memory=True)
+    scorer = get_rouge_scorer(rouge_types, use_stemmer=use_stemmer, tokenizer=tokenizer, lcs_backend=lcs_backend)
+    with entry.lock:
+        return entry.metric.compute(
+            predictions=predictions,
+            references=references,
+            rouge_types=scorer.rouge_types,
+            use_aggregator=use_aggregator,
+            scorer=scorer,
+        )
@@ -0,0 +1,72 @@
+"""NLTK data resolved from a local, pre-packaged directory instead of downloaded at run time.
+
+`nltk.download` contacts the NLTK index on every call, even when the resource is already installed, which stalls
+or fails on machines without network access. `ensure_nltk_resource` looks the resource up locally first and only
+downloads it when it is missing. In offline mode (`offline=True`, or `NLTK_OFFLINE=1` in the environment) a
+missing resource raises `LookupError` instead of contacting the network.
+
+The local directory is `$NLTK_DATA` when set, otherwise `nltk_data/` at the repository root. Package it on a
+machine with network access, then ship the directory with the workers:
+
+    python -m src.nltk_resources punkt_tab --dir nltk_data
+"""
+
+import argparse
+import os
+
+DEFAULT_DATA_DIR = os.environ.get("NLTK_DATA") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "nltk_data"
+)
+
+# Package name (as given to `nltk.download`) -> path `nltk.data.find` resolves.
+RESOURCE_PATHS = {
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab",
+    "wordnet": "corpora/wordnet",
+    "stopwords": "corpora/stopwords",
+}
+
+
+def is_offline():
+    return os.environ.get("NLTK_OFFLINE", "").lower() in ("1", "true", "yes")
+
+
+def ensure_nltk_resource(name, data_dir=None, offline=None):
+    """Makes NLTK resource `name` (e.g. "punkt_tab") loadable and returns the path it was found at."""
+    import nltk
+
+    data_dir = data_dir or DEFAULT_DATA_DIR
+    if offline is None:
+        offline = is_offline()
+    if data_dir not in nltk.data.path:
+        nltk.data.path.insert(0, data_dir)
+    resource = RESOURCE_PATHS.get(name, name)
+    try:
+        return nltk.data.find(resource)
+    except LookupError:
+        if offline:
+            raise LookupError(
+                f"NLTK resource {name!r} is not installed under {data_dir} (or any of nltk.data.path) and NLTK is "
+                f"offline; package it with `python -m src.nltk_resources {name} --dir {data_dir}`"
+            ) from None
+    try:
+        downloaded = nltk.download(name, download_dir=data_dir, quiet=True, raise_on_error=True)
+    except (ValueError, OSError) as exc:
+        raise LookupError(f"Could not download NLTK resource {name!r} into {data_dir}: {exc}") from exc
+    if not downloaded:
+        raise LookupError(f"Could not download NLTK resource {name!r} into {data_dir}")
+    return nltk.data.find(resource)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("names", nargs="+", help="NLTK packages to install, e.g. punkt_tab")
+    parser.add_argument("--dir", default=DEFAULT_DATA_DIR, help="directory to install them into")
+    args = parser.parse_args()
+
+    for name in args.names:
+        print(f"{name}: {ensure_nltk_resource(name, data_dir=args.dir, offline=False)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""Named timing spans around the stages of an evaluation, with an optional sampling profiler.
+
+Scoring code wraps each stage in `span(name)`: tokenization, n-gram counting, LCS and aggregation in the ROUGE
+and BLEU paths, and (through `ragas_callback()`) ragas metrics, prompts, LLM calls and output parsing. Spans cost
+one global lookup when no profile is active. Inside `profile()` they are recorded with their thread (or asyncio
+task) and summed per stage:
+
+    with profile(sample_interval=0.005) as run:
+        rouge.compute(predictions=predictions, references=references)
+    print(run.summary())
+    run.write_chrome_trace("trace.json")  # open in chrome://tracing or https://ui.perfetto.dev
+
+Spans nest, so a stage's time includes the stages inside it, and spans of concurrent tasks overlap. With
+`sample_interval` set, a background thread also samples every other thread's Python stack at that interval;
+`summary()` lists the functions most often on the stack and `write_folded()` writes the stacks in the folded
+format flame graph tools read. Spans recorded in worker processes (e.g. `score_batch(num_processes=...)`) are not
+collected.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager, nullcontext
+
+StageStats = namedtuple("StageStats", ["stage", "calls", "total_seconds", "mean_ms", "max_ms", "share"])
+
+_NULL_SPAN = nullcontext()
+_active = None
+
+
+def is_enabled():
+    """True inside `profile()`; lets callers skip building instrumentation when nothing records it."""
+    return _active is not None
+
+
+def _track():
+    # Chrome trace "thread" of the caller: its asyncio task when there is one, so concurrent coroutines on one
+    # thread get separate rows instead of overlapping.
+    # asyncio is not imported here (it is slow to import); without it there are no tasks.
+    asyncio = sys.modules.get("asyncio")
+    try:
+        task = asyncio.current_task() if asyncio else None
+    except RuntimeError:
+        task = None
+    return ("task", id(task)) if task is not None else ("thread", threading.get_ident())
+
+
+def record(name, start, end, **args):
+    """Records a stage that ran from `start` to `end` (`time.perf_counter()` values), if a profile is active."""
+    if _active is not None:
+        _active.add(name, start, end, _track(), args)
+
+
+class _Span:
+    __slots__ = ("profile", "name", "args", "start")
+
+    def __init__(self, profile, name, args):
+        self.profile = profile
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.add(self.name, self.start, time.perf_counter(), _track(), self.args)
+        return False
+
+
+def span(name, **args):
+    """Context manager timing stage `name`; `args` are attached to its trace event."""
+    if _active is None:
+        return _NULL_SPAN
+    return _Span(_active, name, args)
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval, stacks):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.interval = interval
+        self.stacks = stacks
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                names = []
+                while frame is not None:
+                    names.append(_frame_name(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Profile:
+    """Spans (and stack samples) recorded while the profile was active.
+
+    At most `max_events` spans are kept for the trace; later ones still count towards the per-stage totals.
+    """
+
+    def __init__(self, sample_interval=None, max_events=200_000):
+        self.sample_interval = sample_interval
+        self.max_events = max_events
+        self.events = []
+        self.dropped_events = 0
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self.finished = None
+        self._totals = {}
+        self._tracks = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, start, end, track, args=None):
+        duration = end - start
+        with self._lock:
+            calls, total, longest = self._totals.get(name, (0, 0.0, 0.0))
+            self._totals[name] = (calls + 1, total + duration, max(longest, duration))
+            if len(self.events) < self.max_events:
+                tid = self._tracks.setdefault(track, len(self._tracks) + 1)
+                self.events.append((name, start, duration, tid, args or None))
+            else:
+                self.dropped_events += 1
+
+    @property
+    def wall_seconds(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def stages(self):
+        """`StageStats` per stage, most total time first; `share` is the fraction of the profile's wall time."""
+        wall = self.wall_seconds
+        with self._lock:
+            totals = dict(self._totals)
+        return [
+            StageStats(
+                stage=name,
+                calls=calls,
+                total_seconds=total,
+                mean_ms=total / calls * 1000,
+                max_ms=longest * 1000,
+                share=total / wall if wall > 0 else 0.0,
+            )
+            for name, (calls, total, longest) in sorted(totals.items(), key=lambda item: -item[1][1])
+        ]
+
+    def top_functions(self, limit=15):
+        """[(function, fraction of samples it was on the stack)], most frequent first."""
+        inclusive = Counter()
+        for stack, count in self.stacks.items():
+            for name in set(stack.split(";")):
+                inclusive[name] += count
+        total = sum(self.stacks.values())
+        return [(name, count / total) for name, count in inclusive.most_common(limit)] if total else []
+
+    def summary(self, top=10):
+        """The per-stage table, and with sampling the functions most often on the stack, as text."""
+        lines = [
+            f"wall time {self.wall_seconds:.3f} s",
+            f"{'stage':<36} {'calls':>9} {'total (s)':>10} {'mean (ms)':>10} {'max (ms)':>10} {'share':>7}",
+        ]
+        for stage in self.stages():
+            lines.append(
+                f"{stage.stage:<36} {stage.calls:>9} {stage.total_seconds:>10.4f} {stage.mean_ms:>10.3f} "
+                f"{stage.max_ms:>10.3f} {stage.share:>7.1%}"
+            )
+        if self.dropped_events:
+            lines.append(f"({self.dropped_events} spans beyond max_events counted but left out of the trace)")
+        if self.samples:
+            lines.append(f"sampled stacks: {self.samples} samples every {self.sample_interval * 1000:g} ms")
+            for name, fraction in self.top_functions(top):
+                lines.append(f"  {fraction:>7.1%}  {name}")
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """The spans as a Chrome trace-event document ("X" complete events, microsecond timestamps)."""
+        origin = self.started if self.started is not None else 0.0
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+        trace = []
+        for name, start, duration, tid, args in events:
+            event = {
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ph": "X",
+                "ts": (start - origin) * 1e6,
+                "dur": duration * 1e6,
+                "pid": pid,
+                "tid": tid,
+            }
+            if args:
+                event["args"] = args
+            trace.append(event)
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def write_folded(self, path):
+        """Writes the sampled stacks as "frame;frame;frame count" lines (flamegraph.pl, speedscope)."""
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profile(sample_interval=None, max_events=200_000):
+    """Records spans (and, with `sample_interval` in seconds, stack samples) until the block exits."""
+    global _active
+    run = Profile(sample_interval, max_events)
+    sampler = _Sampler(sample_interval, run.stacks) if sample_interval else None
+    previous, _active = _active, run
+    run.started = time.perf_counter()
+    if sampler:
+        sampler.start()
+    try:
+        yield run
+    finally:
+        if sampler:
+            sampler.stop()
+            run.samples = sampler.samples
+        run.finished = time.perf_counter()
+        _active = previous
+
+
+_ragas_handler_class = None
+
+
+def ragas_callback():
+    """A langchain callback handler that records ragas' evaluation as spans; pass it in `callbacks=[...]`.
+
+    Metric and prompt runs become "ragas.metric:<name>" and "ragas.prompt:<name>" spans and each model call an
+    "llm.wait" span. The part of a prompt run not spent waiting for the model (formatting the prompt, parsing
+    and validating the output) is recorded as "ragas.parse".
+    """
+    global _ragas_handler_class
+    if _ragas_handler_class is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        class RagasSpans(BaseCallbackHandler):
+            # Called inline on the event loop rather than in an executor, so timings are not delayed.
+            run_inline = True
+
+            def __init__(self):
+                self._runs = {}
+                self._llm_seconds = Counter()
+
+            def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+                # ragas tags its runs with a ChainType: evaluation, row, metric or ragas_prompt.
+                kind = getattr((metadata or {}).get("type"), "value", "chain").replace("ragas_", "")
+                name = (serialized or {}).get("name") or kwargs.get("name") or "unnamed"
+                self._runs[run_id] = (f"ragas.{kind}:{name}", kind, time.perf_counter())
+
+            def _end(self, run_id):
+                started = self._runs.pop(run_id, None)
+                if started is None:
+                    return
+                name, kind, start = started
+                end = time.perf_counter()
+                record(name, start, end)
+                if kind == "prompt":
+                    waited = self._llm_seconds.pop(run_id, 0.0)
+                    record("ragas.parse", start + waited, end)
+
+            def on_chain_end(self, outputs, *, run_id, **kwargs):
+                self._end(run_id)
+
+            def on_chain_error(self, error, *, run_id, **kwargs):
+                self._end(run_id)
+
+            def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+                self._runs[run_id] = ("llm.wait", parent_run_id, time.perf_counter())
+
+            def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+                self.on_llm_start(serialized, None, run_id=run_id, parent_run_id=parent_run_id)
+
+            def _end_llm(self, run_id):
+                started = self._runs.pop(run_id, None)
+                if started is None:
+                    return
+                name, parent, start = started
+                end = time.perf_counter()
+                record(name, start, end)
+                if parent is not None:
+                    self._llm_seconds[parent] += end - start
+
+            def on_llm_end(self, response, *, run_id, **kwargs):
+                self._end_llm(run_id)
+
+            def on_llm_error(self, error, *, run_id, **kwargs):
+                self._end_llm(run_id)
+
+        _ragas_handler_class = RagasSpans
+    return _ragas_handler_class()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Profiles one scoring call on a synthetic corpus: "
+        "python -m src.profiling rouge --trace trace.json"
+    )
+    parser.add_argument("path", choices=["rouge", "rouge-batched", "lexical", "bleu"])
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--sample-interval", type=float, default=None, help="seconds between stack samples")
+    parser.add_argument("--trace", help="write a Chrome trace-event JSON file")
+    parser.add_argument("--folded", help="write sampled stacks in folded format")
+    args = parser.parse_args()
+
+    from src.bench_suite import ROUGE_DIR, make_corpus
+
+    predictions, references = make_corpus(args.size)
+    if args.path in ("rouge", "rouge-batched"):
+        from src.metric_cache import load_metric
+
+        metric = load_metric(ROUGE_DIR)
+        engine = "batched" if args.path == "rouge-batched" else "python"
+
+        def run():
+            metric._compute(predictions, references, engine=engine)
+
+    elif args.path == "lexical":
+        from src.lexical import score_lexical
+
+        def run():
+            score_lexical(predictions, references)
+
+    else:
+        from src.bleu_stats import BleuAccumulator
+
+        def run():
+            BleuAccumulator().add_corpus(predictions, references).sentence_scores()
+
+    with profile(sample_interval=args.sample_interval) as result:
+        run()
+    print(result.summary())
+    if args.trace:
+        result.write_chrome_trace(args.trace)
+        print(f"trace written to {args.trace}")
+    if args.folded:
+        result.write_folded(args.folded)
+        print(f"sampled stacks written to {args.folded}")
+
+
+if __name__ == "__main__":
+    # Scoring code records into `src.profiling`; make that this module rather than a second copy of it.
+    sys.modules.setdefault("src.profiling", sys.modules[__name__])
+    main()
@@ -0,0 +1,500 @@
+"""Resident scoring server that gathers concurrent requests into micro-batches.
+
+The server keeps the ROUGE tokenizer, the token cache and any ragas metric instances warm across requests.
+Each metric has a `MicroBatcher`: the first request to arrive opens a batch, which closes after `max_wait`
+seconds or at `max_batch_size` requests. The whole batch then goes through one batched scoring call. Lexical
+batches run in a worker thread, so the event loop keeps accepting requests while a batch is scored.
+
+HTTP API (JSON bodies, keep-alive):
+    POST /score/<metric>  one row; {"prediction": ..., "reference": ...} for rouge and lexical (a reference may
+                          be a list of alternatives), or question/answer/contexts/reference fields for ragas
+                          metrics. Replies {"scores": {name: value}}.
+    GET /stats            per-metric request, batch and error counts with latency and batch-size histograms
+    GET /health           {"status": "ok"}
+
+Metrics:
+    rouge    `score_batch` fmeasures of `rouge_types` (bit-parallel LCS), identical to `RougeScorer.score_multi`
+    lexical  `score_lexical`: sentence BLEU and ROUGE fmeasures from one tokenization pass
+    <name>   every ragas metric passed to `ScoringServer(metrics=...)`, scored with `ascore_samples`
+
+Serve with `python -m src.scoring_server serve --port 8080 --max-wait-ms 5` (or `--unix /tmp/scoring.sock`), and
+measure throughput against latency with `python -m src.scoring_server loadtest --port 8080 --concurrency 1 8 64`.
+"""
+
+import argparse
+import asyncio
+import bisect
+import functools
+import json
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from src.batch_scoring import ascore_samples
+from src.judge_scheduler import to_samples
+
+LoadResult = namedtuple(
+    "LoadResult", ["concurrency", "requests", "elapsed", "requests_per_second", "p50_ms", "p99_ms", "mean_batch_size"]
+)
+
+# Upper bounds of the latency histogram buckets, in milliseconds: 0.25 ms to ~16 s in powers of two.
+LATENCY_BUCKETS_MS = tuple(0.25 * 2**i for i in range(17))
+BATCH_SIZE_BUCKETS = tuple(2**i for i in range(11))
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class Histogram:
+    """Counts of observations per bucket, with bucket `i` holding values up to `bounds[i]` (the last is open)."""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the `q` quantile (inf for the open bucket, nan when empty)."""
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def snapshot(self):
+        """JSON-ready summary; the open bucket's bound is written as "inf" and quantiles of no data as None."""
+
+        def bound(value):
+            return None if math.isnan(value) else "inf" if value == math.inf else value
+
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": bound(self.quantile(0.5)),
+            "p90": bound(self.quantile(0.9)),
+            "p99": bound(self.quantile(0.99)),
+            "buckets": {
+                ("inf" if bound == math.inf else bound): count
+                for bound, count in zip(self.bounds + (math.inf,), self.counts)
+                if count
+            },
+        }
+
+
+class MicroBatcher:
+    """Collects `submit`ted items for up to `max_wait` seconds (or `max_batch_size` items) and scores them at once.
+
+    `score` is an async callable taking a list of items and returning one result per item. At most
+    `max_in_flight` batches are scored at a time; items arriving meanwhile form the next batch. A batch that
+    raises fails every request in it.
+    """
+
+    def __init__(self, score, max_batch_size=64, max_wait=0.005, max_in_flight=1):
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be positive")
+        self.score = score
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.errors = 0
+        self._queue = None
+        self._slots = None
+        self._task = None
+        self._getter = None
+        self._max_in_flight = max_in_flight
+        self._running = set()
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self._max_in_flight)
+        self._task = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            if self._getter is not None:
+                self._getter.cancel()
+            await asyncio.gather(self._task, *self._running, return_exceptions=True)
+            self._task = None
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    def _get(self):
+        # A pending `Queue.get` is kept across batches rather than cancelled on timeout, so no item is dropped.
+        if self._getter is None:
+            self._getter = asyncio.get_running_loop().create_task(self._queue.get())
+        return self._getter
+
+    def _take(self):
+        item = self._getter.result()
+        self._getter = None
+        return item
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._get()
+            batch = [self._take()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                while len(batch) < self.max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                timeout = deadline - loop.time()
+                if len(batch) == self.max_batch_size or timeout <= 0:
+                    break
+                done, _ = await asyncio.wait({self._get()}, timeout=timeout)
+                if not done:
+                    break
+                batch.append(self._take())
+            await self._slots.acquire()
+            task = loop.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        try:
+            self.batch_size.observe(len(batch))
+            try:
+                results = await self.score([item for item, _, _ in batch])
+            except Exception as exc:
+                self.errors += len(batch)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                return
+            now = time.perf_counter()
+            for (_, future, start), result in zip(batch, results):
+                self.latency_ms.observe((now - start) * 1000)
+                if not future.done():
+                    future.set_result(result)
+            if len(results) != len(batch):
+                missing = batch[len(results) :]
+                self.errors += len(missing)
+                error = RuntimeError(f"scorer returned {len(results)} results for a batch of {len(batch)}")
+                for _, future, _ in missing:
+                    if not future.done():
+                        future.set_exception(error)
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        return {
+            "requests": self.latency_ms.count,
+            "batches": self.batch_size.count,
+            "errors": self.errors,
+            "latency_ms": self.latency_ms.snapshot(),
+            "batch_size": self.batch_size.snapshot(),
+        }
+
+
+def _pairs(rows):
+    predictions = [row["prediction"] for row in rows]
+    references = [row["reference"] if isinstance(row["reference"], list) else [row["reference"]] for row in rows]
+    return predictions, references
+
+
+def _score_rouge(rows, rouge_types, tokenizer):
+    from rouge.rouge_batched import score_batch
+
+    predictions, references = _pairs(rows)
+    # Every reference is a list, so single and multi-reference requests can share a batch.
+    batch = score_batch(predictions, references, list(rouge_types), tokenizer=tokenizer, lcs_backend="bitparallel")
+    fmeasures = {rouge_type: values[:, 2].tolist() for rouge_type, values in batch.items()}
+    return [dict(zip(fmeasures, values)) for values in zip(*fmeasures.values())]
+
+
+def _score_lexical(rows, rouge_types, use_stemmer):
+    from src.lexical import score_lexical
+
+    predictions, references = _pairs(rows)
+    result = score_lexical(predictions, references, ("bleu",) + tuple(rouge_types), use_stemmer=use_stemmer)
+    columns = {"bleu": np.asarray(result.sentence_bleu).tolist()}
+    columns.update((metric, values[:, 2].tolist()) for metric, values in result.rouge.items())
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+class ScoringServer:
+    """Scores requests for the lexical metrics and any ragas `metrics` (with their `llm`/`embeddings` set).
+
+    Lexical metrics use `rouge_types` ("rougeL" and "rouge{n}") and `use_stemmer`. Batching is controlled by
+    `max_batch_size` and `max_wait` (seconds); ragas batches are scored with up to `max_in_flight` batches
+    at once, since they mostly wait on the judge.
+    """
+
+    def __init__(
+        self,
+        metrics=(),
+        rouge_types=("rouge1", "rouge2", "rougeL"),
+        use_stemmer=False,
+        max_batch_size=64,
+        max_wait=0.005,
+        max_in_flight=4,
+    ):
+        from src.token_cache import get_tokenizer
+
+        tokenizer = get_tokenizer("rouge_stem" if use_stemmer else "rouge")
+        lexical = {
+            "rouge": functools.partial(_score_rouge, rouge_types=rouge_types, tokenizer=tokenizer),
+            "lexical": functools.partial(_score_lexical, rouge_types=rouge_types, use_stemmer=use_stemmer),
+        }
+        self.batchers = {
+            name: MicroBatcher(self._in_thread(score), max_batch_size, max_wait) for name, score in lexical.items()
+        }
+        self.ragas_metrics = {metric.name: metric for metric in metrics}
+        for name, metric in self.ragas_metrics.items():
+            self.batchers[name] = MicroBatcher(
+                functools.partial(self._score_ragas, metric), max_batch_size, max_wait, max_in_flight=max_in_flight
+            )
+        self._server = None
+
+    @staticmethod
+    def _in_thread(score):
+        async def run(rows):
+            return await asyncio.get_running_loop().run_in_executor(None, score, rows)
+
+        return run
+
+    @staticmethod
+    async def _score_ragas(metric, rows):
+        result = await ascore_samples(to_samples(rows), [metric], raise_exceptions=False)
+        return [{metric.name: score} for score in result.scores[metric.name]]
+
+    def _validate(self, name, row):
+        if not isinstance(row, dict):
+            raise ValueError("expected a JSON object")
+        if name in self.ragas_metrics:
+            to_samples([row])
+        else:
+            reference = row.get("reference")
+            if isinstance(reference, list):
+                valid = bool(reference) and all(isinstance(text, str) for text in reference)
+            else:
+                valid = isinstance(reference, str)
+            if not isinstance(row.get("prediction"), str) or not valid:
+                raise ValueError(
+                    'expected "prediction" (a string) and "reference" (a string or non-empty list of strings)'
+                )
+
+    async def score(self, name, row):
+        """Scores one row with metric `name` through its batcher; returns {score name: value}."""
+        self._validate(name, row)
+        return await self.batchers[name].submit(row)
+
+    def stats(self):
+        return {name: batcher.stats() for name, batcher in self.batchers.items()}
+
+    async def _route(self, method, path, body):
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/stats":
+            return 200, self.stats()
+        if not path.startswith("/score/"):
+            return 404, {"error": f"unknown path {path}"}
+        name = path[len("/score/") :]
+        if name not in self.batchers:
+            return 404, {"error": f"unknown metric {name!r}, expected one of {', '.join(self.batchers)}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            row = json.loads(body)
+            self._validate(name, row)
+        except ValueError as exc:
+            return 400, {"error": str(exc)}
+        try:
+            return 200, {"scores": await self.batchers[name].submit(row)}
+        except Exception as exc:
+            return 500, {"error": f"{type(exc).__name__}: {exc}"}
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, payload = await self._route(method, path, body)
+                data = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8080, unix_path=None):
+        """Starts the batchers and listens on `host:port` (port 0 picks one) or the Unix socket `unix_path`."""
+        for batcher in self.batchers.values():
+            batcher.start()
+        if unix_path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for batcher in self.batchers.values():
+            await batcher.stop()
+
+
+class ScoringClient:
+    """One keep-alive connection to a `ScoringServer`; requests on it are sent one after another."""
+
+    def __init__(self, host="127.0.0.1", port=8080, unix_path=None):
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self._reader = None
+        self._writer = None
+
+    async def _connect(self):
+        if self.unix_path is not None:
+            self._reader, self._writer = await asyncio.open_unix_connection(self.unix_path)
+        else:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, payload=None):
+        """Returns (status, decoded JSON body)."""
+        if self._writer is None:
+            await self._connect()
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self._writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+        )
+        await self._writer.drain()
+        status = int((await self._reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            if key.strip().lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self._reader.readexactly(length))
+
+    async def score(self, metric, row):
+        status, payload = await self.request("POST", f"/score/{metric}", row)
+        if status != 200:
+            raise RuntimeError(f"{status}: {payload.get('error')}")
+        return payload["scores"]
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+async def load_test(rows, metric="rouge", concurrency=8, host="127.0.0.1", port=8080, unix_path=None):
+    """Sends every row once from `concurrency` concurrent keep-alive clients; returns a `LoadResult`.
+
+    `mean_batch_size` is the server's mean batch size over the test, read from /stats before and after.
+    """
+    clients = [ScoringClient(host, port, unix_path) for _ in range(concurrency)]
+    _, before = await clients[0].request("GET", "/stats")
+    latencies = []
+    position = iter(range(len(rows)))
+
+    async def drive(client):
+        for i in position:
+            start = time.perf_counter()
+            await client.score(metric, rows[i])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(drive(client) for client in clients))
+    elapsed = time.perf_counter() - start
+    _, after = await clients[0].request("GET", "/stats")
+    for client in clients:
+        await client.close()
+    batches = after[metric]["batches"] - before[metric]["batches"]
+    return LoadResult(
+        concurrency,
+        len(rows),
+        elapsed,
+        len(rows) / elapsed,
+        float(np.percentile(latencies, 50)) * 1000,
+        float(np.percentile(latencies, 99)) * 1000,
+        len(rows) / batches if batches else math.nan,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the scoring server")
+    load = commands.add_parser("loadtest", help="measure throughput and latency of a running server")
+    for command in (serve, load):
+        command.add_argument("--host", default="127.0.0.1")
+        command.add_argument("--port", type=int, default=8080)
+        command.add_argument("--unix", help="Unix socket path instead of host:port")
+    serve.add_argument("--max-wait-ms", type=float, default=5.0)
+    serve.add_argument("--max-batch-size", type=int, default=64)
+    serve.add_argument("--rouge-types", nargs="+", default=["rouge1", "rouge2", "rougeL"])
+    serve.add_argument("--use-stemmer", action="store_true")
+    load.add_argument("--metric", default="rouge")
+    load.add_argument("--requests", type=int, default=2000)
+    load.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    if args.command == "serve":
+
+        async def run():
+            server = ScoringServer(
+                rouge_types=args.rouge_types,
+                use_stemmer=args.use_stemmer,
+                max_batch_size=args.max_batch_size,
+                max_wait=args.max_wait_ms / 1000,
+            )
+            address = await server.start(args.host, args.port, unix_path=args.unix)
+            print(f"scoring server listening on {address}")
+            await asyncio.Event().wait()
+
+        asyncio.run(run())
+        return
+
+    from src.bench_suite import make_corpus
+
+    predictions, references = make_corpus(args.requests)
+    rows = [{"prediction": p, "reference": r} for p, r in zip(predictions, references)]
+    print(f"{'concurrency':>11} {'req/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'batch':>7}")
+    for concurrency in args.concurrency:
+        result = asyncio.run(load_test(rows, args.metric, concurrency, args.host, args.port, args.unix))
+        print(
+            f"{concurrency:>11} {result.requests_per_second:>9.1f} {result.p50_ms:>9.2f} {result.p99_ms:>9.2f} "
+            f"{result.mean_batch_size:>7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
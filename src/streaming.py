@@ -0,0 +1,165 @@
+"""Chunked scoring for prediction/reference corpora that do not fit in memory.
+
+Rows are read from JSONL or Parquet files a chunk at a time, scored with the batched ROUGE engine and
+`BleuAccumulator`, and folded into running aggregates, so peak memory depends on the chunk size rather than the
+corpus size: BLEU statistics are kept per segment for the current chunk only, and summed into one vector of
+n-gram matches, totals and lengths for the running corpus score. A row may carry any number of references;
+rows with different numbers are scored as sacrebleu scores reference streams padded to the longest one.
+ROUGE tokenizes through the process-wide token cache unless another `tokenizer` is passed, so a reference
+repeated across rows or chunks is tokenized once.
+
+With `--scores-out scores.parquet` (or `.arrow`) the per-row precision, recall and fmeasure of every rouge type
+are streamed to a columnar file as well, a chunk at a time.
+
+Run from the repository root with `python -m src.streaming pairs.jsonl --chunk-size 10000`.
+"""
+
+import argparse
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from rouge.rouge_batched import score_batch
+from src.bleu_stats import BleuAccumulator, score_from_totals
+from src.columnar import ScoreWriter
+from src.token_cache import get_tokenizer
+
+ChunkScore = namedtuple("ChunkScore", ["index", "rows", "rouge", "bleu", "running_rouge", "running_bleu"])
+
+
+def iter_chunks(path, chunk_size=10_000, prediction_key="prediction", reference_key="reference"):
+    """Yields `(predictions, references)` lists of at most `chunk_size` rows from a .jsonl or .parquet file.
+
+    A reference may be a string or a list of strings (one list per row for multi-reference scoring).
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".json"):
+        yield from _iter_jsonl(path, chunk_size, prediction_key, reference_key)
+    elif extension == ".parquet":
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=[prediction_key, reference_key]):
+            yield batch.column(prediction_key).to_pylist(), batch.column(reference_key).to_pylist()
+    else:
+        raise ValueError(f"Unsupported file type {extension!r}, expected .jsonl or .parquet")
+
+
+def _iter_jsonl(path, chunk_size, prediction_key, reference_key):
+    predictions = []
+    references = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            predictions.append(row[prediction_key])
+            references.append(row[reference_key])
+            if len(predictions) == chunk_size:
+                yield predictions, references
+                predictions = []
+                references = []
+    if predictions:
+        yield predictions, references
+
+
+class RougeMeans:
+    """Running mean of precision, recall and fmeasure per rouge type."""
+
+    def __init__(self, rouge_types):
+        self.rouge_types = list(rouge_types)
+        self.count = 0
+        self._sums = {rouge_type: np.zeros(3) for rouge_type in self.rouge_types}
+
+    def update(self, batch):
+        """Folds in a `score_batch` result."""
+        for rouge_type, values in batch.items():
+            self._sums[rouge_type] += values.sum(axis=0)
+        self.count += len(next(iter(batch.values())))
+
+    def merge(self, other):
+        for rouge_type, sums in other._sums.items():
+            self._sums[rouge_type] += sums
+        self.count += other.count
+
+    def means(self, measure="fmeasure"):
+        column = ("precision", "recall", "fmeasure").index(measure)
+        return {rouge_type: sums[column] / max(self.count, 1) for rouge_type, sums in self._sums.items()}
+
+
+def score_chunks(
+    chunks, rouge_types=("rouge1", "rouge2", "rougeL"), use_stemmer=False, bleu=True, writer=None, **score_kwargs
+):
+    """Scores each `(predictions, references)` chunk and yields a `ChunkScore` per chunk.
+
+    Each `ChunkScore` carries the chunk's own ROUGE means and corpus BLEU alongside the running aggregates over
+    every chunk seen so far (both BLEUs are sacrebleu `BLEUScore`s); the last one yielded holds the corpus-level
+    result. With a `writer` (a `ScoreWriter`), each chunk's per-row ROUGE scores are written to it before the
+    chunk is yielded.
+    """
+    # References repeated across chunks are tokenized once, through the process-wide token cache.
+    score_kwargs.setdefault("tokenizer", get_tokenizer("rouge_stem" if use_stemmer else "rouge"))
+    running_rouge = RougeMeans(rouge_types)
+    # Sums of the BLEU segment rows seen so far: n-gram matches and totals per order plus the two lengths.
+    running_totals = 0
+    for index, (predictions, references) in enumerate(chunks):
+        batch = score_batch(predictions, references, list(rouge_types), use_stemmer=use_stemmer, **score_kwargs)
+        if writer is not None:
+            writer.write(batch)
+        chunk_rouge = RougeMeans(rouge_types)
+        chunk_rouge.update(batch)
+        running_rouge.merge(chunk_rouge)
+        chunk_bleu = running_bleu = None
+        if bleu:
+            chunk_statistics = BleuAccumulator().add_corpus(predictions, references)
+            chunk_bleu = chunk_statistics.corpus_score()
+            running_totals = running_totals + chunk_statistics.totals
+            running_bleu = score_from_totals(running_totals, chunk_statistics.max_ngram_order)
+        yield ChunkScore(index, len(predictions), chunk_rouge, chunk_bleu, running_rouge, running_bleu)
+
+
+def score_file(path, chunk_size=10_000, prediction_key="prediction", reference_key="reference", **kwargs):
+    """Scores a whole file chunk by chunk and returns the final `ChunkScore` (None for an empty file)."""
+    last = None
+    for last in score_chunks(iter_chunks(path, chunk_size, prediction_key, reference_key), **kwargs):
+        pass
+    return last
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help=".jsonl or .parquet file with one prediction/reference pair per row")
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--prediction-key", default="prediction")
+    parser.add_argument("--reference-key", default="reference")
+    parser.add_argument("--rouge-types", nargs="+", default=["rouge1", "rouge2", "rougeL"])
+    parser.add_argument("--use-stemmer", action="store_true")
+    parser.add_argument("--scores-out", help=".parquet or .arrow file for the per-row scores")
+    args = parser.parse_args()
+
+    chunks = iter_chunks(args.path, args.chunk_size, args.prediction_key, args.reference_key)
+    writer = ScoreWriter(args.scores_out) if args.scores_out else None
+    last = None
+    try:
+        for last in score_chunks(
+            chunks, rouge_types=args.rouge_types, use_stemmer=args.use_stemmer, writer=writer, lcs_backend="bitparallel"
+        ):
+            print(
+                f"chunk {last.index}: {last.rows} rows, {last.running_rouge.count} total, "
+                f"{last.running_bleu}"
+            )
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        print(f"{writer.rows} per-row scores written to {args.scores_out}")
+    if last is not None:
+        for rouge_type, mean in last.running_rouge.means().items():
+            print(f"{rouge_type}: {mean:.4f}")
+
+
+if __name__ == "__main__":
+    main()
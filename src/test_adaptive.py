@@ -0,0 +1,114 @@
+import math
+import random
+import typing as t
+from dataclasses import dataclass, field
+
+import pytest
+from ragas.metrics import ExactMatch, Faithfulness
+from ragas.metrics.base import MetricType, SingleTurnMetric
+
+from src.adaptive import run_adaptive, stratified_estimate
+from src.fake_llm import FakeChatModel, faithfulness_responder
+
+
+def exact_match_dataset(size, rate, seed=0):
+    rng = random.Random(seed)
+    responses = ["yes" if rng.random() < rate else "no" for _ in range(size)]
+    return {"response": responses, "reference": ["yes"] * size}
+
+
+@dataclass
+class RecordingMetric(SingleTurnMetric):
+    """Scores a row with the number in its response and records which rows were scored."""
+
+    name: str = "recorded"
+    _required_columns: t.Dict[MetricType, t.Set[str]] = field(
+        default_factory=lambda: {MetricType.SINGLE_TURN: {"response"}}
+    )
+    seen: t.List[str] = field(default_factory=list)
+
+    def init(self, run_config):
+        pass
+
+    async def _single_turn_ascore(self, sample, callbacks):
+        self.seen.append(sample.response)
+        return float(sample.response.split(":")[1])
+
+
+def test_stratified_estimate():
+    # Whole population sampled: the interval collapses onto the exact mean.
+    estimate = stratified_estimate([(2, [1.0, 0.0]), (2, [1.0, 1.0])])
+    assert estimate.mean == 0.75
+    assert estimate.half_width == 0.0
+    assert estimate.rows == 4
+
+    estimate = stratified_estimate([(100, [0.0, 1.0, 1.0, math.nan]), (300, [0.5, 0.5])])
+    assert estimate.mean == 0.25 * 2 / 3 + 0.75 * 0.5
+    assert estimate.low < estimate.mean < estimate.high
+    assert estimate.rows == 5
+
+    assert stratified_estimate([(10, [1.0])]).half_width == math.inf
+    assert math.isnan(stratified_estimate([(10, [math.nan])]).mean)
+
+
+def test_stops_once_the_interval_is_narrow_enough():
+    dataset = exact_match_dataset(20_000, 0.7)
+    exact = sum(r == "yes" for r in dataset["response"]) / 20_000
+
+    result = run_adaptive(dataset, [ExactMatch()], target=0.02, batch_size=200, seed=1)
+
+    estimate = result.estimates["exact_match"]
+    assert result.converged
+    assert estimate.half_width <= 0.02
+    assert estimate.low - 0.01 <= exact <= estimate.high + 0.01
+    assert result.rows_scored < 5_000
+    assert result.total_rows == 20_000
+
+
+def test_uniform_strata_need_two_rows_each():
+    dataset = {"response": ["yes"] * 500 + ["no"] * 1500, "reference": ["yes"] * 2000}
+    tags = ["a"] * 500 + ["b"] * 1500
+
+    result = run_adaptive(dataset, [ExactMatch()], target=0.01, batch_size=50, min_rows=4, tags=tags, seed=0)
+
+    assert result.converged
+    assert result.estimates["exact_match"].mean == 0.25
+    assert result.estimates["exact_match"].half_width == 0.0
+    assert result.rows_scored <= 50
+
+
+def test_running_out_of_rows_and_judge_calls():
+    dataset = {
+        "question": ["q"] * 6,
+        "answer": ["Paris is the capital of France.", "Lyon is the capital of France."] * 3,
+        "contexts": [["Paris is the capital of France."]] * 6,
+        "source": ["x", "y"] * 3,
+    }
+    model = FakeChatModel(responder=faithfulness_responder)
+
+    result = run_adaptive(
+        dataset, [Faithfulness()], target=0.01, batch_size=4, min_rows=4, tags="source", llm=model, seed=0
+    )
+
+    # Strata "x" (always faithful) and "y" (never) are uniform, so four rows settle the mean.
+    assert result.estimates["faithfulness"].mean == 0.5
+    assert result.rows_scored == 4
+    assert result.scheduler.completed == model.calls == 8
+
+    result = run_adaptive(dataset, [Faithfulness()], target=0.01, max_rows=3, llm=model, seed=0)
+    assert not result.converged
+    assert result.rows_scored == 3
+
+
+def test_every_row_is_scored_at_most_once():
+    rng = random.Random(3)
+    dataset = {"response": [f"{i}:{rng.random()}" for i in range(300)]}
+    tags = [rng.randrange(7) for _ in range(300)]
+    metric = RecordingMetric()
+
+    result = run_adaptive(dataset, [metric], target=1e-9, batch_size=23, tags=tags, seed=5)
+
+    assert len(metric.seen) == len(set(metric.seen)) == result.rows_scored == 300
+    exact = sum(float(response.split(":")[1]) for response in dataset["response"]) / 300
+    assert result.estimates["recorded"].mean == pytest.approx(exact)
+    assert result.estimates["recorded"].half_width == 0.0
@@ -0,0 +1,74 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from ragas.metrics import Faithfulness
+
+from src.arrow_dataset import CONTEXTS_SUFFIX, RagDataset, convert, evaluate_dataset
+from src.columnar import ScoreWriter, read_scores
+from src.fake_llm import FakeChatModel, faithfulness_responder
+from src.judge_scheduler import EvaluationJob, run_jobs, to_samples
+
+PASSAGES = [
+    "Paris is the capital of France. It is on the Seine.",
+    "Tokyo is the capital of Japan.",
+    "Leonardo da Vinci painted the Mona Lisa.",
+]
+
+
+def rag_log(size):
+    return {
+        "question": [f"Question {i}?" for i in range(size)],
+        "answer": [f"{'Paris' if i % 2 else 'Berlin'} is the capital of France." for i in range(size)],
+        "contexts": [[PASSAGES[i % 3], PASSAGES[(i + 1) % 3]] for i in range(size)],
+        "ground_truth": [f"Reference {i}." for i in range(size)],
+    }
+
+
+@pytest.mark.parametrize("extension", [".arrow", ".parquet"])
+def test_contexts_are_stored_once_and_rows_round_trip(tmp_path, extension):
+    log = rag_log(50)
+    path = str(tmp_path / f"dataset{extension}")
+
+    stats = convert(log, path, batch_size=16)
+
+    assert (stats.rows, stats.contexts, stats.unique_contexts) == (50, 100, 3)
+    assert read_scores(path + CONTEXTS_SUFFIX).column("context").to_pylist() == PASSAGES
+    dataset = RagDataset(path)
+    batches = list(dataset.iter_samples(batch_size=20))
+    assert len(dataset) == 50 and [len(batch) for batch in batches] == [20, 20, 10]
+    assert [sample for batch in batches for sample in batch] == to_samples(log)
+
+
+def test_raw_parquet_logs_are_read_and_converted(tmp_path):
+    log = rag_log(10)
+    raw = str(tmp_path / "log.parquet")
+    pq.write_table(pa.table(log), raw)
+
+    assert [s for batch in RagDataset(raw).iter_samples(4) for s in batch] == to_samples(log)
+    convert(raw, str(tmp_path / "dataset.arrow"), batch_size=3)
+    converted = RagDataset(str(tmp_path / "dataset.arrow"))
+    assert [s for batch in converted.iter_samples(4) for s in batch] == to_samples(log)
+
+
+def test_evaluation_pulls_batches(tmp_path):
+    log = rag_log(12)
+    path = str(tmp_path / "dataset.arrow")
+    convert(log, path)
+    faithfulness = Faithfulness()
+
+    with ScoreWriter(str(tmp_path / "scores.parquet")) as writer:
+        result = evaluate_dataset(
+            RagDataset(path),
+            [faithfulness],
+            batch_size=5,
+            writer=writer,
+            llm=FakeChatModel(responder=faithfulness_responder),
+        )
+
+    expected = run_jobs(
+        [EvaluationJob("log", log, [faithfulness])], llm=FakeChatModel(responder=faithfulness_responder)
+    ).results["log"].scores["faithfulness"]
+    assert result.rows == 12
+    assert read_scores(str(tmp_path / "scores.parquet")).column("faithfulness").to_pylist() == expected
+    assert result.aggregates["faithfulness"] == pytest.approx(sum(expected) / len(expected))
+    assert result.stats.completed > 0
@@ -0,0 +1,51 @@
+import asyncio
+import math
+
+from ragas.dataset_schema import SingleTurnSample
+from ragas.metrics import BleuScore
+
+from src.batch_scoring import score_samples
+
+SAMPLES = [
+    SingleTurnSample(response="The Eiffel Tower is in Paris.", reference="The Eiffel Tower is located in Paris."),
+    SingleTurnSample(response="India is home to the Taj Mahal.", reference="The Taj Mahal is in India."),
+    SingleTurnSample(response="It is good.", reference="The new movie is really good."),
+]
+
+
+class SlowMetric:
+    name = "slow"
+
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+
+    async def single_turn_ascore(self, sample, timeout=None):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        if sample.response == "fail":
+            raise RuntimeError("judge failed")
+        return len(sample.response)
+
+
+def test_batch_scores_match_one_at_a_time():
+    metric = BleuScore()
+    expected = [asyncio.run(metric.single_turn_ascore(sample)) for sample in SAMPLES]
+
+    result = score_samples(SAMPLES, [metric])
+
+    assert result.scores == {"bleu_score": expected}
+    assert result.samples_per_second > 0
+
+
+def test_concurrency_is_bounded_and_failures_become_nan():
+    metric = SlowMetric()
+    samples = [SingleTurnSample(response="x" * i) for i in range(20)] + [SingleTurnSample(response="fail")]
+
+    result = score_samples(samples, [metric], max_concurrency=4, raise_exceptions=False)
+
+    assert metric.peak == 4
+    assert result.scores["slow"][:20] == list(range(20))
+    assert math.isnan(result.scores["slow"][20])
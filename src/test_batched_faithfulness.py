@@ -0,0 +1,96 @@
+import json
+import math
+
+import pytest
+from ragas.llms import LangchainLLMWrapper
+from ragas.metrics import Faithfulness
+from ragas.run_config import RunConfig
+
+from src.batched_faithfulness import BatchedFaithfulness
+from src.fake_llm import FakeChatModel
+from src.test_judge_scheduler import faithfulness_responder
+
+CONTEXT = ["Paris is the capital of France. It is on the Seine."]
+DATASET = {
+    "question": ["q"] * 5,
+    "answer": [
+        "Paris is the capital of France.",
+        "Berlin is the capital of France. It is on the Seine.",
+        "",
+        "It is on the Seine.",
+        "Lyon is the capital of France.",
+    ],
+    "contexts": [CONTEXT] * 5,
+}
+EXPECTED = [1.0, 0.5, math.nan, 1.0, 0.0]
+
+
+def batched_responder(prompt):
+    """Answers batched prompts row by row with `faithfulness_responder`, and single-row prompts directly."""
+    data = json.loads(prompt.rsplit("input:", 1)[1].rsplit("Output:", 1)[0])
+    if "rows" not in data:
+        return faithfulness_responder(prompt)
+    rows = [json.loads(faithfulness_responder(f"input: {json.dumps(row)} Output:")) for row in data["rows"]]
+    return json.dumps({"rows": rows})
+
+
+def scorer(responder, batch_size):
+    model = FakeChatModel(responder=responder)
+    return model, BatchedFaithfulness(Faithfulness(llm=LangchainLLMWrapper(model)), batch_size=batch_size)
+
+
+def assert_scores(scores):
+    assert len(scores) == len(EXPECTED)
+    assert all(math.isnan(a) if math.isnan(b) else a == b for a, b in zip(scores, EXPECTED))
+
+
+def test_rows_are_packed_into_one_request_per_step():
+    model, batched = scorer(batched_responder, batch_size=5)
+
+    result = batched.score_samples(DATASET)
+    stats = batched.stats()
+
+    assert_scores(result.scores["faithfulness"])
+    assert model.calls == stats.requests == 2
+    assert stats.per_row_requests == 9
+    assert stats.saved == 7
+    assert stats.fallbacks == 0
+
+
+def test_partial_batches():
+    model, batched = scorer(batched_responder, batch_size=2)
+
+    assert_scores(batched.score_samples(DATASET).scores["faithfulness"])
+    # Three extraction requests; the third batch is the last row alone. The row without statements is skipped.
+    assert model.calls == batched.stats().requests == 6
+
+
+def test_unparseable_batches_fall_back_to_per_row_prompts():
+    def responder(prompt):
+        if '"rows"' in prompt.rsplit("input:", 1)[1]:
+            return json.dumps({"rows": []})
+        return faithfulness_responder(prompt)
+
+    model, batched = scorer(responder, batch_size=5)
+
+    result = batched.score_samples(DATASET)
+    stats = batched.stats()
+
+    assert_scores(result.scores["faithfulness"])
+    assert stats.fallbacks == 2
+    assert model.calls == stats.requests == 2 + 5 + 4
+    assert stats.saved < 0
+
+
+def test_judge_errors_are_raised_without_a_fallback():
+    def broken(prompt):
+        raise PermissionError("invalid API key")
+
+    model = FakeChatModel(responder=broken)
+    llm = LangchainLLMWrapper(model, run_config=RunConfig(max_retries=1))
+    batched = BatchedFaithfulness(Faithfulness(llm=llm), batch_size=5)
+
+    with pytest.raises(PermissionError):
+        batched.score_samples(DATASET)
+    assert batched.stats().fallbacks == 0
+    assert model.calls == 1
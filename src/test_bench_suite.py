@@ -0,0 +1,53 @@
+import pytest
+
+from src.bench_suite import CASES_BY_NAME, compare, environment, environment_differences, make_corpus, run_case
+
+
+def test_corpus_is_deterministic_and_sized():
+    predictions, references = make_corpus(20, refs_per_row=3, seed=4)
+
+    assert (predictions, references) == make_corpus(20, refs_per_row=3, seed=4)
+    assert len(predictions) == len(references) == 20
+    assert all(isinstance(refs, list) and len(refs) == 3 for refs in references)
+    assert all(isinstance(reference, str) for reference in make_corpus(5)[1])
+
+
+@pytest.mark.parametrize("name", ["rouge-noagg-multi-nostem", "sacrebleu-corpus"])
+def test_case_reports_throughput_and_latency(name):
+    result = run_case(name, size=40, batch_size=16)
+
+    assert (result.rows, result.batches) == (40, 3)
+    assert result.rows_per_second > 0 and 0 < result.p50_ms <= result.p99_ms
+
+
+def test_every_case_is_registered_once():
+    rouge_cases = [name for name in CASES_BY_NAME if name.startswith("rouge-")]
+
+    assert len(rouge_cases) == 10
+    assert {"nltk-sentence-bleu", "sacrebleu-corpus", "ragas-bleu", "ragas-evaluate"} <= set(CASES_BY_NAME)
+
+
+def test_only_changes_beyond_the_threshold_are_regressions():
+    baseline = {"results": {"a": {"rows_per_second": 100.0, "p50_ms": 10.0, "p99_ms": 20.0, "peak_rss_mb": None}}}
+    current = {
+        "results": {
+            "a": {"rows_per_second": 85.0, "p50_ms": 9.0, "p99_ms": 30.0, "peak_rss_mb": 50.0},
+            "new case": {"rows_per_second": 1.0},
+        }
+    }
+
+    regressions = compare(current, baseline, threshold=0.2)
+
+    assert [(r.case, r.field) for r in regressions] == [("a", "p99_ms")]
+    assert regressions[0].change == pytest.approx(0.5)
+
+
+def test_environment_differences_are_reported():
+    current = {"environment": environment()}
+    assert environment_differences(current, current) == {}
+
+    baseline = {"environment": dict(current["environment"], numpy="1.0.0", cpu="other")}
+    differences = environment_differences(current, baseline)
+
+    assert differences == {"cpu": ("other", current["environment"]["cpu"]), "numpy": ("1.0.0", environment()["numpy"])}
+    assert set(environment_differences(current, {})) == set(current["environment"])
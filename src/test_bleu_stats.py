@@ -0,0 +1,82 @@
+import random
+
+import pytest
+from nltk.translate.bleu_score import sentence_bleu as nltk_sentence_bleu
+from sacrebleu import corpus_bleu, sentence_bleu
+from sacrebleu.metrics import BLEU
+
+from src.bleu_stats import BleuAccumulator, scores_from_stats
+from src.test_rouge_batched import random_corpus
+
+HYPOTHESES = random_corpus(80, seed=1, max_len=15)
+REFERENCES = random_corpus(80, seed=2, max_len=15)
+SECOND_REFERENCES = random_corpus(80, seed=3, max_len=15)
+
+
+def test_corpus_score_matches_sacrebleu():
+    single = BleuAccumulator().add_corpus(HYPOTHESES, REFERENCES)
+    multi = BleuAccumulator().add_corpus(HYPOTHESES, [list(refs) for refs in zip(REFERENCES, SECOND_REFERENCES)])
+
+    assert single.corpus_score().score == corpus_bleu(HYPOTHESES, [REFERENCES]).score
+    assert multi.corpus_score().score == corpus_bleu(HYPOTHESES, [REFERENCES, SECOND_REFERENCES]).score
+
+
+def test_sentence_scores_match_sacrebleu():
+    accumulator = BleuAccumulator().add_corpus(HYPOTHESES, REFERENCES)
+    scores = accumulator.sentence_scores()
+
+    for i, (hypothesis, reference) in enumerate(zip(HYPOTHESES, REFERENCES)):
+        expected = sentence_bleu(hypothesis, [reference]).score
+        assert accumulator.sentence_score(i).score == expected
+        assert scores[i] == pytest.approx(expected, abs=1e-9)
+
+
+def test_merged_shards_equal_single_pass():
+    whole = BleuAccumulator().add_corpus(HYPOTHESES, REFERENCES)
+    merged = BleuAccumulator().add_corpus(HYPOTHESES[:30], REFERENCES[:30])
+    merged.merge(BleuAccumulator().add_corpus(HYPOTHESES[30:], REFERENCES[30:]))
+
+    assert len(merged) == 80
+    assert (merged.stats == whole.stats).all()
+    assert merged.corpus_score().score == whole.corpus_score().score
+
+
+@pytest.mark.parametrize("smooth_method", ["none", "floor", "add-k", "exp"])
+@pytest.mark.parametrize("effective_order", [False, True])
+def test_vectorized_scores_match_compute_bleu(smooth_method, effective_order):
+    rng = random.Random(0)
+    rows = []
+    for _ in range(200):
+        total = [rng.randint(0, 6) for _ in range(4)]
+        rows.append([rng.randint(0, 8), rng.randint(1, 8)] + [rng.randint(0, t) for t in total] + total)
+
+    scores = scores_from_stats(rows, smooth_method=smooth_method, effective_order=effective_order)
+
+    for row, score in zip(rows, scores):
+        expected = BLEU.compute_bleu(
+            row[2:6], row[6:], row[0], row[1], smooth_method=smooth_method, effective_order=effective_order
+        )
+        assert score == pytest.approx(expected.score, abs=1e-9)
+
+
+def test_custom_tokenizer_matches_nltk_sentence_bleu():
+    accumulator = BleuAccumulator(tokenize=str.split)
+    accumulator.add("the cat is on mat", ["the cat is on the mat"])
+
+    expected = nltk_sentence_bleu([["the", "cat", "is", "on", "the", "mat"]], ["the", "cat", "is", "on", "mat"])
+
+    assert accumulator.sentence_score(0, smooth_method="none", effective_order=False).score / 100 == pytest.approx(expected)
+
+
+def test_segments_without_references_are_rejected():
+    with pytest.raises(ValueError):
+        BleuAccumulator().add("the cat sat", [])
+
+
+def test_bootstrap_interval_is_ordered_and_seeded():
+    accumulator = BleuAccumulator().add_corpus(HYPOTHESES, REFERENCES)
+
+    low, mid, high = accumulator.bootstrap(n_samples=200, seed=3)
+
+    assert low <= mid <= high
+    assert accumulator.bootstrap(n_samples=200, seed=3) == (low, mid, high)
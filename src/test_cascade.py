@@ -0,0 +1,86 @@
+import math
+
+import numpy as np
+from ragas.dataset_schema import SingleTurnSample
+from ragas.llms import LangchainLLMWrapper
+from ragas.metrics import Faithfulness
+
+from src.batch_scoring import score_samples
+from src.cascade import CascadeRule, lexical_features, run_cascade
+from src.fake_llm import FakeChatModel, faithfulness_responder
+from src.judge_scheduler import to_samples
+
+CONTEXT = ["Paris is the capital of France. It is on the Seine."]
+DATASET = {
+    "question": ["q"] * 4,
+    "answer": [
+        "Paris is the capital of France.",
+        "It is on the Seine.  Paris is the capital of France",
+        "Berlin is the capital of France.",
+        "Lyon is the capital of France. It is on the Seine.",
+    ],
+    "contexts": [CONTEXT] * 4,
+}
+
+
+def test_lexical_features():
+    samples = [
+        SingleTurnSample(response="The cat sat.", reference="the  cat sat", retrieved_contexts=["The cat sat down."]),
+        SingleTurnSample(response="A dog ran.", reference="The cat sat.", retrieved_contexts=[]),
+        SingleTurnSample(response="A dog ran."),
+    ]
+
+    features = lexical_features(samples, ["exact_match", "rougeL", "context_coverage", "context_precision"])
+
+    np.testing.assert_array_equal(features["exact_match"], [1.0, 0.0, math.nan])
+    np.testing.assert_allclose(features["rougeL"], [1.0, 0.0, math.nan])
+    np.testing.assert_array_equal(features["context_coverage"], [1.0, math.nan, math.nan])
+    np.testing.assert_allclose(features["context_precision"], [1.0, math.nan, math.nan])
+
+
+def test_coverage_matches_whole_words_only():
+    pairs = [
+        ("Tokyo has 1.", "Tokyo has 14 million people."),
+        ("Water boils at 10", "Water boils at 100 degrees."),
+        ("It is not", "It is nothing like Paris."),
+        ("Water boils at 100", "Water boils at 100.5 degrees here."),
+        ("Tokyo has 14 million people", "Tokyo has 14 million people."),
+    ]
+    samples = [SingleTurnSample(response=response, retrieved_contexts=[context]) for response, context in pairs]
+
+    features = lexical_features(samples, ["context_coverage"])
+
+    np.testing.assert_array_equal(features["context_coverage"], [0.0, 0.0, 0.0, 0.0, 1.0])
+
+
+def test_rows_decided_lexically_skip_the_judge():
+    model = FakeChatModel(responder=faithfulness_responder)
+    metric = Faithfulness(llm=LangchainLLMWrapper(model))
+    full = score_samples(to_samples(DATASET), [metric])
+    calls = model.calls
+
+    result = run_cascade(DATASET, [metric])
+
+    assert result.result.scores["faithfulness"] == full.scores["faithfulness"] == [1.0, 1.0, 0.0, 0.5]
+    stats = result.stats["faithfulness"]
+    assert (stats.rows, stats.resolved, stats.judged) == (4, 2, 2)
+    assert stats.short_circuited == 0.5
+    # Two prompts for each judged row only.
+    assert model.calls - calls == 4
+
+
+def test_custom_rules_and_no_judge_calls():
+    model = FakeChatModel(responder=faithfulness_responder)
+    metric = Faithfulness(llm=LangchainLLMWrapper(model))
+    rules = [
+        CascadeRule("faithfulness", "context_coverage", 1.0, 1.0, 1.0),
+        CascadeRule("faithfulness", "context_precision", 0.0, 0.9, 0.0),
+        CascadeRule("faithfulness", "context_coverage", 0.5, 0.5, 0.5),
+    ]
+
+    result = run_cascade(DATASET, [metric], rules=rules)
+
+    assert result.result.scores["faithfulness"] == [1.0, 1.0, 0.0, 0.5]
+    assert result.stats["faithfulness"].judged == 0
+    assert result.stats["faithfulness"].estimated_saved == 0.0
+    assert model.calls == 0
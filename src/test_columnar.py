@@ -0,0 +1,73 @@
+import evaluate
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from src.batch_scoring import BatchResult
+from src.columnar import ScoreWriter, column_array, read_scores, scores_frame, to_table, write_scores
+from src.lexical import score_lexical
+from src.streaming import score_chunks
+from src.test_rouge_batched import ROUGE_DIR, random_corpus
+
+
+@pytest.mark.parametrize("extension", [".parquet", ".arrow"])
+def test_writer_streams_row_groups(tmp_path, extension):
+    path = str(tmp_path / f"scores{extension}")
+    values = np.random.RandomState(0).rand(1000)
+    with ScoreWriter(path, row_group_size=256) as writer:
+        for start in range(0, 1000, 90):
+            writer.write({"rouge1": values[start : start + 90], "row": np.arange(start, min(start + 90, 1000))})
+
+    assert (writer.rows, writer.row_groups) == (1000, 4)
+    table = read_scores(path)
+    assert table.column("rouge1").num_chunks == 4
+    assert np.array_equal(table.column("rouge1").to_numpy(), values)
+    assert table.column("row").to_pylist() == list(range(1000))
+
+
+def test_arrow_files_are_read_without_copying(tmp_path):
+    path = str(tmp_path / "scores.arrow")
+    write_scores({"bleu": np.linspace(0, 1, 100_000)}, path, row_group_size=100_000)
+
+    allocated = pa.total_allocated_bytes()
+    table = read_scores(path)
+    view = column_array(table, "bleu")
+    frame = scores_frame(table)
+
+    # The 800 KB column stays in the mapped file; only a few bytes of pandas bookkeeping are allocated.
+    assert pa.total_allocated_bytes() - allocated < 1024
+    assert not view.flags.writeable and view[-1] == 1.0
+    assert frame["bleu"].iloc[50_000] == view[50_000]
+
+
+def test_entry_points_emit_tables(tmp_path):
+    predictions = random_corpus(50, seed=1)
+    references = random_corpus(50, seed=2)
+
+    lexical = to_table(score_lexical(predictions, references))
+    assert lexical.column_names == [
+        "bleu", *(f"{m}_{x}" for m in ("rouge1", "rouge2", "rougeL") for x in ("precision", "recall", "fmeasure"))
+    ]
+    assert to_table(BatchResult({"faithfulness": [1.0, float("nan")]}, 1.0, 2.0)).num_rows == 2
+
+    rouge = evaluate.load(ROUGE_DIR)
+    expected = rouge.compute(predictions=predictions, references=references, use_aggregator=False)
+    for engine in ("python", "batched"):
+        for aggregator in ("bootstrap", "streaming"):
+            table = rouge.compute(
+                predictions=predictions,
+                references=references,
+                use_aggregator=False,
+                engine=engine,
+                aggregator=aggregator,
+                output_format="arrow",
+            )
+            assert table.to_pydict() == expected
+    with pytest.raises(ValueError):
+        rouge.compute(predictions=predictions, references=references, output_format="arrow")
+
+    path = str(tmp_path / "chunks.parquet")
+    with ScoreWriter(path, row_group_size=16) as writer:
+        for _ in score_chunks([(predictions[:30], references[:30]), (predictions[30:], references[30:])], writer=writer):
+            pass
+    assert read_scores(path, columns=["rouge1_fmeasure"]).num_rows == 50
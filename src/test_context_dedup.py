@@ -0,0 +1,121 @@
+import json
+import math
+
+import pytest
+
+from ragas.llms import LangchainLLMWrapper
+from ragas.metrics import ContextRecall, ContextRelevance
+from ragas.run_config import RunConfig
+
+from src.context_dedup import DedupedContextRecall, DedupedContextRelevance, split_statements
+from src.fake_llm import FakeChatModel
+
+TOKYO = "Tokyo is the capital of Japan."
+KYOTO = "Kyoto was the capital of Japan for a thousand years."
+DATASET = {
+    "question": ["q1", "q2", "q3", "q4"],
+    "contexts": [[TOKYO], [TOKYO, KYOTO], [KYOTO], [TOKYO]],
+    "reference": [
+        "Tokyo is the capital of Japan. It has 14 million people.",
+        "Tokyo is the capital of Japan. Kyoto was the capital of Japan for a thousand years.",
+        "Tokyo is the capital of Japan.",
+        "Tokyo is the capital of Japan. It has 14 million people.",
+    ],
+}
+EXPECTED = [0.5, 1.0, 0.0, 0.5]
+
+
+def recall_responder(prompt):
+    """Attributes a statement to the context when the context contains it word for word."""
+    data = json.loads(prompt.rsplit("input:", 1)[1].rsplit("Output:", 1)[0])
+    classifications = [
+        {"statement": s, "reason": "", "attributed": int(s in data["context"])} for s in data["statements"]
+    ]
+    return json.dumps({"classifications": classifications})
+
+
+def recall_scorer(responder, **kwargs):
+    model = FakeChatModel(responder=responder)
+    llm = LangchainLLMWrapper(model, run_config=RunConfig(max_retries=1))
+    return model, DedupedContextRecall(ContextRecall(llm=llm), **kwargs)
+
+
+def test_split_statements():
+    assert split_statements("One. Two!  Three?\nFour") == ["One.", "Two!", "Three?", "Four"]
+    assert split_statements("") == []
+
+
+def test_each_distinct_pair_is_judged_once():
+    model, scorer = recall_scorer(recall_responder)
+
+    assert scorer.score_samples(DATASET).scores["context_recall"] == EXPECTED
+    stats = scorer.stats()
+    # Three statements against two contexts; Kyoto's statement is never paired with Tokyo's context.
+    assert stats.pairs == 2 + 4 + 1 + 2
+    assert stats.unique_pairs == 5
+    assert model.calls == stats.requests == 2
+    assert stats.per_row_requests == 4
+    assert stats.saved == 2
+
+    # A second batch only judges the pairs it adds.
+    result = scorer.score_samples({"question": ["q5"], "contexts": [[KYOTO]], "reference": [KYOTO]})
+    assert result.scores["context_recall"] == [1.0]
+    assert model.calls == 2
+    assert scorer.stats().unique_pairs == 5
+
+
+def test_unmatched_responses_fall_back_to_single_statements():
+    def responder(prompt):
+        data = json.loads(prompt.rsplit("input:", 1)[1].rsplit("Output:", 1)[0])
+        if len(data["statements"]) > 1:
+            return json.dumps({"classifications": []})
+        return recall_responder(prompt)
+
+    model, scorer = recall_scorer(responder)
+
+    assert scorer.score_samples(DATASET).scores["context_recall"] == EXPECTED
+    stats = scorer.stats()
+    assert stats.fallbacks == 2
+    # Both grouped requests are retried one statement at a time: three for Tokyo's context, two for Kyoto's.
+    assert model.calls == stats.requests == 2 + 3 + 2
+
+
+def test_failed_verdicts_are_asked_again_and_other_errors_raise():
+    failing = {"on": True}
+
+    def responder(prompt):
+        if failing["on"]:
+            return "not json"
+        return recall_responder(prompt)
+
+    model, scorer = recall_scorer(responder)
+    data = {"question": ["q1"], "contexts": [[TOKYO]], "reference": [TOKYO]}
+
+    assert math.isnan(scorer.score_samples(data).scores["context_recall"][0])
+    failing["on"] = False
+    assert scorer.score_samples(data).scores["context_recall"] == [1.0]
+
+    def broken(prompt):
+        raise PermissionError("invalid API key")
+
+    model, scorer = recall_scorer(broken)
+    with pytest.raises(PermissionError):
+        scorer.score_samples(DATASET)
+    # The error was not mistaken for an unparseable response, so no single-statement requests followed.
+    assert scorer.stats().fallbacks == 0
+
+
+def test_relevance_is_rated_once_per_distinct_row():
+    model = FakeChatModel(responder=lambda prompt: "2")
+    scorer = DedupedContextRelevance(ContextRelevance(llm=LangchainLLMWrapper(model)))
+
+    dataset = {"question": ["q1", "q2", "q1", "q1"], "contexts": [[TOKYO], [TOKYO], [TOKYO], [KYOTO]]}
+
+    result = scorer.score_samples(dataset)
+
+    assert result.scores["nv_context_relevance"] == [1.0] * 4
+    stats = scorer.stats()
+    assert stats.unique_pairs == stats.requests == 3
+    assert stats.saved == 1
+    # Each rating is two prompts.
+    assert model.calls == 6
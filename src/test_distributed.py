@@ -0,0 +1,107 @@
+import threading
+from multiprocessing.connection import Client
+
+import numpy as np
+import pytest
+from ragas.metrics import Faithfulness
+
+from rouge.rouge_batched import score_batch
+from src.bleu_stats import BleuAccumulator
+from src.distributed import DEFAULT_AUTHKEY, Coordinator, run_worker, start_local_workers
+from src.fake_llm import FakeChatModel, faithfulness_responder
+from src.judge_scheduler import EvaluationJob, run_jobs
+from src.test_rouge_batched import random_corpus
+
+PREDICTIONS = random_corpus(230, seed=1)
+REFERENCES = random_corpus(230, seed=2)
+ROWS = [{"prediction": p, "reference": r} for p, r in zip(PREDICTIONS, REFERENCES)]
+
+
+def judge_llm():
+    return FakeChatModel(responder=faithfulness_responder)
+
+
+@pytest.fixture
+def coordinator():
+    with Coordinator() as coordinator:
+        yield coordinator
+
+
+def start_thread_workers(coordinator, count):
+    threads = [threading.Thread(target=run_worker, args=(coordinator.address,), daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    assert coordinator.wait_for_workers(count, timeout=10)
+    return threads
+
+
+def test_local_worker_processes_match_a_single_process(coordinator):
+    processes = start_local_workers(coordinator.address, 3)
+    try:
+        assert coordinator.wait_for_workers(3, timeout=60)
+        rouge = coordinator.run("rouge", ROWS, shard_size=25, rouge_types=["rouge1", "rougeL"])
+        bleu = coordinator.run("bleu", ROWS, shard_size=40)
+    finally:
+        coordinator.close()
+        for process in processes:
+            process.wait(timeout=30)
+
+    expected = score_batch(PREDICTIONS, REFERENCES, ["rouge1", "rougeL"])
+    assert all(np.array_equal(rouge.value[key], expected[key]) for key in expected)
+    assert rouge.stats.shards == 10 and sum(rouge.stats.shards_per_worker.values()) == 10
+    assert bleu.value.corpus_score().score == BleuAccumulator().add_corpus(PREDICTIONS, REFERENCES).corpus_score().score
+
+
+def test_shards_of_dead_workers_are_reassigned(coordinator):
+    # A worker that takes a shard and disconnects without answering.
+    dead = Client(coordinator.address, authkey=DEFAULT_AUTHKEY)
+    dead.send(("hello", "dead"))
+    assert coordinator.wait_for_workers(1, timeout=10)
+    result = {}
+    runner = threading.Thread(target=lambda: result.update(run=coordinator.run("rouge", ROWS, shard_size=50)))
+    runner.start()
+    assert dead.recv()[0] == "task"
+    dead.close()
+    start_thread_workers(coordinator, 2)
+    runner.join(timeout=60)
+
+    stats = result["run"].stats
+    assert stats.reassigned == 1 and stats.shards == 5
+    assert np.array_equal(result["run"].value["rouge2"], score_batch(PREDICTIONS, REFERENCES, ["rouge2"])["rouge2"])
+
+
+def test_judge_results_merge_in_row_order(coordinator):
+    context = ["Paris is the capital of France. It is on the Seine."]
+    rows = [
+        {"question": "q", "answer": f"{city} is the capital of France.", "contexts": context}
+        for city in ["Paris", "Berlin", "Paris", "Rome", "Paris"]
+    ]
+    start_thread_workers(coordinator, 2)
+
+    result = coordinator.run(
+        "judge", rows, shard_size=2, metrics=[Faithfulness()], llm_factory="src.test_distributed:judge_llm"
+    )
+
+    expected = run_jobs([EvaluationJob("rows", rows, [Faithfulness()])], llm=judge_llm()).results["rows"].scores
+    assert result.value == expected
+
+
+def test_failing_shards_raise_after_max_attempts():
+    with Coordinator(max_attempts=2) as coordinator:
+        start_thread_workers(coordinator, 1)
+        with pytest.raises(RuntimeError, match="failed 2 times"):
+            coordinator.run("rouge", [{"prediction": "a"}], rouge_types=["rouge1"])
+
+
+def test_other_hosts_need_a_key_of_their_own():
+    with pytest.raises(ValueError, match="not a loopback address"):
+        Coordinator(("0.0.0.0", 0))
+    with pytest.raises(ValueError, match="not a loopback address"):
+        run_worker(("10.0.0.1", 7777), authkey=DEFAULT_AUTHKEY)
+
+    with Coordinator(("0.0.0.0", 0), authkey=b"secret") as coordinator:
+        address = ("127.0.0.1", coordinator.address[1])
+        thread = threading.Thread(target=run_worker, args=(address, b"secret"), daemon=True)
+        thread.start()
+        assert coordinator.wait_for_workers(1, timeout=10)
+        assert coordinator.run("rouge", ROWS[:5], rouge_types=["rouge1"]).stats.shards == 1
@@ -0,0 +1,74 @@
+import json
+import math
+
+import numpy as np
+import pytest
+from ragas.embeddings import LangchainEmbeddingsWrapper
+from ragas.llms import LangchainLLMWrapper
+from ragas.metrics import AnswerRelevancy
+
+from src.batch_scoring import score_samples
+from src.embedding_cache import BatchedAnswerRelevancy, CachedEmbeddings, EmbeddingStore, embedding_key
+from src.fake_llm import FakeChatModel, FakeEmbeddings
+from src.judge_scheduler import to_samples
+
+DATASET = {
+    "question": ["Where is Paris?", "What does a CPU do?", "Who painted the Mona Lisa?"],
+    "answer": ["Paris is in France.", "GPUs render graphics.", "I don't know."],
+}
+
+
+def relevance_responder(prompt):
+    """Turns the answer into a question; answers containing "know" are noncommittal."""
+    response = json.loads(prompt.rsplit("input:", 1)[1].rsplit("Output:", 1)[0])["response"]
+    return json.dumps({"question": f"What about {response.rstrip('.')}?", "noncommittal": int("know" in response)})
+
+
+def test_store_grows_and_persists(tmp_path):
+    path = str(tmp_path / "embeddings")
+    store = EmbeddingStore(path, initial_capacity=4)
+    keys = [embedding_key("m", str(i)) for i in range(100)]
+    vectors = np.random.RandomState(0).rand(100, 8).astype(np.float32)
+    store.add(keys[:30], vectors[:30])
+    store.add(keys, vectors)
+    store.close()
+
+    reopened = EmbeddingStore(path)
+    assert len(reopened) == 100 and reopened.dim == 8
+    assert np.array_equal(reopened.get(keys[::-1]), vectors[::-1])
+    assert reopened.rows([embedding_key("other model", "0")]).tolist() == [-1]
+    missing = embedding_key("other model", "0")
+    with pytest.raises(KeyError, match=missing.hex()):
+        reopened.get([keys[0], missing])
+
+
+def test_only_unseen_texts_are_embedded(tmp_path):
+    path = str(tmp_path / "embeddings")
+    model = FakeEmbeddings(latency=0.01)
+    cached = CachedEmbeddings(model, EmbeddingStore(path))
+
+    first = cached.embed_documents(["a b", "c d", "a b"])
+    cached.embed_query("c d")
+    assert model.calls == 1 and model.texts_embedded == 2
+    assert first[0] == first[2] == model.embed_query("a b")
+
+    rerun = CachedEmbeddings(FakeEmbeddings(), EmbeddingStore(path))
+    rerun.embed_documents(["c d", "a b"])
+    stats = rerun.stats()
+    assert rerun.embeddings.calls == 0
+    assert (stats.hits, stats.misses, stats.hit_rate) == (2, 0, 1.0)
+    assert cached.stats().saved_seconds > 0
+
+
+def test_batched_scores_match_answer_relevancy(tmp_path):
+    llm = LangchainLLMWrapper(FakeChatModel(responder=relevance_responder))
+    embeddings = CachedEmbeddings(FakeEmbeddings(), EmbeddingStore(str(tmp_path / "embeddings")))
+
+    reference = AnswerRelevancy(llm=llm, embeddings=LangchainEmbeddingsWrapper(FakeEmbeddings()))
+    expected = score_samples(to_samples(DATASET), [reference]).scores["answer_relevancy"]
+    actual = BatchedAnswerRelevancy(embeddings, AnswerRelevancy(llm=llm)).score_samples(DATASET).scores["answer_relevancy"]
+
+    assert actual == pytest.approx(expected)
+    assert actual[2] == 0.0 and not math.isnan(actual[0])
+    # Each row's question and its three identical generated questions: 2 distinct texts per row.
+    assert embeddings.stats().misses == 6
@@ -0,0 +1,49 @@
+import math
+
+from ragas.metrics import Faithfulness
+
+from src.fake_llm import FakeChatModel, faithfulness_responder
+from src.incremental import ResultStore, metric_key, run_incremental
+from src.judge_scheduler import EvaluationJob, JudgeScheduler, run_jobs
+
+CONTEXT = ["Paris is the capital of France. It is on the Seine."]
+
+
+def dataset(answers):
+    return {"question": ["q"] * len(answers), "answer": answers, "contexts": [CONTEXT] * len(answers)}
+
+
+def test_only_new_or_changed_rows_are_scored(tmp_path):
+    answers = [f"Paris is the capital of France. Row {i}." for i in range(10)]
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    faithfulness = Faithfulness()
+
+    def run(answers):
+        model = FakeChatModel(responder=faithfulness_responder)
+        scheduler = JudgeScheduler(base_delay=0.001, seed=0)
+        jobs = [EvaluationJob("rows", dataset(answers), [faithfulness])]
+        return run_incremental(jobs, store, llm=model, scheduler=scheduler), model
+
+    first, model = run(answers)
+    assert (first.stats.pairs, first.stats.reused, first.stats.computed) == (10, 0, 10)
+    full_calls = model.calls
+
+    changed = list(answers)
+    changed[3] = "Berlin is the capital of France."
+    second, model = run(changed)
+    assert (second.stats.reused, second.stats.computed) == (9, 1)
+    assert model.calls == full_calls // 10
+
+    expected = run_jobs(
+        [EvaluationJob("rows", dataset(changed), [faithfulness])], llm=FakeChatModel(responder=faithfulness_responder)
+    )
+    scores = second.results["rows"].scores["faithfulness"]
+    assert scores == expected.results["rows"].scores["faithfulness"]
+    assert math.isclose(second.aggregates["rows"]["faithfulness"], sum(scores) / len(scores))
+    assert len(store) == 11
+
+
+def test_metric_config_changes_the_fingerprint():
+    assert metric_key(Faithfulness()) == metric_key(Faithfulness())
+    assert metric_key(Faithfulness()) != metric_key(Faithfulness(max_retries=3))
+    assert metric_key(Faithfulness(), llm=FakeChatModel(responder=str)) != metric_key(Faithfulness())
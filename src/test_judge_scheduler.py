@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from ragas.metrics import Faithfulness
+
+from src.fake_llm import FakeChatModel, faithfulness_responder
+from src.judge_scheduler import EvaluationJob, JudgeScheduler, RateBudget, run_jobs, to_samples
+
+
+def test_concurrency_is_bounded_and_rate_limits_are_retried():
+    model = FakeChatModel(responder=lambda prompt: "ok", latency=0.005, max_concurrent=3)
+    scheduler = JudgeScheduler(max_concurrency=8, base_delay=0.001, seed=0)
+
+    async def run():
+        return await asyncio.gather(*(scheduler.submit(lambda: model.ainvoke("hi")) for _ in range(40)))
+
+    replies = asyncio.run(run())
+    stats = scheduler.stats()
+
+    assert [reply.content for reply in replies] == ["ok"] * 40
+    assert model.rate_limited > 0
+    assert model.peak_concurrency <= 3
+    assert stats.completed == 40
+    assert stats.retries == stats.rate_limited == model.rate_limited
+    assert stats.peak_concurrency <= 8
+    assert stats.qps > 0
+
+
+def test_other_errors_are_not_retried():
+    scheduler = JudgeScheduler()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        raise RuntimeError("bad request")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scheduler.submit(fail))
+    assert len(calls) == 1
+    assert scheduler.stats().failed == 1
+
+
+def test_rate_budget_waits_once_the_minute_is_spent():
+    budget = RateBudget(requests_per_minute=60, tokens_per_minute=1000)
+
+    assert all(budget.reserve() == 0 for _ in range(60))
+    assert budget.reserve() == pytest.approx(1.0, abs=0.01)
+    assert RateBudget(tokens_per_minute=600).reserve(tokens=700) == pytest.approx(10.0, abs=0.01)
+
+
+def test_jobs_share_one_scheduler():
+    model = FakeChatModel(responder=faithfulness_responder, rate_limit_every=4)
+    faithfulness = Faithfulness()
+    context = ["Paris is the capital of France. It is on the Seine."]
+    faithful = {"question": ["q"] * 2, "answer": ["Paris is the capital of France."] * 2, "contexts": [context] * 2}
+    unfaithful = {"question": ["q"], "answer": ["Berlin is the capital of France. It is on the Seine."], "contexts": [context]}
+    scheduler = JudgeScheduler(base_delay=0.001, seed=0)
+
+    result = run_jobs(
+        [EvaluationJob("faithful", faithful, [faithfulness]), EvaluationJob("unfaithful", unfaithful, [faithfulness])],
+        llm=model,
+        scheduler=scheduler,
+        raise_exceptions=True,
+    )
+
+    assert result.results["faithful"].scores == {"faithfulness": [1.0, 1.0]}
+    assert result.results["unfaithful"].scores == {"faithfulness": [0.5]}
+    assert result.stats.completed == 6
+    assert result.stats.rate_limited == model.rate_limited > 0
+    assert faithfulness.llm is None
+
+
+def test_legacy_columns_become_sample_fields():
+    samples = to_samples({"question": ["q"], "answer": ["a"], "contexts": [["c"]], "ground_truths": [["g"]]})
+
+    assert samples[0].user_input == "q"
+    assert samples[0].response == "a"
+    assert samples[0].retrieved_contexts == ["c"]
+    assert samples[0].reference is None
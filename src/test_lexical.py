@@ -0,0 +1,57 @@
+import pytest
+import sacrebleu
+from rouge_score import rouge_scorer
+
+from src.lexical import score_lexical
+from src.test_rouge_batched import random_corpus
+
+ROUGE_TYPES = ["rouge1", "rouge2", "rouge3", "rougeL"]
+
+
+def assert_rouge_matches(result, expected_scores):
+    for i, expected in enumerate(expected_scores):
+        for rouge_type in ROUGE_TYPES:
+            assert tuple(result.rouge[rouge_type][i]) == pytest.approx(tuple(expected[rouge_type]), abs=1e-12)
+
+
+@pytest.mark.parametrize("use_stemmer", [False, True])
+def test_single_reference_matches_sacrebleu_and_rouge_score(use_stemmer):
+    predictions = random_corpus(150, seed=6) + ["The cat, the mat!", ""]
+    references = random_corpus(150, seed=7) + ["the cat sat on the MAT.", "a dog"]
+    predictions[3] = references[3]
+
+    result = score_lexical(predictions, references, ["bleu"] + ROUGE_TYPES, use_stemmer=use_stemmer)
+
+    assert result.bleu == pytest.approx(sacrebleu.corpus_bleu(predictions, [references]).score, abs=1e-9)
+    expected_sentence = [sacrebleu.sentence_bleu(p, [r]).score for p, r in zip(predictions, references)]
+    assert result.sentence_bleu.tolist() == pytest.approx(expected_sentence, abs=1e-9)
+    scorer = rouge_scorer.RougeScorer(ROUGE_TYPES, use_stemmer=use_stemmer)
+    assert_rouge_matches(result, (scorer.score(r, p) for r, p in zip(references, predictions)))
+
+
+def test_multiple_references():
+    predictions = random_corpus(60, seed=8)
+    references = [list(pair) for pair in zip(random_corpus(60, seed=9), random_corpus(60, seed=10))]
+
+    result = score_lexical(predictions, references, ["bleu"] + ROUGE_TYPES)
+
+    streams = [list(stream) for stream in zip(*references)]
+    assert result.bleu == pytest.approx(sacrebleu.corpus_bleu(predictions, streams).score, abs=1e-9)
+    scorer = rouge_scorer.RougeScorer(ROUGE_TYPES)
+    assert_rouge_matches(result, (scorer.score_multi(r, p) for r, p in zip(references, predictions)))
+
+
+def test_shared_tokens_score_bleu_over_rouge_tokens():
+    result = score_lexical(["The cat, sat on THE mat."], ["the cat sat on the mat"], ["bleu"], shared_tokens=True)
+
+    assert result.bleu == pytest.approx(100.0)
+    assert result.rouge == {}
+
+
+def test_unrequested_metrics_are_skipped():
+    result = score_lexical(["a b"], ["a b"], ["rouge1"])
+
+    assert result.bleu is None and result.sentence_bleu is None
+    assert list(result.rouge) == ["rouge1"]
+    with pytest.raises(ValueError):
+        score_lexical(["a"], ["a"], ["rougeLsum"])
@@ -0,0 +1,111 @@
+import pytest
+from ragas.llms import LangchainLLMWrapper
+from ragas.metrics import Faithfulness
+
+from src.fake_llm import FakeChatModel
+from src.judge_scheduler import EvaluationJob, JudgeScheduler, ScheduledLLM, run_jobs
+from src.llm_cache import CachedLLM, SQLiteCache, cache_key
+from src.test_judge_scheduler import faithfulness_responder
+
+CONTEXT = ["Paris is the capital of France. It is on the Seine."]
+DATASET = {
+    "question": ["q", "q"],
+    "answer": ["Paris is the capital of France.", "Berlin is the capital of France. It is on the Seine."],
+    "contexts": [CONTEXT, CONTEXT],
+}
+
+
+def test_key_covers_model_prompt_and_sampling_params():
+    key = cache_key("gpt-4o", "prompt", n=1, temperature=0.01)
+
+    assert key == cache_key("gpt-4o", "prompt", n=1, temperature=0.01)
+    assert key != cache_key("gpt-4o-mini", "prompt", n=1, temperature=0.01)
+    assert key != cache_key("gpt-4o", "prompt!", n=1, temperature=0.01)
+    assert key != cache_key("gpt-4o", "prompt", n=3, temperature=0.01)
+    assert key != cache_key("gpt-4o", "prompt", n=1, temperature=0.3)
+
+
+def test_cache_persists_and_counts_hits(tmp_path):
+    path = str(tmp_path / "judge.sqlite")
+    cache = SQLiteCache(path)
+    cache.set("a", {"text": "yes"})
+    cache.close()
+
+    cache = SQLiteCache(path)
+    assert cache.get("a") == {"text": "yes"}
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert (stats.entries, stats.hits, stats.misses) == (1, 1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "judge.sqlite"), max_bytes=2500)
+    cache.set("a", "x" * 1000)
+    cache.set("b", "x" * 1000)
+    cache.get("a")
+    cache.set("c", "x" * 1000)
+
+    assert cache.has_key("a") and cache.has_key("c") and not cache.has_key("b")
+    assert cache.stats().evictions == 1
+    assert cache.stats().bytes <= 2500
+
+
+
+def test_byte_total_follows_replacements_and_reopening(tmp_path):
+    path = str(tmp_path / "judge.sqlite")
+    cache = SQLiteCache(path, max_bytes=2500)
+    cache.set("a", "x" * 1000)
+    cache.set("a", "x" * 10)
+    cache.set("b", "x" * 1000)
+    cache.set("c", "x" * 1000)
+    assert cache.stats().evictions == 0
+    assert cache._bytes == cache.stats().bytes
+    cache.close()
+
+    cache = SQLiteCache(path, max_bytes=2500)
+    cache.set("d", "x" * 1000)
+    # "a" and then "b", the least recently used, make room for "d".
+    assert not cache.has_key("a") and not cache.has_key("b") and cache.has_key("c")
+    assert cache._bytes == cache.stats().bytes <= 2500
+
+
+def test_cached_llm_without_a_scheduler_is_scheduled(tmp_path):
+    model = FakeChatModel(responder=faithfulness_responder)
+    cache = SQLiteCache(str(tmp_path / "judge.sqlite"))
+    scheduler = JudgeScheduler()
+    jobs = [EvaluationJob("faithfulness", DATASET, [Faithfulness()])]
+
+    run_jobs(jobs, llm=CachedLLM(LangchainLLMWrapper(model), cache), scheduler=scheduler, raise_exceptions=True)
+
+    assert scheduler.stats().requests == model.calls == 4
+
+
+def test_rerun_of_unchanged_rows_makes_no_model_calls(tmp_path):
+    path = str(tmp_path / "judge.sqlite")
+    jobs = [EvaluationJob("faithfulness", DATASET, [Faithfulness()])]
+
+    model = FakeChatModel(responder=faithfulness_responder)
+    first = run_jobs(jobs, llm=model, cache=SQLiteCache(path), raise_exceptions=True)
+    assert model.calls == 4
+
+    # Offline: any miss would raise instead of reaching the (stub) model.
+    offline = FakeChatModel(responder=faithfulness_responder)
+    cache = SQLiteCache(path)
+    scheduler = JudgeScheduler()
+    llm = CachedLLM(ScheduledLLM(LangchainLLMWrapper(offline), scheduler), cache, offline=True)
+    second = run_jobs(jobs, llm=llm, scheduler=scheduler, raise_exceptions=True)
+
+    assert second.results["faithfulness"].scores == first.results["faithfulness"].scores == {"faithfulness": [1.0, 0.5]}
+    assert offline.calls == 0
+    assert scheduler.stats().requests == 0
+    assert (cache.hits, cache.misses) == (4, 0)
+
+
+def test_offline_miss_raises(tmp_path):
+    model = FakeChatModel(responder=faithfulness_responder)
+    llm = CachedLLM(LangchainLLMWrapper(model), SQLiteCache(str(tmp_path / "judge.sqlite")), offline=True)
+    jobs = [EvaluationJob("faithfulness", DATASET, [Faithfulness()])]
+
+    with pytest.raises(LookupError):
+        run_jobs(jobs, llm=llm, raise_exceptions=True)
+    assert model.calls == 0
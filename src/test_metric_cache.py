@@ -0,0 +1,76 @@
+import threading
+import time
+
+import evaluate
+
+from src.metric_cache import LoaderCache, compute_rouge, get_rouge_scorer
+from src.test_rouge_batched import ROUGE_DIR
+
+
+def test_loader_cache_evicts_least_recently_used():
+    cache = LoaderCache(maxsize=2)
+    cache.get_or_create("a", lambda: 1)
+    cache.get_or_create("b", lambda: 2)
+    cache.get_or_create("a", lambda: 0)
+    cache.get_or_create("c", lambda: 3)
+
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_loader_cache_creates_once_under_contention():
+    cache = LoaderCache()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_create("k", factory))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_rouge_scorer_keyed_on_config_and_tokenizer_identity():
+    def tokenize(text):
+        return text.split()
+
+    assert get_rouge_scorer(["rouge1"]) is get_rouge_scorer(["rouge1"])
+    assert get_rouge_scorer(["rouge1"]) is not get_rouge_scorer(["rouge1"], use_stemmer=True)
+    assert get_rouge_scorer(["rouge1"], tokenizer=tokenize) is get_rouge_scorer(["rouge1"], tokenizer=tokenize)
+    assert get_rouge_scorer(["rouge1"], tokenizer=tokenize) is not get_rouge_scorer(["rouge1"], tokenizer=str.split)
+
+
+def test_unhashable_tokenizers_are_not_cached():
+    class Tokenizer:
+        __hash__ = None
+
+        def tokenize(self, text):
+            return text.split()
+
+    tokenizer = Tokenizer()
+    assert get_rouge_scorer(["rouge1"], tokenizer=tokenizer) is not get_rouge_scorer(["rouge1"], tokenizer=tokenizer)
+
+
+def test_compute_rouge_matches_evaluate_load():
+    predictions = ["the cat is on mat", "general kenobi"]
+    references = ["the cat is on the mat", "hello there general kenobi"]
+
+    expected = evaluate.load(ROUGE_DIR).compute(predictions=predictions, references=references, use_aggregator=False)
+
+    assert compute_rouge(predictions, references, use_aggregator=False, path=ROUGE_DIR) == expected
+
+
+def test_compute_rouge_defaults_to_the_repository_metric(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    result = compute_rouge(["the cat is on mat"], ["the cat is on the mat"], rouge_types=["rouge1"])
+
+    assert result["rouge1"] > 0.9
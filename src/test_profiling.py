@@ -0,0 +1,79 @@
+import json
+import sys
+import time
+
+from ragas import EvaluationDataset, evaluate
+from ragas.llms import LangchainLLMWrapper
+from ragas.metrics import Faithfulness
+
+from rouge import rouge_lcs
+from rouge.rouge_batched import score_batch
+from src.bleu_stats import BleuAccumulator
+from src.fake_llm import FakeChatModel, faithfulness_responder
+from src.metric_cache import load_metric
+from src.profiling import is_enabled, profile, ragas_callback, span
+from src.test_rouge_batched import ROUGE_DIR, random_corpus
+
+
+def test_spans_are_no_ops_outside_a_profile():
+    assert not is_enabled()
+    assert span("a") is span("b")
+    with span("a"):
+        pass
+
+
+def test_rouge_spans_work_without_the_profiler(monkeypatch):
+    # As for a copy of rouge/ outside this repository, where src.profiling is never imported.
+    monkeypatch.delitem(sys.modules, "src.profiling")
+
+    assert not rouge_lcs.profiling_enabled()
+    with rouge_lcs.span("rouge.score_batch", pairs=1):
+        scores = score_batch(["the cat sat"], ["the cat sat down"], ["rouge1", "rougeL"])
+    assert scores["rouge1"][0, 0] == 1.0
+
+def test_rouge_stages_are_recorded_and_scores_unchanged():
+    metric = load_metric(ROUGE_DIR)
+    predictions, references = random_corpus(30, seed=1), random_corpus(30, seed=2)
+    expected = metric._compute(predictions, references, use_aggregator=False, use_stemmer=True)
+
+    with profile() as run:
+        actual = metric._compute(predictions, references, use_aggregator=False, use_stemmer=True)
+        metric._compute(predictions, references, engine="batched", lcs_backend="bitparallel")
+
+    assert actual == expected
+    stages = {stage.stage: stage for stage in run.stages()}
+    assert stages["rouge.score"].calls == 30
+    assert stages["rouge.tokenize"].calls >= 120
+    assert {"rouge.score_batch", "rouge.ngrams", "rouge.lcs", "rouge.aggregate"} <= set(stages)
+
+
+def test_chrome_trace_and_summary(tmp_path):
+    with profile(sample_interval=0.001) as run:
+        with span("outer", rows=2):
+            with span("inner"):
+                time.sleep(0.02)
+        BleuAccumulator().add_corpus(["the cat sat"], [["the cat sat down"]]).sentence_scores()
+
+    run.write_chrome_trace(tmp_path / "trace.json")
+    events = {event["name"]: event for event in json.loads((tmp_path / "trace.json").read_text())["traceEvents"]}
+    outer, inner = events["outer"], events["inner"]
+    assert outer["ph"] == "X" and outer["args"] == {"rows": 2}
+    assert outer["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert {"bleu.tokenize", "bleu.ngrams", "bleu.score"} <= set(events)
+    assert run.samples > 0 and any("time.sleep" in stack or "test_chrome_trace" in stack for stack in run.stacks)
+    assert "outer" in run.summary() and "sampled stacks" in run.summary()
+
+
+def test_ragas_callback_times_llm_and_parsing():
+    llm = LangchainLLMWrapper(FakeChatModel(responder=faithfulness_responder, latency=0.01))
+    context = "Paris is in France."
+    row = {"user_input": "Where is Paris?", "response": "Paris is in France.", "retrieved_contexts": [context]}
+    dataset = EvaluationDataset.from_list([row])
+
+    with profile() as run:
+        evaluate(dataset, [Faithfulness()], llm=llm, callbacks=[ragas_callback()], show_progress=False)
+
+    stages = {stage.stage: stage for stage in run.stages()}
+    assert stages["llm.wait"].calls == 2 and stages["llm.wait"].total_seconds >= 0.02
+    assert stages["ragas.parse"].calls == 2
+    assert stages["ragas.metric:faithfulness"].calls == 1
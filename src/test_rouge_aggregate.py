@@ -0,0 +1,52 @@
+import evaluate
+import numpy as np
+import pytest
+from rouge_score import rouge_scorer, scoring
+
+from rouge.rouge_aggregate import StreamingAggregator
+from src.test_rouge_batched import ROUGE_DIR, random_corpus
+
+
+def test_streaming_matches_bootstrap_aggregator_with_same_seed():
+    rouge_types = ["rouge1", "rouge2", "rougeL"]
+    scorer = rouge_scorer.RougeScorer(rouge_types)
+    scores = [scorer.score(r, p) for r, p in zip(random_corpus(300, seed=1), random_corpus(300, seed=2))]
+    bootstrap = scoring.BootstrapAggregator()
+    streaming = StreamingAggregator(rouge_types, capacity=16, seed=7)
+    for score in scores:
+        bootstrap.add_scores(score)
+        streaming.add_scores(score)
+
+    np.random.seed(7)
+    expected = bootstrap.aggregate()
+    actual = streaming.aggregate()
+
+    assert len(streaming) == 300
+    for rouge_type in rouge_types:
+        for interval in ("low", "mid", "high"):
+            np.testing.assert_allclose(getattr(actual[rouge_type], interval), getattr(expected[rouge_type], interval), rtol=1e-6)
+
+
+def test_streaming_aggregator_is_deterministic():
+    predictions = random_corpus(50, seed=3)
+    references = random_corpus(50, seed=4)
+    rouge = evaluate.load(ROUGE_DIR)
+
+    first = rouge.compute(predictions=predictions, references=references, aggregator="streaming", seed=1)
+    second = rouge.compute(predictions=predictions, references=references, aggregator="streaming", seed=1)
+
+    assert first == second
+
+
+@pytest.mark.parametrize("engine", ["python", "batched"])
+def test_streaming_per_pair_scores_are_exact(engine):
+    predictions = random_corpus(50, seed=5)
+    references = random_corpus(50, seed=6)
+    rouge = evaluate.load(ROUGE_DIR)
+
+    expected = rouge.compute(predictions=predictions, references=references, use_aggregator=False)
+    actual = rouge.compute(
+        predictions=predictions, references=references, use_aggregator=False, aggregator="streaming", engine=engine
+    )
+
+    assert actual == expected
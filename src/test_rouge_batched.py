@@ -0,0 +1,67 @@
+import os
+import random
+
+import evaluate
+import pytest
+from rouge_score import rouge_scorer
+
+from rouge.rouge_batched import iter_scores, score_batch
+
+ROUGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rouge")
+WORDS = "the cat sat on a mat dog ran over lazy fox quick brown jumps running runs".split()
+
+
+def random_corpus(size, seed=0, max_len=30):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(0, max_len))) for _ in range(size)]
+
+
+@pytest.mark.parametrize("use_stemmer", [False, True])
+def test_batched_matches_rouge_scorer(use_stemmer):
+    rouge_types = ["rouge1", "rouge2", "rouge3", "rougeL"]
+    predictions = random_corpus(200, seed=1)
+    references = random_corpus(200, seed=2)
+    references[5] = predictions[5]
+    scorer = rouge_scorer.RougeScorer(rouge_types, use_stemmer=use_stemmer)
+
+    batch = score_batch(predictions, references, rouge_types, use_stemmer=use_stemmer)
+
+    for expected, actual in zip((scorer.score(r, p) for r, p in zip(references, predictions)), iter_scores(batch)):
+        assert actual == expected
+
+
+def test_batched_multi_ref_matches_score_multi():
+    rouge_types = ["rouge1", "rouge2"]
+    predictions = random_corpus(50, seed=3)
+    references = [random_corpus(4, seed=100 + i) for i in range(50)]
+    scorer = rouge_scorer.RougeScorer(rouge_types)
+
+    batch = score_batch(predictions, references, rouge_types)
+
+    for expected, actual in zip((scorer.score_multi(r, p) for r, p in zip(references, predictions)), iter_scores(batch)):
+        assert actual == expected
+    # Like `score_multi`, a prediction without references is an error rather than a dropped row.
+    with pytest.raises(ValueError):
+        score_batch(predictions[:2], [references[0], []], rouge_types)
+
+
+def test_process_pool_matches_single_process():
+    predictions = random_corpus(60, seed=4)
+    references = random_corpus(60, seed=5)
+
+    single = score_batch(predictions, references, ["rouge1", "rouge2"])
+    sharded = score_batch(predictions, references, ["rouge1", "rouge2"], num_processes=3)
+
+    for rouge_type in single:
+        assert (single[rouge_type] == sharded[rouge_type]).all()
+
+
+def test_compute_batched_engine_matches_python_engine():
+    rouge = evaluate.load(ROUGE_DIR)
+    predictions = random_corpus(40, seed=6)
+    references = random_corpus(40, seed=7)
+
+    expected = rouge.compute(predictions=predictions, references=references, use_aggregator=False)
+    actual = rouge.compute(predictions=predictions, references=references, use_aggregator=False, engine="batched")
+
+    assert actual == expected
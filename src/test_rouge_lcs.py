@@ -0,0 +1,52 @@
+import random
+
+import evaluate
+import pytest
+from rouge_score import rouge_scorer
+
+from rouge.rouge_lcs import lcs_ind, lcs_length, make_scorer
+from src.test_rouge_batched import ROUGE_DIR, WORDS, random_corpus
+
+
+def random_summaries(size, seed):
+    rng = random.Random(seed)
+    return ["\n".join(random_corpus(rng.randint(0, 4), seed=rng.random(), max_len=12)) for _ in range(size)]
+
+
+def test_lcs_ind_matches_dp_table_backtrack():
+    rng = random.Random(0)
+    for _ in range(300):
+        ref = [rng.choice(WORDS[:6]) for _ in range(rng.randint(0, 25))]
+        can = [rng.choice(WORDS[:6]) for _ in range(rng.randint(0, 25))]
+        expected = rouge_scorer.lcs_ind(ref, can)
+        assert lcs_ind(ref, can) == expected
+        assert lcs_length(ref, can) == len(expected)
+
+
+@pytest.mark.parametrize("use_stemmer", [False, True])
+def test_bitparallel_scorer_matches_rouge_scorer(use_stemmer):
+    rouge_types = ["rouge1", "rougeL", "rougeLsum"]
+    predictions = random_summaries(150, seed=1)
+    references = random_summaries(150, seed=2)
+    expected = rouge_scorer.RougeScorer(rouge_types, use_stemmer=use_stemmer)
+    actual = make_scorer(rouge_types, use_stemmer=use_stemmer, lcs_backend="bitparallel")
+
+    for ref, pred in zip(references, predictions):
+        assert actual.score(ref, pred) == expected.score(ref, pred)
+
+
+def test_compute_selects_lcs_backend():
+    rouge = evaluate.load(ROUGE_DIR)
+    predictions = random_summaries(30, seed=3)
+    references = [random_summaries(3, seed=10 + i) for i in range(30)]
+
+    expected = rouge.compute(predictions=predictions, references=references, use_aggregator=False)
+    for engine in ("python", "batched"):
+        actual = rouge.compute(
+            predictions=predictions,
+            references=references,
+            use_aggregator=False,
+            engine=engine,
+            lcs_backend="bitparallel",
+        )
+        assert actual == expected
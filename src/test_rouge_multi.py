@@ -0,0 +1,51 @@
+import random
+
+import evaluate
+import pytest
+from rouge_score import rouge_scorer
+
+from rouge.rouge_multi import MultiReferenceScorer
+from src.test_rouge_batched import ROUGE_DIR
+from src.test_rouge_lcs import random_summaries
+
+
+@pytest.mark.parametrize("use_stemmer", [False, True])
+def test_matches_score_multi_and_its_argmax(use_stemmer):
+    rouge_types = ["rouge1", "rouge2", "rougeL", "rougeLsum"]
+    predictions = random_summaries(120, seed=4)
+    references = [random_summaries(random.Random(i).randint(1, 6), seed=20 + i) for i in range(120)]
+    references[7] = [predictions[7], predictions[7]]
+    expected = rouge_scorer.RougeScorer(rouge_types, use_stemmer=use_stemmer)
+    actual = MultiReferenceScorer(rouge_types, use_stemmer=use_stemmer)
+
+    for refs, pred in zip(references, predictions):
+        scores, indices = actual.score_multi(refs, pred, return_index=True)
+        assert scores == expected.score_multi(refs, pred)
+        for rouge_type in rouge_types:
+            per_reference = [expected.score(ref, pred)[rouge_type].fmeasure for ref in refs]
+            assert indices[rouge_type] == per_reference.index(max(per_reference))
+
+    stats = actual.stats()
+    assert stats.pruned > 0
+    assert stats.scored + stats.pruned == sum(len(refs) for refs in references) * len(rouge_types)
+
+
+def test_compute_shared_backend_and_best_reference():
+    rouge = evaluate.load(ROUGE_DIR)
+    predictions = random_summaries(40, seed=5)
+    references = [random_summaries(3, seed=60 + i) for i in range(40)]
+
+    expected = rouge.compute(predictions=predictions, references=references, use_aggregator=False)
+    shared = rouge.compute(
+        predictions=predictions, references=references, use_aggregator=False, multi_ref_backend="shared"
+    )
+    assert shared == expected
+
+    result = rouge.compute(predictions=predictions, references=references, return_best_reference=True)
+    best = result.pop("best_reference")
+    assert result == rouge.compute(predictions=predictions, references=references)
+    assert set(best) == {"rouge1", "rouge2", "rougeL", "rougeLsum"}
+    assert all(len(indices) == 40 and set(indices) <= {0, 1, 2} for indices in best.values())
+
+    with pytest.raises(ValueError):
+        rouge.compute(predictions=predictions, references=references, return_best_reference=True, engine="batched")
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from ragas.llms import LangchainLLMWrapper
+from ragas.metrics import Faithfulness
+from rouge_score import rouge_scorer
+
+from src.fake_llm import FakeChatModel, faithfulness_responder
+from src.lexical import score_lexical
+from src.scoring_server import Histogram, MicroBatcher, ScoringClient, ScoringServer, load_test
+from src.test_rouge_batched import random_corpus
+
+PREDICTIONS = random_corpus(120, seed=1)
+REFERENCES = random_corpus(120, seed=2)
+ROWS = [{"prediction": p, "reference": r} for p, r in zip(PREDICTIONS, REFERENCES)]
+
+
+async def serve(server, coroutine):
+    host, port = (await server.start(port=0))[:2]
+    try:
+        return await coroutine(host, port)
+    finally:
+        await server.stop()
+
+
+def test_concurrent_requests_are_batched_and_match_direct_scoring():
+    server = ScoringServer(rouge_types=("rouge1", "rougeL"), max_wait=0.02, max_batch_size=32)
+
+    async def run(host, port):
+        clients = [ScoringClient(host, port) for _ in range(40)]
+        rouge = await asyncio.gather(*(clients[i % 40].score("rouge", row) for i, row in enumerate(ROWS[:40])))
+        lexical = await asyncio.gather(*(client.score("lexical", row) for client, row in zip(clients, ROWS[40:80])))
+        multi = await clients[0].score("rouge", {"prediction": PREDICTIONS[0], "reference": REFERENCES[:3]})
+        for client in clients:
+            await client.close()
+        return rouge, lexical, multi
+
+    rouge, lexical, multi = asyncio.run(serve(server, run))
+
+    scorer = rouge_scorer.RougeScorer(["rouge1", "rougeL"])
+    for row, scores in zip(ROWS, rouge):
+        expected = scorer.score(row["reference"], row["prediction"])
+        assert scores == {key: expected[key].fmeasure for key in expected}
+    expected = scorer.score_multi(REFERENCES[:3], PREDICTIONS[0])
+    assert multi == {key: expected[key].fmeasure for key in expected}
+    direct = score_lexical(PREDICTIONS[40:80], REFERENCES[40:80], ("bleu", "rouge1", "rougeL"))
+    assert [scores["bleu"] for scores in lexical] == pytest.approx(list(direct.sentence_bleu))
+    stats = server.stats()["rouge"]
+    assert stats["requests"] == 41 and stats["batches"] < 41 and stats["batch_size"]["mean"] > 1
+
+
+def test_ragas_metrics_errors_and_stats_over_http():
+    llm = LangchainLLMWrapper(FakeChatModel(responder=faithfulness_responder))
+    server = ScoringServer(metrics=[Faithfulness(llm=llm)], max_wait=0.01)
+    context = ["Paris is the capital of France. It is on the Seine."]
+
+    async def run(host, port):
+        client = ScoringClient(host, port)
+        faithful = client.score("faithfulness", {"question": "q", "answer": "Paris is in France.", "contexts": context})
+        wrong = client.request("POST", "/score/rouge", {"prediction": 1})
+        results = [await faithful, await wrong, await client.request("POST", "/score/bleurt", {})]
+        results.append(await client.request("GET", "/stats"))
+        await client.close()
+        return results
+
+    faithful, wrong, unknown, (status, stats) = asyncio.run(serve(server, run))
+
+    assert 0 <= faithful["faithfulness"] <= 1
+    assert wrong[0] == 400 and unknown[0] == 404
+    assert status == 200 and stats["faithfulness"]["requests"] == 1
+
+
+def test_malformed_requests_do_not_break_their_batch():
+    server = ScoringServer(rouge_types=("rouge1",), max_wait=0.05)
+    malformed = [{"prediction": "a", "reference": [1]}, {"prediction": "a", "reference": []}]
+
+    async def run(host, port):
+        clients = [ScoringClient(host, port) for _ in range(4)]
+        requests = [clients[0].score("rouge", ROWS[0]), clients[1].score("rouge", ROWS[1])]
+        requests += [client.request("POST", "/score/rouge", row) for client, row in zip(clients[2:], malformed)]
+        results = await asyncio.wait_for(asyncio.gather(*requests), timeout=10)
+        for client in clients:
+            await client.close()
+        return results
+
+    good, other, (bad_element, _), (empty, _) = asyncio.run(serve(server, run))
+
+    assert set(good) == set(other) == {"rouge1"}
+    assert bad_element == empty == 400
+
+
+def test_batcher_fails_requests_the_scorer_returned_no_result_for():
+    async def score(rows):
+        return rows[:1]
+
+    async def run():
+        batcher = MicroBatcher(score, max_wait=0.05)
+        batcher.start()
+        try:
+            return await asyncio.wait_for(
+                asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True), timeout=10
+            )
+        finally:
+            await batcher.stop()
+
+    first, second = asyncio.run(run())
+
+    assert first == "a"
+    assert isinstance(second, RuntimeError)
+
+
+def test_load_test_over_a_unix_socket(tmp_path):
+    path = str(tmp_path / "scoring.sock")
+    server = ScoringServer(max_wait=0.005)
+
+    async def run():
+        await server.start(unix_path=path)
+        try:
+            return await load_test(ROWS, "rouge", concurrency=16, unix_path=path)
+        finally:
+            await server.stop()
+
+    result = asyncio.run(run())
+    assert result.requests == 120 and result.requests_per_second > 0
+    assert result.p50_ms <= result.p99_ms and result.mean_batch_size > 1
+
+
+def test_histogram_quantiles():
+    histogram = Histogram([1, 2, 4, 8])
+    for value in [0.5, 1.5, 3, 3, 100]:
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == 4 and histogram.quantile(1.0) == float("inf")
+    assert histogram.snapshot()["buckets"] == {1: 1, 2: 1, 4: 2, "inf": 1}
@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+import pytest
+
+from src.bench_startup import ROOT
+from src.nltk_resources import ensure_nltk_resource
+
+
+@pytest.mark.parametrize("module", ["rouge.rouge", "rouge.rouge_batched", "src.lexical", "src.streaming", "src.metric_cache"])
+def test_scoring_entry_points_do_not_import_nltk(module):
+    code = f"import sys, {module}; print('nltk' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+    assert output.stdout.strip() == "False"
+
+
+def test_local_resource_is_found_without_downloading(tmp_path, monkeypatch):
+    import nltk
+
+    monkeypatch.setattr(nltk.data, "path", list(nltk.data.path))
+    monkeypatch.setattr(nltk, "download", lambda *args, **kwargs: pytest.fail("tried to download"))
+    (tmp_path / "corpora" / "fake_corpus").mkdir(parents=True)
+
+    found = ensure_nltk_resource("corpora/fake_corpus", data_dir=str(tmp_path), offline=False)
+
+    assert str(found).startswith(str(tmp_path))
+
+
+def test_offline_missing_resource_raises(tmp_path, monkeypatch):
+    import nltk
+
+    monkeypatch.setattr(nltk.data, "path", list(nltk.data.path))
+    monkeypatch.setenv("NLTK_OFFLINE", "1")
+    monkeypatch.setattr(nltk, "download", lambda *args, **kwargs: pytest.fail("tried to download"))
+
+    with pytest.raises(LookupError, match="offline"):
+        ensure_nltk_resource("corpora/no_such_corpus", data_dir=str(tmp_path))
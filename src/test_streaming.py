@@ -0,0 +1,55 @@
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from sacrebleu import corpus_bleu
+
+from rouge.rouge_batched import score_batch
+from src.streaming import iter_chunks, score_chunks, score_file
+from src.test_rouge_batched import random_corpus
+
+PREDICTIONS = random_corpus(50, seed=1)
+REFERENCES = random_corpus(50, seed=2)
+
+
+@pytest.fixture(params=["jsonl", "parquet"])
+def pairs_file(request, tmp_path):
+    path = tmp_path / f"pairs.{request.param}"
+    if request.param == "jsonl":
+        with open(path, "w", encoding="utf-8") as f:
+            for prediction, reference in zip(PREDICTIONS, REFERENCES):
+                f.write(json.dumps({"prediction": prediction, "reference": reference}) + "\n")
+    else:
+        pq.write_table(pa.table({"prediction": PREDICTIONS, "reference": REFERENCES}), path, row_group_size=9)
+    return str(path)
+
+
+def test_iter_chunks_reads_every_row_in_order(pairs_file):
+    chunks = list(iter_chunks(pairs_file, chunk_size=7))
+
+    assert [len(predictions) for predictions, _ in chunks] == [7] * 7 + [1]
+    assert [p for predictions, _ in chunks for p in predictions] == PREDICTIONS
+    assert [r for _, references in chunks for r in references] == REFERENCES
+
+
+def test_chunked_aggregates_match_whole_corpus(pairs_file):
+    final = score_file(pairs_file, chunk_size=7, rouge_types=["rouge1", "rougeL"])
+    whole = score_batch(PREDICTIONS, REFERENCES, ["rouge1", "rougeL"])
+
+    assert final.running_rouge.count == 50
+    for rouge_type, mean in final.running_rouge.means().items():
+        assert mean == pytest.approx(whole[rouge_type][:, 2].mean())
+    assert final.running_bleu.score == pytest.approx(corpus_bleu(PREDICTIONS, [REFERENCES]).score)
+
+
+def test_ragged_references_score_like_padded_streams():
+    references = [[reference] for reference in REFERENCES]
+    for i in range(0, 50, 3):
+        references[i].append(PREDICTIONS[i])
+    chunks = [(PREDICTIONS[:20], references[:20]), (PREDICTIONS[20:], references[20:])]
+
+    final = list(score_chunks(chunks, rouge_types=["rouge1"]))[-1]
+
+    padded = [REFERENCES, [refs[1] if len(refs) > 1 else None for refs in references]]
+    assert final.running_bleu.score == pytest.approx(corpus_bleu(PREDICTIONS, padded).score)
@@ -0,0 +1,84 @@
+import pickle
+
+import pytest
+from rouge_score import rouge_scorer, tokenizers
+from sacrebleu.metrics import BLEU
+
+from rouge.rouge_batched import iter_scores, score_batch
+from src.bleu_stats import BleuAccumulator
+from src.test_rouge_batched import random_corpus
+from src.token_cache import TokenCache, get_tokenizer
+
+TEXTS = random_corpus(100, seed=3) + ["Running, runs & ran -- the RUNNER's 3 fastest runs!", ""]
+
+
+@pytest.mark.parametrize("use_stemmer", [False, True])
+def test_rouge_schemes_match_rouge_score(use_stemmer):
+    cache = TokenCache()
+    expected = tokenizers.DefaultTokenizer(use_stemmer=use_stemmer)
+    scheme = "rouge_stem" if use_stemmer else "rouge"
+
+    for text in TEXTS:
+        assert cache.tokens(text, scheme) == expected.tokenize(text)
+
+
+def test_13a_matches_sacrebleu():
+    cache = TokenCache()
+    tokenize = BLEU().tokenizer
+
+    for text in TEXTS:
+        assert cache.tokens(text, "13a") == tokenize(text).split()
+
+
+def test_repeated_texts_return_the_same_ids():
+    cache = TokenCache(maxsize=2)
+    first = cache.ids("the cat sat")
+
+    assert cache.ids("the cat sat") is first
+    assert not first.flags.writeable
+    assert cache.decode(first) == ["the", "cat", "sat"]
+    assert cache.ids("the cat", "13a").tolist() == first[:2].tolist()
+    cache.ids("a dog")
+    cache.ids("the cat sat")
+    stats = cache.stats()
+    assert (stats.entries, stats.hits, stats.misses) == (2, 1, 4)
+
+
+def test_words_of_evicted_texts_are_dropped():
+    cache = TokenCache(maxsize=3)
+    for i in range(1000):
+        cache.ids(f"word{i} shared other{i}")
+
+    assert cache.stats().vocabulary == 2 * 3 + 1
+    assert cache.tokens("shared word999") == ["shared", "word999"]
+    assert cache.ids("shared")[0] == cache.ids("shared again", "13a")[0]
+
+
+def test_stems_are_memoized():
+    cache = TokenCache()
+    cache.tokens("running runs running", "rouge_stem")
+    cache.tokens("runs", "rouge_stem")
+
+    stats = cache.stats()
+    assert (stats.stem_misses, stats.stem_hits) == (2, 2)
+
+
+def test_shared_tokenizer_works_with_rouge_and_bleu():
+    predictions = random_corpus(50, seed=4)
+    references = random_corpus(50, seed=5)
+    tokenizer = get_tokenizer("rouge_stem")
+    scorer = rouge_scorer.RougeScorer(["rouge1", "rouge2"], use_stemmer=True)
+
+    batch = score_batch(predictions, references, ["rouge1", "rouge2"], tokenizer=tokenizer)
+    for expected, actual in zip((scorer.score(r, p) for r, p in zip(references, predictions)), iter_scores(batch)):
+        assert actual == expected
+
+    cached = BleuAccumulator(tokenize=get_tokenizer("13a")).add_corpus(predictions, references)
+    plain = BleuAccumulator().add_corpus(predictions, references)
+    assert (cached.stats == plain.stats).all()
+
+
+def test_tokenizers_pickle_to_the_process_wide_cache():
+    assert pickle.loads(pickle.dumps(get_tokenizer("13a"))) is get_tokenizer("13a")
+    with pytest.raises(ValueError):
+        get_tokenizer("whitespace")
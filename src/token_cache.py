@@ -0,0 +1,199 @@
+"""Tokenization shared by the BLEU and ROUGE scorers, memoized per text.
+
+`TokenCache` tokenizes each distinct text once per scheme and keeps the result as a read-only int64 array of
+token ids. A token's id is a 64-bit hash of the token itself, so equal tokens get equal ids under every scheme
+and in every process, and no global vocabulary has to be kept. Porter stems and token ids are memoized in
+bounded LRUs, so each distinct word is stemmed and hashed once. Texts are kept least-recently-used first up to
+`maxsize` entries, and references repeated across rows, chunks or evaluation runs in the same process are
+tokenized only once. The words of cached texts are kept for `decode` and are dropped with the last cached text
+that uses them, so memory stays bounded however much distinct text goes through the cache.
+
+Schemes:
+    "rouge": rouge_score's default tokenizer (lowercased alphanumeric runs).
+    "rouge_stem": the same with `use_stemmer=True`.
+    "13a": sacrebleu's default BLEU tokenizer.
+    "nltk": `nltk.word_tokenize`, as used with `nltk.translate.bleu_score`; punkt_tab is resolved through
+        `src.nltk_resources`, so it works offline from a pre-packaged data directory.
+
+`get_tokenizer(scheme)` returns a tokenizer backed by the process-wide cache. It has rouge_score's `tokenize`
+method and is also callable, so it can be passed to `RougeScorer`, `score_batch`, the rouge metric's `tokenizer`
+argument and `BleuAccumulator(tokenize=...)`.
+"""
+
+import functools
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+from rouge_score import tokenize as rouge_tokenize
+from sacrebleu.tokenizers.tokenizer_13a import Tokenizer13a
+
+TokenCacheStats = namedtuple(
+    "TokenCacheStats", ["entries", "vocabulary", "hits", "misses", "stem_hits", "stem_misses"]
+)
+
+SCHEMES = ("rouge", "rouge_stem", "13a", "nltk")
+
+
+def _token_id(token):
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def _rouge_tokens(text):
+    # Only [a-z0-9] and spaces are left after the substitution, so `str.split` yields exactly the tokens
+    # `rouge_score.tokenize.tokenize` keeps.
+    return rouge_tokenize.NON_ALPHANUM_RE.sub(" ", text.lower()).split()
+
+
+class TokenCache:
+    """Bounded, thread-safe memo of tokenized texts as arrays of interned token ids."""
+
+    def __init__(self, maxsize=100_000, stem_cache_size=65_536):
+        if maxsize <= 0 or stem_cache_size <= 0:
+            raise ValueError("maxsize and stem_cache_size must be positive")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # Token id -> [token, number of cached texts holding it].
+        self._words = {}
+        self._entries = OrderedDict()
+        self._token_id = functools.lru_cache(maxsize=stem_cache_size)(_token_id)
+        self._tokenizers = {}
+        self._lock = threading.Lock()
+        self._stemmer = None
+        self._word_tokenize = None
+        self._stem = functools.lru_cache(maxsize=stem_cache_size)(self._porter_stem)
+        self._13a = Tokenizer13a()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _porter_stem(self, token):
+        # NLTK is slow to import, so it is only loaded once a stemming scheme is used.
+        if self._stemmer is None:
+            from nltk.stem import porter
+
+            self._stemmer = porter.PorterStemmer()
+        return self._stemmer.stem(token)
+
+    def _split(self, text, scheme):
+        if scheme == "rouge":
+            return _rouge_tokens(text)
+        if scheme == "rouge_stem":
+            tokens = [self._stem(token) if len(token) > 3 else token for token in _rouge_tokens(text)]
+            return [token for token in tokens if rouge_tokenize.VALID_TOKEN_RE.match(token)]
+        if scheme == "13a":
+            return self._13a(text).split()
+        if scheme == "nltk":
+            if self._word_tokenize is None:
+                import nltk
+
+                from src.nltk_resources import ensure_nltk_resource
+
+                ensure_nltk_resource("punkt_tab")
+                self._word_tokenize = nltk.word_tokenize
+            return self._word_tokenize(text)
+        raise ValueError(f"Unknown tokenization scheme {scheme!r}, expected one of {SCHEMES}")
+
+    def _hold(self, ids, tokens, count):
+        # Caller holds self._lock. Adds (count=1) or drops (count=-1) one cached text's references to its words.
+        for token_id, token in dict(zip(ids.tolist(), tokens)).items():
+            entry = self._words.get(token_id)
+            if entry is None:
+                entry = self._words[token_id] = [token, 0]
+            entry[1] += count
+            if not entry[1]:
+                del self._words[token_id]
+
+    def _entry(self, text, scheme):
+        # (ids, tokens) of `text`, from the cache or freshly tokenized and cached.
+        key = (scheme, text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        tokens = tuple(self._split(text, scheme))
+        ids = np.fromiter((self._token_id(token) for token in tokens), dtype=np.int64, count=len(tokens))
+        ids.flags.writeable = False
+        with self._lock:
+            self.misses += 1
+            if key in self._entries:
+                # Another thread tokenized the same text meanwhile; keep its arrays so callers share one.
+                return self._entries[key]
+            entry = self._entries[key] = (ids, tokens)
+            self._hold(ids, tokens, 1)
+            while len(self._entries) > self.maxsize:
+                self._hold(*self._entries.popitem(last=False)[1], -1)
+        return entry
+
+    def ids(self, text, scheme="rouge"):
+        """Token ids of `text` under `scheme`, as a read-only int64 array shared by every caller."""
+        return self._entry(text, scheme)[0]
+
+    def decode(self, ids):
+        """Token strings of an id array returned by `ids` for a text that is still cached."""
+        with self._lock:
+            return [self._words[token_id][0] for token_id in ids.tolist()]
+
+    def tokens(self, text, scheme="rouge"):
+        """Tokens of `text` under `scheme`, as a new list of strings."""
+        return list(self._entry(text, scheme)[1])
+
+    def tokenizer(self, scheme="rouge"):
+        """The (single) `CachedTokenizer` of `scheme` backed by this cache."""
+        if scheme not in SCHEMES:
+            raise ValueError(f"Unknown tokenization scheme {scheme!r}, expected one of {SCHEMES}")
+        with self._lock:
+            if scheme not in self._tokenizers:
+                self._tokenizers[scheme] = CachedTokenizer(self, scheme)
+            return self._tokenizers[scheme]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._words.clear()
+            self.hits = 0
+            self.misses = 0
+        self._stem.cache_clear()
+        self._token_id.cache_clear()
+
+    def stats(self):
+        stems = self._stem.cache_info()
+        with self._lock:
+            return TokenCacheStats(len(self._entries), len(self._words), self.hits, self.misses, stems.hits, stems.misses)
+
+
+class CachedTokenizer:
+    """rouge_score-style tokenizer (and BLEU tokenize callable) answering from a `TokenCache`.
+
+    Pickles as a reference to its scheme, so process-pool workers use their own process-wide cache.
+    """
+
+    def __init__(self, cache, scheme):
+        self.cache = cache
+        self.scheme = scheme
+
+    def tokenize(self, text):
+        return self.cache.tokens(text, self.scheme)
+
+    __call__ = tokenize
+
+    def ids(self, text):
+        return self.cache.ids(text, self.scheme)
+
+    def __reduce__(self):
+        return get_tokenizer, (self.scheme,)
+
+    def __repr__(self):
+        return f"CachedTokenizer(scheme={self.scheme!r})"
+
+
+token_cache = TokenCache()
+
+
+def get_tokenizer(scheme="rouge"):
+    """Tokenizer of `scheme` backed by the process-wide `token_cache`."""
+    return token_cache.tokenizer(scheme)